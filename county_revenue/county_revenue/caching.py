@@ -0,0 +1,83 @@
+# county_revenue/caching.py
+"""
+Per-process, in-memory caches shared by both apps: vehicles
+(revenue/vehicles.py), Idempotency-Key responses (revenue/idempotency.py)
+and auth tokens (users/authentication.py).
+
+- ``TTLCache`` is a thread-safe LRU map whose entries also expire.
+- ``per_process`` turns a factory into a getter that builds one instance
+  per process on first use, so settings are read then and not at import.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe map of at most ``max_entries`` items, least recently used
+    dropped first. Entries expire ``ttl`` seconds after ``put`` (``None``:
+    only when evicted); ``put`` can give one entry its own ttl.
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()    # key -> (value, time.monotonic() deadline or None)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def pop_where(self, predicate):
+        """Drop the entries whose value matches ``predicate``; returns their keys."""
+        with self._lock:
+            keys = [key for key, (value, _) in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+        return keys
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+def per_process(factory):
+    """A getter returning one ``factory()`` result per process, built on first call."""
+    lock = threading.Lock()
+    built = []
+
+    def get():
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
+
+    return get
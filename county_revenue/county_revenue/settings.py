@@ -41,12 +41,15 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'revenue.middleware.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'revenue.middleware.ASGIURLConfMiddleware',
 ]
 
 # Root URL configuration
 ROOT_URLCONF = 'county_revenue.urls'
+ASGI_ROOT_URLCONF = 'county_revenue.urls_asgi'    # async read views under uvicorn (revenue/async_views.py)
 
 # Templates (HTML rendering)
 TEMPLATES = [
@@ -70,7 +73,7 @@ WSGI_APPLICATION = 'county_revenue.wsgi.application'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -83,6 +86,55 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Token authentication cache (users/authentication.py)
+AUTH_TOKEN_CACHE_SIZE = 10000       # tokens kept per process
+AUTH_TOKEN_CACHE_TTL = 60           # seconds a process trusts its copy
+AUTH_TOKEN_SHARED_CACHE = None      # CACHES alias shared by all workers (e.g. redis); None = process-only
+AUTH_TOKEN_SHARED_CACHE_TTL = 300
+
+# Keyset pagination of the permit and ticket lists (revenue/pagination.py)
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500    # cap on ?page_size=
+
+# Bulk permit issuance (POST /api/permits/bulk/)
+PERMIT_BULK_MAX_ROWS = 10000
+
+# Idempotency-Key on permit/ticket creation (revenue/idempotency.py)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60        # seconds a key replays its response
+IDEMPOTENCY_LOCK_TIMEOUT = 60             # an unfinished claim older than this is abandoned
+IDEMPOTENCY_FRONT_CACHE_SIZE = 10000      # finished responses kept in memory per process
+
+# Payment reconciliation (revenue/payments.py)
+PAYMENT_CALLBACK_TOKEN = None    # shared secret sent as X-Callback-Token; None rejects all callbacks
+PAYMENT_BATCH_SIZE = 1000    # events matched per worker transaction
+
+# Annual permit renewals (revenue/renewals.py)
+RENEWAL_CHUNK_SIZE = 1000    # permits renewed per transaction
+
+# Fee previews (POST /revenue/quotes/)
+QUOTE_MAX_ITEMS = 1000
+
+# Permit numbers (revenue/permit_numbers.py)
+PERMIT_NUMBER_ALLOCATOR = 'revenue.permit_numbers.BlockSequencePermitNumberAllocator'
+PERMIT_NUMBER_BLOCK_SIZE = 50    # sequence values each process reserves at a time
+
+# Parking occupancy (revenue/occupancy.py)
+PARKING_ENFORCE_CAPACITY = False          # reject tickets for full sections
+PARKING_OCCUPANCY_RESYNC_SECONDS = 60     # reload counters from the database this often
+
+# Versions of the location tree and tariff table each worker caches (revenue/versions.py)
+CACHE_VERSION_CHECK_SECONDS = 2    # how stale a worker's copy can be after another worker's edit
+
+# Enforcement plate lookups (revenue/enforcement.py)
+PLATE_LOOKUP_CACHE_SECONDS = 5
+
+# Vehicles of ticket buyers (revenue/vehicles.py)
+VEHICLE_CACHE_SIZE = 10000    # vehicles kept per process
+VEHICLE_CACHE_TTL = 300       # seconds a process trusts its copy
+
+# Auditor extracts (revenue/exports.py)
+EXPORT_CHUNK_SIZE = 2000    # rows fetched per query while streaming
+
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
@@ -90,6 +142,16 @@ AUTH_USER_MODEL = 'users.User'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# PDF rendering (revenue/pdf.py)
+PDF_RENDER_WORKERS = 2           # xhtml2pdf processes per web worker
+PDF_INLINE_QUEUE_THRESHOLD = 1   # render inline while fewer renders than this are running
+PDF_JOB_DIR = MEDIA_ROOT / 'pdf_jobs'
+PDF_JOB_TTL = 3600               # seconds a finished job stays downloadable
+PDF_CACHE_DIR = MEDIA_ROOT / 'pdf_cache'
+PDF_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PDF_SENDFILE_HEADER = None       # e.g. 'X-Sendfile' (Apache) or 'X-Accel-Redirect' (nginx)
+PDF_SENDFILE_PREFIX = None       # internal URL prefix for X-Accel-Redirect, e.g. '/protected/pdf_cache/'
+
 # Database
 DATABASES = {
     'default': {
@@ -99,9 +161,24 @@ DATABASES = {
         'PASSWORD': 'Jack@2020',
         'HOST': 'localhost',
         'PORT': '3306',
-    }
+    },
+    # Read replica of 'default'; in tests it is the same database
+    'replica': {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': 'county_revenue',
+        'USER': 'django_user',
+        'PASSWORD': 'Jack@2020',
+        'HOST': 'localhost',
+        'PORT': '3306',
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+# Read replicas (revenue/replicas.py)
+DATABASE_ROUTERS = ['revenue.replicas.ReplicaRouter']
+DATABASE_REPLICAS = ['replica']    # aliases that views with ReplicaReadMixin read from
+REPLICA_PIN_SECONDS = 5            # a user's reads stay on the primary this long after they write
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -110,6 +187,27 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+# Password hashing (users/hashing.py). New passwords use the chosen algorithm;
+# older hashes still verify and are upgraded at the user's next login.
+PASSWORD_HASHING_ALGORITHM = 'pbkdf2'    # 'argon2' (pip install argon2-cffi), 'bcrypt' (pip install bcrypt) or 'pbkdf2'
+PASSWORD_HASHING_COST = {
+    'pbkdf2': {'iterations': 1_000_000},
+    'argon2': {'time_cost': 2, 'memory_cost': 102400, 'parallelism': 8},
+    'bcrypt': {'rounds': 12},
+}
+PASSWORD_HASHERS = sorted([    # the chosen algorithm first: Django hashes new passwords with the first entry
+    'users.hashing.PBKDF2PasswordHasher',
+    'users.hashing.Argon2PasswordHasher',
+    'users.hashing.BCryptSHA256PasswordHasher',
+], key=lambda path: PASSWORD_HASHING_ALGORITHM.lower() not in path.lower()) + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+PASSWORD_HASH_WORKERS = None    # hashing threads per ASGI process; None = CPU count
+
+# Login/register token buckets (users/throttling.py): (tokens per minute, burst)
+AUTH_THROTTLE_IP_RATE = (20, 20)
+AUTH_THROTTLE_USERNAME_RATE = (5, 10)
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Africa/Nairobi'
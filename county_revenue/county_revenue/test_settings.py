@@ -0,0 +1,28 @@
+# county_revenue/test_settings.py
+"""
+Run the tests without MySQL:
+
+    python manage.py test --settings=county_revenue.test_settings
+
+Two SQLite databases stand in for the primary and its read replica. In
+tests the replica mirrors the primary's test database, as it does with
+the MySQL settings.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# A replica connection cannot see rows a TestCase has not committed;
+# ReplicaRoutingTests turns replica reads on for itself.
+DATABASE_REPLICAS = []
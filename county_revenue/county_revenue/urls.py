@@ -1,10 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework.authtoken.views import obtain_auth_token
 
 from revenue.views import PermitViewSet, PermitTypeViewSet
-from users.views import UserViewSet
+from users.views import LoginAPIView, UserViewSet
 
 # ------------------------------
 # DRF router
@@ -22,8 +21,8 @@ urlpatterns = [
     path('api/', include(router.urls)),
     path('api-auth/', include('rest_framework.urls')),  # DRF login/logout
 
-    # Token login
-    path('api/login/', obtain_auth_token, name='api_login'),
+    # Token login, throttled like users/api/login/
+    path('api/login/', LoginAPIView.as_view(), name='api_login'),
 
     # App routes (if you have app-level urls.py)
     path('users/', include('users.urls')),
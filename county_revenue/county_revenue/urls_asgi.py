@@ -0,0 +1,30 @@
+"""
+URL configuration for requests served over ASGI (see ASGIURLConfMiddleware).
+
+The hot read-only endpoints resolve to their async versions first, and
+the login, register and sign-up routes to versions that hash passwords on
+a dedicated pool (users/hashing.py); everything else falls through to the
+regular routes.
+"""
+from django.urls import path
+
+from revenue import async_views
+from users.hashing import run_in_hash_pool
+from users.views import LoginAPIView, RegisterAPIView, UserViewSet
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/permit-types/', async_views.permit_type_list),
+    path('api/permit-types/<int:pk>/', async_views.permit_type_detail),
+    path('revenue/towns/', async_views.town_list),
+    path('revenue/towns/<int:town_id>/areas/', async_views.areas_by_town),
+    path('revenue/areas/<int:area_id>/sections/', async_views.sections_by_area),
+    path('revenue/enforcement/plate/<str:plate>/', async_views.plate_status),
+    path('users/api/register/', run_in_hash_pool(RegisterAPIView.as_view())),
+    path('users/api/login/', run_in_hash_pool(LoginAPIView.as_view())),
+    path('api/login/', run_in_hash_pool(LoginAPIView.as_view())),
+    # Sign-up through the user routers; their detail routes hash only on password changes
+    path('api/users/', run_in_hash_pool(UserViewSet.as_view({'get': 'list', 'post': 'create'}))),
+    path('users/api/users/', run_in_hash_pool(UserViewSet.as_view({'get': 'list', 'post': 'create'}))),
+] + wsgi_urlpatterns
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Town, Area, ParkingSection, Vehicle, ParkingTicket
+from .models import Town, Area, ParkingSection, Vehicle, ParkingTicket, PermitTariff, VehicleRate
 
 # Inline parking sections inside Area
 class ParkingSectionInline(admin.TabularInline):
@@ -22,3 +22,13 @@ class ParkingSectionAdmin(admin.ModelAdmin):
     list_display = ("name", "area", "capacity", "is_custom")
     list_filter = ("area", "is_custom")
     search_fields = ("name",)
+
+@admin.register(PermitTariff)
+class PermitTariffAdmin(admin.ModelAdmin):
+    list_display = ("permit_type", "effective_from", "registration_fee", "annual_fee", "monthly_fee", "daily_fee")
+    list_filter = ("permit_type",)
+
+@admin.register(VehicleRate)
+class VehicleRateAdmin(admin.ModelAdmin):
+    list_display = ("vehicle_type", "effective_from", "hourly_rate")
+    list_filter = ("vehicle_type",)
@@ -0,0 +1,148 @@
+# revenue/async_views.py
+"""
+Async versions of the busiest read-only endpoints, for ASGI deployments.
+
+These are plain Django async views over the async ORM, so under uvicorn
+they run on the event loop instead of taking the thread hop Django adds
+around every sync DRF view. They use the same serializers and JSON
+renderer as the DRF views, so payloads are identical, and read from the
+same database: a replica where the DRF view has ``ReplicaReadMixin``,
+unless the user's recent write pinned them to the primary.
+
+Only ASGI requests are routed here (``ASGIURLConfMiddleware`` and
+county_revenue/urls_asgi.py). Under WSGI the DRF views stay: driving
+these through ``async_to_sync`` would cost more than it saves.
+"""
+import copy
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework.authentication import get_authorization_header
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from users.authentication import get_token_cache
+
+from . import enforcement, replicas
+from .models import Area, ParkingSection, PermitType, Town
+from .permissions import IsEnforcementOfficer
+from .serializers import (
+    AreaSerializer, CompactAreaSerializer, CompactParkingSectionSerializer, ParkingSectionSerializer,
+    PermitTypeSerializer, TownSerializer,
+)
+from .views import wants_compact
+
+
+def json_response(data, status=200, headers=None):
+    return HttpResponse(JSONRenderer().render(data), content_type="application/json", status=status, headers=headers)
+
+
+def not_found(model):
+    return json_response({"detail": f"No {model._meta.object_name} matches the given query."}, status=404)
+
+
+async def request_user(request):
+    """
+    The DRF-authenticated user. A token already in this process's token
+    cache is resolved on the event loop; anything else (cache miss,
+    session, shared cache tier) runs DRF's authenticators in a thread.
+    """
+    header = get_authorization_header(request).split()
+    if len(header) == 2 and header[0].lower() == b"token":
+        cached = get_token_cache().get_local(header[1].decode("latin-1"))
+        if cached is not None and cached[0].is_active:
+            return copy.copy(cached[0])
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    return await sync_to_async(lambda: drf_request.user)()
+
+
+async def read_alias(request, read_your_writes=True):
+    """The alias to read from, chosen as ``ReplicaReadMixin.read_alias`` does; ``None`` = the primary."""
+    alias = replicas.choose_replica()
+    if alias is None or not read_your_writes:
+        return alias
+    # Only a request that names a user can be pinned; anonymous reads skip authentication
+    if "HTTP_AUTHORIZATION" not in request.META and replicas.PIN_COOKIE not in request.COOKIES:
+        return alias
+    try:
+        user = await request_user(request)
+    except APIException:
+        return alias    # these endpoints do not require authentication
+    if user.is_authenticated and await replicas.ais_pinned(user.pk, request):
+        return None
+    return alias
+
+
+# ------------------------------
+# PERMIT TYPES
+# ------------------------------
+@require_safe
+async def permit_type_list(request):
+    # Only staff change them, through the admin (PermitTypeViewSet.read_your_writes)
+    alias = await read_alias(request, read_your_writes=False)
+    permit_types = [permit_type async for permit_type in PermitType.objects.using(alias)]
+    return json_response(PermitTypeSerializer(permit_types, many=True).data)
+
+
+@require_safe
+async def permit_type_detail(request, pk):
+    alias = await read_alias(request, read_your_writes=False)
+    try:
+        permit_type = await PermitType.objects.using(alias).aget(pk=pk)
+    except PermitType.DoesNotExist:
+        return not_found(PermitType)
+    return json_response(PermitTypeSerializer(permit_type).data)
+
+
+# ------------------------------
+# TOWNS / AREAS / PARKING ZONES
+# ------------------------------
+@require_safe
+async def town_list(request):
+    alias = await read_alias(request)
+    towns = [town async for town in Town.objects.using(alias)]
+    return json_response(TownSerializer(towns, many=True).data)
+
+
+@require_safe
+async def areas_by_town(request, town_id):
+    serializer_class = CompactAreaSerializer if wants_compact(request) else AreaSerializer
+    alias = await read_alias(request)
+    areas = [area async for area in Area.objects.using(alias).filter(town_id=town_id).select_related("town")]
+    return json_response(serializer_class(areas, many=True).data)
+
+
+@require_safe
+async def sections_by_area(request, area_id):
+    serializer_class = CompactParkingSectionSerializer if wants_compact(request) else ParkingSectionSerializer
+    alias = await read_alias(request)
+    sections = [
+        section async for section
+        in ParkingSection.objects.using(alias).filter(area_id=area_id).select_related("area__town")
+    ]
+    return json_response(serializer_class(sections, many=True).data)
+
+
+# ------------------------------
+# ENFORCEMENT (officers)
+# ------------------------------
+@require_safe
+async def plate_status(request, plate):
+    """Is this plate covered right now? Minimal, cached payload for street checks"""
+    # From the primary, like PlateStatusAPIView: a ticket bought a moment ago must count
+    try:
+        user = await request_user(request)
+    except APIException as exc:
+        return json_response({"detail": exc.detail}, status=exc.status_code, headers={"WWW-Authenticate": "Token"})
+    if not user.is_authenticated:
+        return json_response(
+            {"detail": "Authentication credentials were not provided."}, status=401,
+            headers={"WWW-Authenticate": "Token"},
+        )
+    if not IsEnforcementOfficer().has_permission(SimpleNamespace(user=user), None):
+        return json_response({"detail": "You do not have permission to perform this action."}, status=403)
+    return json_response(await enforcement.aplate_status(plate))
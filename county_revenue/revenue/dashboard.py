@@ -0,0 +1,186 @@
+# revenue/dashboard.py
+"""
+Counters behind the staff dashboard (GET /revenue/dashboard/summary/).
+
+The dashboard shows how many permits and tickets are active, expired,
+paid and unpaid. Counting those on every page view scans both tables,
+since ``paid`` and ``end_date`` are not indexed. Instead
+``DashboardCounter`` holds a count per source x paid flag x expiry bucket:
+
+- a permit's bucket is local midnight after its ``end_date``;
+- a ticket's bucket is the end of the hour its ``expires_at`` falls in.
+
+A bucket in the future means active, one in the past means expired, so
+the counters stay correct as time passes without being touched. A ticket
+counts as active until the end of the hour it expires in, at most an
+hour late. Tickets without ``expires_at`` are not counted.
+
+Signals move each object's +1 between buckets in the same transaction as
+the save. Bulk writes call ``record_bulk_create``/``record_bulk_update``.
+``manage.py reconcile_dashboard_counters`` recounts from the source
+tables, corrects any drift and merges expired buckets by month.
+"""
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import DashboardCounter, ParkingTicket, Permit
+
+HOUR = timedelta(hours=1)
+SOURCES = {"permit": "permits", "ticket": "tickets"}
+
+
+# ------------------------------
+# Buckets
+# ------------------------------
+def permit_bucket(end_date):
+    return timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+
+
+def ticket_bucket(expires_at):
+    return expires_at.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0) + HOUR
+
+
+def counter_key(instance, values=None):
+    """The counter row ``instance`` adds 1 to, from ``values`` if given; ``None`` if uncounted."""
+    if values is None:
+        values = {f.attname: getattr(instance, f.attname) for f in instance._meta.concrete_fields}
+    if isinstance(instance, Permit):
+        if values["end_date"] is None:
+            return None
+        return ("permit", permit_bucket(values["end_date"]), values["paid"])
+    if values["expires_at"] is None:
+        return None
+    return ("ticket", ticket_bucket(values["expires_at"]), values["paid"])
+
+
+def previous_key(instance):
+    """``(known, key)`` for the row an instance counted in at its last load, refresh or save."""
+    loaded = getattr(instance, "_loaded_values", None)
+    needed = ("end_date", "paid") if isinstance(instance, Permit) else ("expires_at", "paid")
+    if not loaded or any(name not in loaded for name in needed):
+        return False, None
+    return True, counter_key(instance, loaded)
+
+
+# ------------------------------
+# Incremental updates
+# ------------------------------
+def add(key, count):
+    if not count:
+        return
+    source, expires_at, paid = key
+    counters = DashboardCounter.objects.filter(source=source, expires_at=expires_at, paid=paid)
+    if counters.update(count=F("count") + count):
+        return
+    try:
+        with transaction.atomic():
+            DashboardCounter.objects.create(source=source, expires_at=expires_at, paid=paid, count=count)
+    except IntegrityError:
+        # Another transaction created the row first
+        counters.update(count=F("count") + count)
+
+
+def apply_changes(changes):
+    """Net ``(key, +1/-1)`` pairs per counter row, then write each row once."""
+    totals = {}
+    for key, count in changes:
+        if key is not None:
+            totals[key] = totals.get(key, 0) + count
+    for key, count in totals.items():
+        add(key, count)
+
+
+def record_save(instance, created):
+    new = counter_key(instance)
+    if created:
+        apply_changes([(new, 1)])
+        return
+    known, old = previous_key(instance)
+    if known and old != new:    # unknown previous state: reconciliation corrects it
+        apply_changes([(old, -1), (new, 1)])
+
+
+def record_delete(instance):
+    apply_changes([(counter_key(instance), -1)])
+
+
+def record_bulk_create(instances):
+    apply_changes((counter_key(instance), 1) for instance in instances)
+
+
+def record_bulk_update(instances):
+    changes = []
+    for instance in instances:
+        known, old = previous_key(instance)
+        if known:
+            changes += [(old, -1), (counter_key(instance), 1)]
+    apply_changes(changes)
+
+
+# ------------------------------
+# Summary
+# ------------------------------
+def summary(now=None):
+    """Active/expired/paid/unpaid/total per source, in one query."""
+    now = now or timezone.now()
+    aggregates = {}
+    for source in SOURCES:
+        scope = Q(source=source)
+        aggregates.update({
+            f"{source}_active": Sum("count", filter=scope & Q(expires_at__gt=now)),
+            f"{source}_expired": Sum("count", filter=scope & Q(expires_at__lte=now)),
+            f"{source}_paid": Sum("count", filter=scope & Q(paid=True)),
+            f"{source}_unpaid": Sum("count", filter=scope & Q(paid=False)),
+        })
+    totals = DashboardCounter.objects.aggregate(**aggregates)
+    result = {"as_of": now}
+    for source, label in SOURCES.items():
+        counts = {name: totals[f"{source}_{name}"] or 0 for name in ("active", "expired", "paid", "unpaid")}
+        counts["total"] = counts["paid"] + counts["unpaid"]
+        result[label] = counts
+    return result
+
+
+# ------------------------------
+# Reconciliation
+# ------------------------------
+def recount(now=None):
+    """Counter rows computed from the source tables, expired buckets merged by month."""
+    now = now or timezone.now()
+    counts = {}
+
+    def merge(source, bucket, paid, n):
+        if bucket <= now:
+            bucket = bucket.astimezone(dt_timezone.utc).replace(day=1, hour=0)
+        key = (source, bucket, paid)
+        counts[key] = counts.get(key, 0) + n
+
+    for row in Permit.objects.values("end_date", "paid").annotate(n=Count("id")):
+        merge("permit", permit_bucket(row["end_date"]), row["paid"], row["n"])
+    tickets = ParkingTicket.objects.filter(expires_at__isnull=False).annotate(
+        hour=TruncHour("expires_at", tzinfo=dt_timezone.utc),
+    )
+    for row in tickets.values("hour", "paid").annotate(n=Count("id")):
+        merge("ticket", row["hour"] + HOUR, row["paid"], row["n"])
+    return counts
+
+
+def reconcile(now=None):
+    """Replace the counters with a recount; returns the summary before and after."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        # Locked first: saves in flight wait, then apply their change to the new rows
+        list(DashboardCounter.objects.select_for_update().values_list("pk", flat=True))
+        before = summary(now)
+        counts = recount(now)
+        DashboardCounter.objects.all().delete()
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(source=source, expires_at=bucket, paid=paid, count=n)
+             for (source, bucket, paid), n in counts.items() if n],
+            batch_size=1000,
+        )
+        return before, summary(now)
@@ -0,0 +1,88 @@
+# revenue/enforcement.py
+"""
+Plate status lookups for enforcement officers.
+
+The latest few tickets of a plate are read through the
+(plate_normalized, expires_at) index and kept in Django's cache for
+``PLATE_LOOKUP_CACHE_SECONDS``; ticket saves drop the entry (signals.py).
+Only raw rows are cached, so "active" is always judged against the
+current time.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ParkingTicket, normalize_plate
+
+CACHE_KEY = "revenue:plate:{plate}"
+RECENT_TICKETS = 5
+
+
+def cache_key(normalized_plate):
+    return CACHE_KEY.format(plate=normalized_plate)
+
+
+def recent_tickets_query(normalized_plate):
+    return (
+        ParkingTicket.objects.filter(plate_normalized=normalized_plate)
+        .order_by("-expires_at")
+        .values_list("expires_at", "paid")[:RECENT_TICKETS]
+    )
+
+
+def recent_tickets(normalized_plate):
+    """``[(expires_at, paid), ...]`` for the plate's latest tickets, newest expiry first."""
+    key = cache_key(normalized_plate)
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(recent_tickets_query(normalized_plate))
+        cache.set(key, rows, getattr(settings, "PLATE_LOOKUP_CACHE_SECONDS", 5))
+    return rows
+
+
+async def arecent_tickets(normalized_plate):
+    """``recent_tickets`` for async views: async cache and ORM calls."""
+    key = cache_key(normalized_plate)
+    rows = await cache.aget(key)
+    if rows is None:
+        rows = [row async for row in recent_tickets_query(normalized_plate)]
+        await cache.aset(key, rows, getattr(settings, "PLATE_LOOKUP_CACHE_SECONDS", 5))
+    return rows
+
+
+def summarize(normalized, rows, now):
+    active = [row for row in rows if row[0] and row[0] > now]
+    active_paid = [row for row in active if row[1]]
+
+    if active_paid:
+        expires_at, paid = active_paid[0]
+    elif active:
+        expires_at, paid = active[0]
+    elif rows:
+        expires_at, paid = rows[0]
+    else:
+        expires_at, paid = None, False
+
+    return {
+        "plate": normalized,
+        "found": bool(rows),
+        "paid": paid,
+        "active": bool(active),
+        "expires_at": expires_at,
+    }
+
+
+def plate_status(plate, now=None):
+    normalized = normalize_plate(plate)
+    rows = recent_tickets(normalized) if normalized else []
+    return summarize(normalized, rows, now or timezone.now())
+
+
+async def aplate_status(plate, now=None):
+    normalized = normalize_plate(plate)
+    rows = await arecent_tickets(normalized) if normalized else []
+    return summarize(normalized, rows, now or timezone.now())
+
+
+def invalidate_plate(normalized_plate):
+    cache.delete(cache_key(normalized_plate))
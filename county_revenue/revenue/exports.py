@@ -0,0 +1,162 @@
+# revenue/exports.py
+"""
+Streaming CSV / NDJSON extracts of permits and tickets for auditors.
+
+Rows are read as plain tuples (``values_list``) in primary-key batches of
+``EXPORT_CHUNK_SIZE`` and written out batch by batch, so memory use does
+not grow with the number of rows exported. Keyset batches are used
+rather than ``QuerySet.iterator()`` because the MySQL drivers buffer a
+whole result set on the client.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.utils import timezone
+
+from .models import ParkingTicket, Permit
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class ExportFilterError(ValueError):
+    """A filter the dataset does not support"""
+
+
+class Echo:
+    """File-like object whose ``write`` returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+# ------------------------------
+# Datasets
+# ------------------------------
+class Dataset:
+    model = None
+    columns = ()    # (header, values_list lookup)
+
+    def __init__(self, start=None, end=None, town=None, category=None):
+        # The database is chosen now, as rows are streamed after the view has returned
+        queryset = self.model.objects.using(router.db_for_read(self.model))
+        self.queryset = self.filter(queryset, start, end, town, category)
+
+    def filter(self, queryset, start, end, town, category):
+        raise NotImplementedError
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def batches(self, chunk_size=None):
+        """Yield lists of row tuples, ``chunk_size`` rows at a time, in primary-key order."""
+        chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+        lookups = ["pk"] + [lookup for _, lookup in self.columns]
+        last_pk = 0
+        while True:
+            rows = list(self.queryset.filter(pk__gt=last_pk).order_by("pk").values_list(*lookups)[:chunk_size])
+            if not rows:
+                return
+            last_pk = rows[-1][0]
+            yield [row[1:] for row in rows]
+
+
+class PermitDataset(Dataset):
+    model = Permit
+    columns = (
+        ("permit_number", "permit_number"),
+        ("permit_type", "permit_type__name"),
+        ("owner_name", "owner_name"),
+        ("start_date", "start_date"),
+        ("end_date", "end_date"),
+        ("duration_days", "duration_days"),
+        ("duration_months", "duration_months"),
+        ("total_fee", "total_fee"),
+        ("amount_paid", "amount_paid"),
+        ("paid", "paid"),
+        ("renewed", "renewed"),
+    )
+
+    def filter(self, queryset, start, end, town, category):
+        if town:
+            raise ExportFilterError({"town": ["Permits are not tied to a town."]})
+        if start:
+            queryset = queryset.filter(start_date__gte=start)
+        if end:
+            queryset = queryset.filter(start_date__lte=end)
+        if category:
+            queryset = queryset.filter(permit_type__name=category)
+        return queryset
+
+
+class TicketDataset(Dataset):
+    model = ParkingTicket
+    columns = (
+        ("id", "id"),
+        ("plate_number", "plate_number"),
+        ("vehicle_type", "vehicle_type"),
+        ("town", "town_name"),
+        ("area", "area_name"),
+        ("section", "section__name"),
+        ("custom_place", "custom_place"),
+        ("duration", "duration"),
+        ("time_unit", "time_unit"),
+        ("amount", "amount"),
+        ("paid", "paid"),
+        ("created_at", "created_at"),
+        ("expires_at", "expires_at"),
+    )
+
+    def filter(self, queryset, start, end, town, category):
+        # Compare against local midnights so the created_at column is filtered as-is
+        tz = timezone.get_current_timezone()
+        if start:
+            queryset = queryset.filter(created_at__gte=datetime.combine(start, time.min, tzinfo=tz))
+        if end:
+            queryset = queryset.filter(created_at__lt=datetime.combine(end + timedelta(days=1), time.min, tzinfo=tz))
+        if town:
+            queryset = queryset.filter(town_name=town)
+        if category:
+            queryset = queryset.filter(vehicle_type=category)
+        return queryset
+
+
+DATASETS = {
+    "permits": PermitDataset,
+    "tickets": TicketDataset,
+}
+
+
+# ------------------------------
+# Writers
+# ------------------------------
+def csv_lines(dataset, chunk_size=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(dataset.headers)
+    for rows in dataset.batches(chunk_size):
+        yield "".join(writer.writerow(row) for row in rows)
+
+
+def ndjson_lines(dataset, chunk_size=None):
+    headers = dataset.headers
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for rows in dataset.batches(chunk_size):
+        yield "".join(encoder.encode(dict(zip(headers, row))) + "\n" for row in rows)
+
+
+WRITERS = {
+    "csv": csv_lines,
+    "ndjson": ndjson_lines,
+}
+
+
+def stream(dataset, fmt, chunk_size=None):
+    """Encoded chunks of ``dataset`` in ``fmt``."""
+    for text in WRITERS[fmt](dataset, chunk_size):
+        yield text.encode("utf-8")
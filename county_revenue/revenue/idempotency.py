@@ -0,0 +1,153 @@
+# revenue/idempotency.py
+"""
+Idempotency-Key support for create endpoints.
+
+A client that retries ``POST`` with the same ``Idempotency-Key`` header
+gets the first response back instead of creating a second row.
+
+- The first request claims the key by inserting an ``IdempotencyKey`` row
+  (unique per user and key). That row is committed before the view runs,
+  so a simultaneous duplicate sees it.
+- The view's writes and the stored response commit in one transaction.
+- A duplicate that arrives while the first is still running gets 409.
+  One that arrives after it gets the stored response, marked with
+  ``Idempotent-Replayed: true``.
+- Reusing a key with a different request body is rejected with 422.
+
+Finished responses are also kept in a small per-process LRU in front of
+the table. Rows expire after ``IDEMPOTENCY_KEY_TTL`` seconds and are
+removed by ``manage.py purge_idempotency_keys``.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from county_revenue.caching import TTLCache, per_process
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+class StoredResponse:
+    __slots__ = ("fingerprint", "status_code", "body")
+
+    def __init__(self, fingerprint, status_code, body):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.body = body
+
+    def replay(self):
+        response = Response(json.loads(self.body) if self.body else None, status=self.status_code)
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+
+# ``(user_id, key) -> StoredResponse``; each entry lives as long as its row
+get_front_cache = per_process(lambda: TTLCache(getattr(settings, "IDEMPOTENCY_FRONT_CACHE_SIZE", 10000)))
+
+
+def fingerprint(request):
+    """Hash of what the client asked for, to catch a key reused for a different request."""
+    body = json.dumps(request.data, sort_keys=True, separators=(",", ":"), default=str)
+    raw = f"{request.method} {request.path}\n{body}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def error(detail, status_code, retry_after=None):
+    response = Response({"detail": detail}, status=status_code)
+    if retry_after is not None:
+        response["Retry-After"] = str(retry_after)
+    return response
+
+
+class IdempotentCreateMixin:
+    """
+    For ModelViewSets: honours ``Idempotency-Key`` on ``create``. Requests
+    without the header behave as before.
+    """
+
+    def create(self, request, *args, **kwargs):
+        from .models import IdempotencyKey
+
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return error(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters.", status.HTTP_400_BAD_REQUEST)
+
+        ttl = getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60)
+        lock_timeout = getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 60)
+        cache_key = (request.user.pk, key)
+        digest = fingerprint(request)
+
+        stored = get_front_cache().get(cache_key)
+        if stored is not None:
+            return self.replay(stored, digest)
+
+        # Claim the key; committed at once so a concurrent duplicate sees it
+        now = timezone.now()
+        for _ in range(2):
+            try:
+                with transaction.atomic():
+                    claim = IdempotencyKey.objects.create(
+                        user=request.user, key=key, fingerprint=digest,
+                        created_at=now, expires_at=now + timedelta(seconds=ttl),
+                    )
+                break
+            except IntegrityError:
+                existing = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+                if existing is None:
+                    continue    # removed meanwhile; claim again
+                stale = existing.status_code is None and existing.created_at <= now - timedelta(seconds=lock_timeout)
+                if existing.expires_at <= now or stale:
+                    # Expired, or abandoned by a request that died mid-way
+                    IdempotencyKey.objects.filter(pk=existing.pk, created_at=existing.created_at).delete()
+                    continue
+                if existing.status_code is None:
+                    if existing.fingerprint != digest:
+                        return self.mismatch()
+                    return error(
+                        f"A request with this {HEADER} is still being processed.",
+                        status.HTTP_409_CONFLICT, retry_after=1,
+                    )
+                return self.replay(self.remember(cache_key, existing), digest)
+        else:
+            return error(f"Could not claim this {HEADER}; retry.", status.HTTP_409_CONFLICT, retry_after=1)
+
+        try:
+            # The created rows and the stored response commit together
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+                claim.status_code = response.status_code
+                claim.response_body = JSONRenderer().render(response.data).decode() if response.data is not None else ""
+                claim.save(update_fields=["status_code", "response_body"])
+        except BaseException:
+            # Nothing was created (validation error, full section...): free the key for a retry
+            claim.delete()
+            raise
+        self.remember(cache_key, claim)
+        return response
+
+    def remember(self, cache_key, record):
+        remaining = (record.expires_at - timezone.now()).total_seconds()
+        stored = StoredResponse(record.fingerprint, record.status_code, record.response_body)
+        get_front_cache().put(cache_key, stored, ttl=max(0, remaining))
+        return stored
+
+    def replay(self, stored, digest):
+        if stored.fingerprint != digest:
+            return self.mismatch()
+        return stored.replay()
+
+    def mismatch(self):
+        return error(
+            f"This {HEADER} was already used with a different request.", status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+
@@ -0,0 +1,66 @@
+# revenue/locations.py
+"""
+Precomputed town -> area -> section tree.
+
+The serialized tree is stored in Django's cache under the current version
+number. Any save or delete of a Town, Area or ParkingSection bumps the
+version (see signals.py), so the next request rebuilds it and clients
+holding the old ETag get a fresh copy instead of a 304. The version is a
+database row (versions.py): other workers notice the bump within
+``CACHE_VERSION_CHECK_SECONDS``.
+"""
+import json
+
+from django.core.cache import cache
+
+from . import versions
+from .models import Area, ParkingSection, Town
+from .replicas import use_primary
+
+VERSION_NAME = "locations"
+TREE_KEY = "revenue:locations:tree:{version}"
+TREE_TIMEOUT = 24 * 60 * 60
+
+# Last tree this process served, as (version, bytes)
+_local = (None, None)
+
+
+def get_version():
+    return versions.get_version(VERSION_NAME)
+
+
+def bump_version():
+    versions.bump_version(VERSION_NAME)
+
+
+def build_tree():
+    """Three queries, whatever the size of the hierarchy."""
+    towns = {
+        town["id"]: dict(town, areas=[])
+        for town in Town.objects.order_by("name").values("id", "name")
+    }
+    areas = {}
+    for area in Area.objects.order_by("name").values("id", "name", "town_id"):
+        node = {"id": area["id"], "name": area["name"], "sections": []}
+        areas[area["id"]] = node
+        towns[area["town_id"]]["areas"].append(node)
+    for section in ParkingSection.objects.order_by("name").values("id", "name", "capacity", "is_custom", "area_id"):
+        areas[section.pop("area_id")]["sections"].append(section)
+    return list(towns.values())
+
+
+def get_tree():
+    """Returns ``(version, serialized_json_bytes)`` for the current tree."""
+    global _local
+    version = get_version()
+    if _local[0] == version:
+        return _local
+
+    key = TREE_KEY.format(version=version)
+    blob = cache.get(key)
+    if blob is None:
+        with use_primary():
+            blob = json.dumps({"version": version, "towns": build_tree()}, separators=(",", ":")).encode()
+        cache.set(key, blob, TREE_TIMEOUT)
+    _local = (version, blob)
+    return _local
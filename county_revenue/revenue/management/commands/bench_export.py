@@ -0,0 +1,108 @@
+# revenue/management/commands/bench_export.py
+import gc
+import resource
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from revenue.models import Area, ParkingSection, ParkingTicket, Town, Vehicle
+from revenue.views import ExportAPIView
+
+
+def current_rss_mb():
+    """Resident set size now (Linux), falling back to the peak elsewhere."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Stream GET /revenue/exports/tickets.<fmt> over seeded rows and sample RSS (all data rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+        parser.add_argument("--gzip", action="store_true", help="Send Accept-Encoding: gzip")
+        parser.add_argument("--samples", type=int, default=10, help="RSS samples taken while streaming")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                staff = self.seed(options["rows"])
+                self.run(staff, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        User = get_user_model()
+        staff = User.objects.create_user("bench-export-auditor", password="bench", is_staff=True)
+        section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="bench-export-town"), name="bench"), name="E1"
+        )
+        vehicle = Vehicle.objects.create(owner=staff, plate_number="KEX 001A", vehicle_type="saloon")
+        now = timezone.now()
+        started = time.perf_counter()
+        batch = []
+        for index in range(rows):
+            batch.append(ParkingTicket(
+                vehicle=vehicle, section=section, duration=60, time_unit="minutes", amount=100,
+                paid=index % 5 != 0, plate_number=vehicle.plate_number, plate_normalized="KEX001A",
+                vehicle_type="saloon", town_name="bench-export-town", area_name="bench",
+                expires_at=now + timedelta(minutes=60),
+            ))
+            if len(batch) == 5000:
+                ParkingTicket.objects.bulk_create(batch)
+                batch = []
+        ParkingTicket.objects.bulk_create(batch)
+        self.stdout.write(f"seeded {rows} tickets in {time.perf_counter() - started:.1f}s")
+        return staff
+
+    def run(self, staff, options):
+        fmt = options["format"]
+        headers = {"HTTP_ACCEPT_ENCODING": "gzip"} if options["gzip"] else {}
+        request = APIRequestFactory().get(f"/revenue/exports/tickets.{fmt}", **headers)
+        force_authenticate(request, user=staff)
+
+        gc.collect()
+        baseline = current_rss_mb()
+        started = time.perf_counter()
+        response = ExportAPIView.as_view()(request, dataset="tickets", fmt=fmt)
+        assert response.status_code == 200 and response.streaming
+
+        # Each chunk is one EXPORT_CHUNK_SIZE batch of rows
+        batches = options["rows"] // getattr(settings, "EXPORT_CHUNK_SIZE", 2000) + 1
+        every = max(1, batches // options["samples"])
+        total_bytes = chunks = 0
+        samples = []
+        for chunk in response.streaming_content:
+            total_bytes += len(chunk)
+            chunks += 1
+            if chunks % every == 0:
+                samples.append(current_rss_mb())
+        response.close()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"streamed {total_bytes / 1e6:.1f} MB in {chunks} chunks, {elapsed:.1f}s "
+            f"({options['rows'] / elapsed:,.0f} rows/s)"
+        )
+        self.stdout.write(f"RSS baseline {baseline:.1f} MB")
+        self.stdout.write("RSS while streaming: " + " ".join(f"{value:.1f}" for value in samples) + " MB")
+        if samples:
+            self.stdout.write(f"RSS growth first->last sample: {samples[-1] - samples[0]:+.1f} MB")
@@ -0,0 +1,89 @@
+# revenue/management/commands/bench_pagination.py
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from revenue.models import Area, ParkingSection, ParkingTicket, Town, Vehicle
+from revenue.views import ParkingTicketViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare offset and keyset pagination of GET /revenue/tickets/ at a deep page (all data rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page", type=int, default=10_000)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                staff = self.seed((options["page"] + 1) * options["page_size"])
+                self.run(staff, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, rows):
+        User = get_user_model()
+        staff = User.objects.create_user("bench-pagination-clerk", password="bench", is_staff=True)
+        section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="bench-pagination-town"), name="bench"), name="P1"
+        )
+        vehicle = Vehicle.objects.create(owner=staff, plate_number="KPG 001A", vehicle_type="saloon")
+        started = time.perf_counter()
+        batch = []
+        for index in range(rows):
+            batch.append(ParkingTicket(
+                vehicle=vehicle, section=section, duration=60, time_unit="minutes", amount=100,
+                plate_number=vehicle.plate_number, plate_normalized="KPG001A", vehicle_type="saloon",
+            ))
+            if len(batch) == 5000:
+                ParkingTicket.objects.bulk_create(batch)
+                batch = []
+        ParkingTicket.objects.bulk_create(batch)
+        self.stdout.write(f"seeded {rows} tickets in {time.perf_counter() - started:.1f}s")
+        return staff
+
+    def run(self, staff, options):
+        factory = APIRequestFactory()
+        size, page = options["page_size"], options["page"]
+        offset = page * size
+        target = ParkingTicket.objects.order_by("-created_at", "-id")[offset - 1]
+
+        keyset_view = ParkingTicketViewSet.as_view({"get": "list"})
+        offset_view = ParkingTicketViewSet.as_view({"get": "list"}, pagination_class=LimitOffsetPagination)
+        cursor = keyset_view.cls.pagination_class().encode_cursor(target, reverse=False)
+        requests = {
+            "offset": (offset_view, {"limit": size, "offset": offset, "ordering": "-created_at,-id"}),
+            "keyset": (keyset_view, {"page_size": size, "cursor": cursor}),
+        }
+
+        results = {}
+        for label, (view, params) in requests.items():
+            timings = []
+            for _ in range(options["repeat"]):
+                request = factory.get("/revenue/tickets/", params, HTTP_HOST="localhost")
+                force_authenticate(request, user=staff)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    timings.append(time.perf_counter() - started)
+                assert response.status_code == 200
+            results[label] = [row["id"] for row in response.data["results"]]
+            self.stdout.write(
+                f"{label:>6} page {page}: median {statistics.median(timings) * 1000:8.2f}ms "
+                f"over {len(queries)} queries"
+            )
+        assert results["offset"] == results["keyset"], "offset and keyset pages differ"
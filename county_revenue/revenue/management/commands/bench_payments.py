@@ -0,0 +1,110 @@
+# revenue/management/commands/bench_payments.py
+import io
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from revenue import payments, reports
+from revenue.models import (
+    Area, ParkingSection, ParkingTicket, PaymentEvent, Permit, PermitType, RevenueRollup, Town, Vehicle,
+    create_permit_types,
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure statement import and payment matching throughput against the fake provider (all data rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--payments", type=int, default=20_000)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                provider_payments = self.seed(options["payments"])
+                self.run(provider_payments, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        """A third each: permit payments, ticket-number payments, plate payments."""
+        create_permit_types()
+        User = get_user_model()
+        owner = User.objects.create_user("bench-payments-owner", password="bench")
+        town = Town.objects.create(name="bench-payments-town")
+        section = ParkingSection.objects.create(area=Area.objects.create(town=town, name="bench"), name="P1")
+        permit_type = PermitType.objects.get(name="Hawking")
+        share = count // 3
+        today = timezone.localdate()
+
+        permits = Permit.objects.bulk_create([
+            Permit(owner=owner, owner_name="Bench Owner", permit_type=permit_type, start_date=today,
+                   end_date=today, duration_months=1, permit_number=f"BENCH-{index:08d}", total_fee=1000)
+            for index in range(share)
+        ], batch_size=2000)
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(owner=owner, plate_number=f"KBP {index:05d}", plate_normalized=f"KBP{index:05d}", vehicle_type="saloon")
+            for index in range(share * 2)
+        ], batch_size=2000)
+        tickets = ParkingTicket.objects.bulk_create([
+            ParkingTicket(vehicle=vehicle, section=section, duration=1, time_unit="hours", amount=100,
+                          plate_number=vehicle.plate_number, plate_normalized=vehicle.plate_number.replace(" ", ""),
+                          vehicle_type="saloon")
+            for vehicle in vehicles
+        ], batch_size=2000)
+        reports.rebuild()
+
+        provider = payments.FakeProvider(seed=1)
+        refs = (
+            [(permit.permit_number, 1000) for permit in permits]
+            + [(f"T{ticket.pk}", 100) for ticket in tickets[:share]]
+            + [(ticket.plate_number, 100) for ticket in tickets[share:]]
+        )
+        return [provider.payment(ref, amount) for ref, amount in refs], provider
+
+    def run(self, seeded, options):
+        provider_payments, provider = seeded
+        statement = io.StringIO()
+        provider.write_statement(statement, provider_payments)
+        statement.seek(0)
+
+        started = time.perf_counter()
+        queued, _, errors = payments.import_statement(statement)
+        elapsed = time.perf_counter() - started
+        assert not errors and queued == len(provider_payments)
+        self.stdout.write(f"import: {queued} rows in {elapsed:.2f}s ({queued / elapsed:,.0f} rows/s)")
+
+        totals = {}
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            while counts := payments.process_pending(options["batch_size"]):
+                for status, count in counts.items():
+                    totals[status] = totals.get(status, 0) + count
+        elapsed = time.perf_counter() - started
+        matched = totals.get(PaymentEvent.MATCHED, 0)
+        self.stdout.write(
+            f"match:  {sum(totals.values())} events in {elapsed:.2f}s "
+            f"({sum(totals.values()) / elapsed:,.0f} events/s, {len(queries)} queries, "
+            f"batch {options['batch_size']}) -> {totals}"
+        )
+        assert matched == len(provider_payments), totals
+
+        live = self.rollups()
+        reports.rebuild()
+        assert live == self.rollups(), "rollups drifted from a full rebuild"
+        self.stdout.write("rollups match a full rebuild")
+
+    @staticmethod
+    def rollups():
+        return set(RevenueRollup.objects.filter(count__gt=0).values_list(
+            "date", "source", "town_name", "area_name", "category", "count", "billed", "collected",
+        ))
@@ -0,0 +1,97 @@
+# revenue/management/commands/bench_pdf.py
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from revenue.pdf import PDFRenderService, html_to_pdf
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Benchmark inline PDF rendering against the pooled render service"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Documents to render per run")
+        parser.add_argument("--concurrency", type=int, default=8, help="Simulated web workers")
+        parser.add_argument("--pool-workers", type=int, default=4, help="Render pool size")
+
+    def handle(self, *args, **options):
+        html = render_to_string("revenue/parking/ticket_pdf.html", {"ticket": {
+            "id": 1, "town_name": "Meru", "area_name": "CBD", "section": {"name": "A1"},
+            "plate_number": "KCB 124B", "duration": 2, "time_unit": "hours",
+            "amount": "120.00", "paid": True,
+        }})
+        total = options["requests"]
+        concurrency = options["concurrency"]
+
+        self.report("inline", *self.run_inline(html, total, concurrency))
+        self.report("pooled", *self.run_pooled(html, total, concurrency, options["pool_workers"]))
+
+    def run_inline(self, html, total, concurrency):
+        """Every simulated web worker renders the PDF itself (the old path)."""
+        latencies = []
+
+        def request():
+            started = time.perf_counter()
+            html_to_pdf(html)
+            latencies.append(time.perf_counter() - started)
+
+        html_to_pdf(html)  # warm up fonts and imports
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as web:
+            list(web.map(lambda _: request(), range(total)))
+        return latencies, latencies, time.perf_counter() - started
+
+    def run_pooled(self, html, total, concurrency, pool_workers):
+        """Web workers enqueue and answer 202; completion is measured on disk."""
+        with tempfile.TemporaryDirectory() as job_dir:
+            service = PDFRenderService(max_workers=pool_workers, inline_threshold=0, job_dir=job_dir)
+            service.submit(html, "warmup.pdf", 0)
+            while service.queue_depth:
+                time.sleep(0.01)
+
+            request_latencies = []
+            submitted = {}
+            lock = threading.Lock()
+
+            def request():
+                started = time.perf_counter()
+                job_id = service.submit(html, "bench.pdf", 0)
+                request_latencies.append(time.perf_counter() - started)
+                with lock:
+                    submitted[job_id] = started
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as web:
+                list(web.map(lambda _: request(), range(total)))
+
+            completion_latencies = []
+            while submitted:
+                for job_id, job_started in list(submitted.items()):
+                    if service.job(job_id)[0] != service.PENDING:
+                        completion_latencies.append(time.perf_counter() - job_started)
+                        del submitted[job_id]
+                time.sleep(0.005)
+            elapsed = time.perf_counter() - started
+            service.executor.shutdown()
+        return request_latencies, completion_latencies, elapsed
+
+    def report(self, label, request_latencies, completion_latencies, elapsed):
+        ms = lambda seconds: f"{seconds * 1000:8.1f}ms"
+        self.stdout.write(
+            f"{label:>7}: worker busy p50 {ms(statistics.median(request_latencies))} "
+            f"p99 {ms(percentile(request_latencies, 99))} | "
+            f"document ready p50 {ms(statistics.median(completion_latencies))} "
+            f"p99 {ms(percentile(completion_latencies, 99))} | "
+            f"{len(completion_latencies) / elapsed:7.1f} docs/s"
+        )
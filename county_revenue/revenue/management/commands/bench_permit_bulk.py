@@ -0,0 +1,62 @@
+# revenue/management/commands/bench_permit_bulk.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from revenue.models import PermitType, create_permit_types
+from revenue.views import PermitViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark POST /api/permits/bulk/ against one POST /api/permits/ per permit (rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        factory = APIRequestFactory()
+        create_view = PermitViewSet.as_view({"post": "create"})
+        bulk_view = PermitViewSet.as_view({"post": "bulk"})
+
+        try:
+            with transaction.atomic():
+                create_permit_types()
+                user = get_user_model().objects.create_user("bench-permit-bulk", password="bench")
+                type_ids = list(PermitType.objects.values_list("pk", flat=True))
+                payload = [
+                    {"permit_type": type_ids[i % len(type_ids)], "duration_days": 2, "duration_months": 3}
+                    for i in range(rows)
+                ]
+
+                def per_object():
+                    for row in payload:
+                        request = factory.post("/api/permits/", row, format="json")
+                        force_authenticate(request, user=user)
+                        assert create_view(request).status_code == 201
+
+                def bulk():
+                    request = factory.post("/api/permits/bulk/", payload, format="json")
+                    force_authenticate(request, user=user)
+                    assert bulk_view(request).status_code == 201
+
+                for label, run in (("per-object", per_object), ("bulk", bulk)):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        run()
+                        elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f"{label:>10}: {rows} permits in {elapsed:7.2f}s "
+                        f"({rows / elapsed:9.1f} permits/s, {len(queries)} queries)"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,97 @@
+# revenue/management/commands/bench_plate_lookup.py
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from revenue.models import Area, ParkingSection, ParkingTicket, Town, Vehicle, normalize_plate
+from revenue.views import PlateStatusAPIView
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Load-test GET /revenue/enforcement/plate/<plate>/ (seeds and removes its own data)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--plates", type=int, default=5000, help="Distinct plates to seed")
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument("--concurrency", type=int, default=8)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        officer = User.objects.create_user("bench-plate-officer", password="bench", role="staff")
+        town = Town.objects.create(name="bench-plate-town")
+        try:
+            section = ParkingSection.objects.create(area=Area.objects.create(town=town, name="bench"), name="B1")
+            plates = [f"KB{index:05d}X" for index in range(options["plates"])]
+            Vehicle.objects.bulk_create(
+                Vehicle(owner=officer, plate_number=plate, plate_normalized=normalize_plate(plate), vehicle_type="saloon") for plate in plates
+            )
+            now = timezone.now()
+            tickets = []
+            for vehicle in Vehicle.objects.filter(owner=officer):
+                ticket = ParkingTicket(vehicle=vehicle, section=section, duration=random.randint(1, 120),
+                                       time_unit="minutes", paid=random.random() < 0.8)
+                ticket.amount = ticket.calculate_amount()
+                ticket.expires_at = now + timedelta(minutes=ticket.duration)
+                ticket.plate_number = vehicle.plate_number
+                ticket.plate_normalized = vehicle.plate_number
+                ticket.vehicle_type = vehicle.vehicle_type
+                tickets.append(ticket)
+            ParkingTicket.objects.bulk_create(tickets, batch_size=1000)
+            self.run(plates, officer, options)
+        finally:
+            town.delete()
+            officer.delete()
+
+    def run(self, plates, officer, options):
+        factory = APIRequestFactory()
+        view = PlateStatusAPIView.as_view()
+
+        def lookup(plate):
+            # Officers type plates loosely: "kb 00042x"
+            typed = f"{plate[:2].lower()} {plate[2:]}"
+            request = factory.get(f"/revenue/enforcement/plate/{typed}/")
+            force_authenticate(request, user=officer)
+            started = time.perf_counter()
+            response = view(request, plate=typed)
+            response.render()
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200
+            return elapsed
+
+        def worker(batch):
+            try:
+                return [lookup(plate) for plate in batch]
+            finally:
+                connection.close()
+
+        for label in ("cold cache", "warm cache"):
+            if label == "cold cache":
+                cache.clear()
+            # The warm run repeats a small set of plates so nearly every lookup is a cache hit
+            pool_of_plates = plates if label == "cold cache" else plates[:200]
+            picks = [random.choice(pool_of_plates) for _ in range(options["requests"])]
+            size = max(1, len(picks) // options["concurrency"])
+            batches = [picks[i:i + size] for i in range(0, len(picks), size)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                latencies = [value for batch in pool.map(worker, batches) for value in batch]
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:>10}: p50 {statistics.median(latencies) * 1000:6.2f}ms "
+                f"p99 {percentile(latencies, 99) * 1000:6.2f}ms "
+                f"{len(latencies) / elapsed:8.0f} req/s"
+            )
@@ -0,0 +1,211 @@
+# revenue/management/commands/bench_servers.py
+import asyncio
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from revenue.models import Area, ParkingSection, PermitType, Town, create_permit_types
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare req/s and tail latency of the async read endpoints under WSGI (gunicorn) and ASGI (uvicorn). "
+        "Either pass --wsgi-url/--asgi-url of running servers or --spawn to start both here. "
+        "Seeds and removes its own data, so run it against a disposable database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi-url", help="e.g. http://127.0.0.1:8001 (gunicorn county_revenue.wsgi)")
+        parser.add_argument("--asgi-url", help="e.g. http://127.0.0.1:8002 (uvicorn county_revenue.asgi:application)")
+        parser.add_argument("--spawn", action="store_true", help="start gunicorn and uvicorn on free local ports")
+        parser.add_argument("--workers", type=int, default=2, help="server processes with --spawn")
+        parser.add_argument("--connections", type=int, default=64, help="concurrent keep-alive clients")
+        parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+
+    def handle(self, *args, **options):
+        targets = {"wsgi": options["wsgi_url"], "asgi": options["asgi_url"]}
+        if not options["spawn"] and not any(targets.values()):
+            raise CommandError("Pass --wsgi-url and/or --asgi-url, or --spawn.")
+
+        servers = []
+        fixture = self.seed()
+        try:
+            if options["spawn"]:
+                targets, servers = self.spawn(options["workers"])
+            paths = self.paths(fixture)
+            headers = {"Authorization": f"Token {fixture['token']}"}
+            self.stdout.write(
+                f"{options['connections']} connections, {options['duration']:.0f}s per endpoint\n"
+                f"{'server':<6} {'endpoint':<44} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+            )
+            for label, base in targets.items():
+                if not base:
+                    continue
+                for path in paths:
+                    result = asyncio.run(self.load(base, path, headers, options["connections"], options["duration"]))
+                    self.report(label, path, result)
+        finally:
+            for process in servers:
+                process.terminate()
+                process.wait(timeout=10)
+            self.cleanup(fixture)
+
+    # ------------------------------
+    # Data
+    # ------------------------------
+    def seed(self):
+        create_permit_types()
+        User = get_user_model()
+        officer = User.objects.create_user("bench-servers-officer", password="bench", role="staff")
+        town = Town.objects.create(name="bench-servers-town")
+        area = Area.objects.create(town=town, name="bench")
+        for index in range(20):
+            Area.objects.create(town=town, name=f"bench-{index}")
+        ParkingSection.objects.bulk_create(
+            ParkingSection(area=area, name=f"S{index}", capacity=10) for index in range(100)
+        )
+        return {"officer": officer, "town": town, "area": area, "token": Token.objects.create(user=officer).key}
+
+    def cleanup(self, fixture):
+        fixture["town"].delete()
+        fixture["officer"].delete()
+
+    def paths(self, fixture):
+        return [
+            "/api/permit-types/",
+            f"/api/permit-types/{PermitType.objects.values_list('pk', flat=True).first()}/",
+            "/revenue/towns/",
+            f"/revenue/towns/{fixture['town'].pk}/areas/?compact=1",
+            f"/revenue/areas/{fixture['area'].pk}/sections/?compact=1",
+            "/revenue/enforcement/plate/KBZ001X/",
+        ]
+
+    # ------------------------------
+    # Servers
+    # ------------------------------
+    def spawn(self, workers):
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        commands = {}
+        for label, executable, args in (
+            ("wsgi", "gunicorn", ["county_revenue.wsgi:application", "--workers", str(workers), "--bind"]),
+            ("asgi", "uvicorn", ["county_revenue.asgi:application", "--workers", str(workers),
+                                 "--no-access-log", "--host", "127.0.0.1", "--port"]),
+        ):
+            if shutil.which(executable) is None:
+                raise CommandError(f"{executable} is not installed (pip install {executable}); "
+                                   f"or start the server yourself and pass --{label}-url.")
+            port = free_port()
+            address = f"127.0.0.1:{port}" if executable == "gunicorn" else str(port)
+            commands[label] = (f"http://127.0.0.1:{port}", [executable, *args, address])
+
+        targets, processes = {}, []
+        for label, (url, command) in commands.items():
+            processes.append(subprocess.Popen(command, env=env, cwd=os.getcwd(), stdout=subprocess.DEVNULL,
+                                              stderr=sys.stderr))
+            targets[label] = url
+        for url in targets.values():
+            self.wait_until_listening(url)
+        return targets, processes
+
+    @staticmethod
+    def wait_until_listening(url, timeout=30):
+        parts = urlsplit(url)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((parts.hostname, parts.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"{url} did not start listening within {timeout}s")
+
+    # ------------------------------
+    # Load
+    # ------------------------------
+    async def load(self, base, path, headers, connections, duration):
+        parts = urlsplit(base)
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nAccept: application/json\r\n"
+            + "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+            + "\r\n"
+        ).encode()
+        latencies, errors = [], 0
+        deadline = time.monotonic() + duration
+
+        async def client():
+            nonlocal errors
+            reader = writer = None
+            while time.monotonic() < deadline:
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+                    started = time.perf_counter()
+                    writer.write(request)
+                    status, keep_alive = await self.read_response(reader)
+                    latencies.append(time.perf_counter() - started)
+                    if status != 200:
+                        errors += 1
+                    if not keep_alive:
+                        writer.close()
+                        writer = None
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    errors += 1
+                    writer = None
+            if writer is not None:
+                writer.close()
+
+        started = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(connections)))
+        return latencies, errors, time.monotonic() - started
+
+    @staticmethod
+    async def read_response(reader):
+        """Status code and keep-alive flag of one HTTP/1.1 response, body discarded."""
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        fields = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                fields[name.strip().lower()] = value.strip().lower()
+        if fields.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(int(fields.get("content-length", 0)))
+        return status, fields.get("connection") != "close"
+
+    def report(self, label, path, result):
+        latencies, errors, elapsed = result
+        if not latencies:
+            self.stdout.write(f"{label:<6} {path:<44} no responses ({errors} errors)")
+            return
+        self.stdout.write(
+            f"{label:<6} {path:<44} {len(latencies) / elapsed:8.0f} "
+            f"{statistics.median(latencies) * 1000:8.2f} {percentile(latencies, 95) * 1000:8.2f} "
+            f"{percentile(latencies, 99) * 1000:8.2f} {errors:7d}"
+        )
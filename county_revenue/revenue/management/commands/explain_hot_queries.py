@@ -0,0 +1,101 @@
+# revenue/management/commands/explain_hot_queries.py
+import re
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from revenue import enforcement, renewals
+from revenue.models import ParkingTicket, Permit, Vehicle
+from revenue.views import ParkingTicketViewSet, PermitViewSet
+
+# Plan lines that read a whole table, per database vendor
+FULL_SCAN = {
+    "sqlite": re.compile(r"\bSCAN (?!.*\bUSING (?:COVERING )?INDEX\b)"),
+    "mysql": re.compile(r"(?<!UNION )\bALL\b|Table scan on"),    # access type ALL; "tree" format
+    "postgresql": re.compile(r"\bSeq Scan on\b"),
+}
+
+
+def hot_queries(user, staff, page_size):
+    """``(label, queryset)`` for the list, lookup and batch queries that run most."""
+    today, now = timezone.localdate(), timezone.now()
+    cursor = now - timedelta(days=1)
+    as_user = {"request": SimpleNamespace(user=user), "kwargs": {}}
+    as_staff = {"request": SimpleNamespace(user=staff), "kwargs": {}}
+    return [
+        ("permit list (trader)", PermitViewSet(**as_user).get_queryset().order_by("-start_date", "-pk")[:page_size]),
+        ("permit list (staff)", PermitViewSet(**as_staff).get_queryset().order_by("-start_date", "-pk")[:page_size]),
+        ("current permits of a trader", Permit.objects.filter(owner=user, end_date__gte=today)),
+        ("unpaid permits expiring within 30 days", Permit.objects.filter(
+            paid=False, end_date__gte=today, end_date__lte=today + timedelta(days=30),
+        ).order_by("end_date")),
+        ("ticket list (driver)",
+         ParkingTicketViewSet(**as_user).get_queryset().order_by("-created_at", "-pk")[:page_size]),
+        # The cursor filter KeysetPagination adds
+        ("ticket list, later page (driver)", ParkingTicketViewSet(**as_user).get_queryset()
+         .filter(created_at__lte=cursor).filter(Q(created_at__lt=cursor) | Q(pk__lt=1000))
+         .order_by("-created_at", "-pk")[:page_size]),
+        ("ticket list (staff)",
+         ParkingTicketViewSet(**as_staff).get_queryset().order_by("-created_at", "-pk")[:page_size]),
+        ("unpaid tickets of the last 7 days", ParkingTicket.objects.filter(
+            paid=False, created_at__gte=now - timedelta(days=7),
+        ).order_by("-created_at")),
+        ("vehicle lookup on ticket purchase", Vehicle.objects.filter(owner=user, plate_normalized="KCB124B")),
+        ("plate status", enforcement.recent_tickets_query("KCB124B")),
+        ("active tickets in a section", ParkingTicket.objects.active().filter(section_id=1).order_by("expires_at")),
+        ("payment match: unpaid tickets by plate",
+         ParkingTicket.objects.filter(plate_normalized__in=["KCB124B"], paid=False)),
+        ("renewal chunk", renewals.expiring(today.year).filter(pk__gt=0).order_by("pk")[:1000]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the database's query plan for the hottest permit, ticket and vehicle queries and flag full "
+        "table scans. Planners pick scans on tiny tables, so run it against realistic data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="username whose lists to explain (default: the first user)")
+        parser.add_argument("--analyze", action="store_true", help="EXPLAIN ANALYZE: run the queries too")
+        parser.add_argument("--fail-on-scan", action="store_true",
+                            help="exit with an error if any plan scans a table, e.g. in CI")
+        parser.add_argument("--only", help="only queries whose label contains this text")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"No user {options['user']!r}.")
+        else:
+            # An unsaved stand-in still gives the planner a concrete owner id
+            user = User.objects.filter(is_staff=False).order_by("pk").first() or User(pk=1)
+        staff = User(pk=user.pk, is_staff=True)
+
+        full_scan = FULL_SCAN.get(connection.vendor)
+        explain_options = {"analyze": True} if options["analyze"] else {}
+        scans = []
+        for label, queryset in hot_queries(user, staff, getattr(settings, "API_PAGE_SIZE", 50)):
+            if options["only"] and options["only"].lower() not in label.lower():
+                continue
+            plan = queryset.explain(**explain_options)
+            scanned = [line for line in plan.splitlines() if full_scan and full_scan.search(line)]
+            if scanned:
+                scans.append(label)
+            flag = self.style.WARNING("  [full scan]") if scanned else ""
+            self.stdout.write(self.style.MIGRATE_HEADING(label) + flag)
+            self.stdout.write(plan + "\n")
+
+        if not scans:
+            self.stdout.write(self.style.SUCCESS("No full table scans."))
+        elif options["fail_on_scan"]:
+            raise CommandError(f"Full table scans in: {', '.join(scans)}")
+        else:
+            self.stdout.write(self.style.WARNING(f"Full table scans in: {', '.join(scans)}"))
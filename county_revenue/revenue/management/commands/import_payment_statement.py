@@ -0,0 +1,32 @@
+# revenue/management/commands/import_payment_statement.py
+import gzip
+
+from django.core.management.base import BaseCommand, CommandError
+
+from revenue import payments
+
+
+class Command(BaseCommand):
+    help = "Queue the payments in a provider statement CSV (.csv or .csv.gz); run process_payments afterwards"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            # Read line by line: daily files can be larger than we want in memory
+            with opener(path, "rt", encoding="utf-8-sig", newline="") as lines:
+                queued, skipped, errors = payments.import_statement(lines, options["chunk_size"])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        for line_number, message in errors[:20]:
+            self.stderr.write(f"line {line_number}: {message}")
+        if len(errors) > 20:
+            self.stderr.write(f"... and {len(errors) - 20} more")
+        self.stdout.write(self.style.SUCCESS(
+            f"Queued {queued} payments ({skipped} rows skipped, {len(errors)} invalid); "
+            "already-queued receipts are ignored"
+        ))
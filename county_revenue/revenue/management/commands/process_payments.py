@@ -0,0 +1,30 @@
+# revenue/management/commands/process_payments.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from revenue import payments
+
+
+class Command(BaseCommand):
+    help = "Match queued payment events to permits and tickets (run from cron, or with --loop as a worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=getattr(settings, "PAYMENT_BATCH_SIZE", 1000))
+        parser.add_argument("--loop", action="store_true", help="keep polling instead of exiting when drained")
+        parser.add_argument("--sleep", type=float, default=2.0, help="seconds between polls with --loop")
+
+    def handle(self, *args, **options):
+        totals = {}
+        while True:
+            counts = payments.process_pending(options["batch_size"])
+            for status, count in counts.items():
+                totals[status] = totals.get(status, 0) + count
+            if counts:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["sleep"])
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(totals.items())) or "nothing queued"
+        self.stdout.write(self.style.SUCCESS(f"Processed payments: {summary}"))
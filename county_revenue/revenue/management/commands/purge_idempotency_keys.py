@@ -0,0 +1,24 @@
+# revenue/management/commands/purge_idempotency_keys.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from revenue.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key records (run periodically, e.g. hourly from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            # Small batches keep each DELETE's locks short
+            batch = list(IdempotencyKey.objects.filter(expires_at__lte=now).values_list("pk", flat=True)
+                         [:options["batch_size"]])
+            if not batch:
+                break
+            deleted += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys"))
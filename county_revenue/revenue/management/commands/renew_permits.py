@@ -0,0 +1,95 @@
+# revenue/management/commands/renew_permits.py
+import multiprocessing
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from revenue import renewals
+from revenue.models import RenewalCheckpoint
+
+
+def work(job):
+    """Renew one checkpoint's range; returns ``(checkpoint_id, renewed, seconds)``."""
+    checkpoint_id, chunk_size, paid_only, verbose = job
+
+    def progress(renewed, seconds):
+        sys.stdout.write(f"  range {checkpoint_id}: {renewed} renewed, {renewed / seconds:.0f} rows/s\n")
+        sys.stdout.flush()
+
+    return (checkpoint_id, *renewals.renew_range(checkpoint_id, chunk_size, paid_only,
+                                                  progress if verbose else None))
+
+
+def work_in_child(job):
+    try:
+        return work(job)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Issue next year's permits for the yearly permits expiring at the end of YEAR. "
+        "Progress is checkpointed per id range, so rerunning resumes where a run stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int, help="renew permits ending on Dec 31 of this year")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="processes, each renewing its own id range (first run of a year only)")
+        parser.add_argument("--range", dest="id_range", metavar="START:END",
+                            help="renew only permit ids START..END, e.g. to spread ranges over machines")
+        parser.add_argument("--chunk-size", type=int, default=getattr(settings, "RENEWAL_CHUNK_SIZE", 1000),
+                            help="permits per transaction")
+        parser.add_argument("--paid-only", action="store_true", help="skip permits with an outstanding balance")
+        parser.add_argument("--reset", action="store_true",
+                            help="forget this year's checkpoints first, e.g. for another pass after --paid-only")
+
+    def handle(self, *args, **options):
+        year = options["year"]
+        if options["workers"] > 1 and not connection.features.has_select_for_update:
+            raise CommandError("This database cannot lock rows for parallel workers (SQLite); use --workers 1.")
+        if options["reset"]:
+            RenewalCheckpoint.objects.filter(year=year).delete()
+
+        if options["id_range"]:
+            try:
+                start, end = (int(value) for value in options["id_range"].split(":"))
+            except ValueError:
+                raise CommandError("--range must look like START:END, e.g. 1:50000")
+            checkpoint, _ = RenewalCheckpoint.objects.get_or_create(year=year, range_start=start, range_end=end)
+            checkpoints = [checkpoint]
+        else:
+            checkpoints = renewals.plan(year, options["workers"], options["paid_only"])
+
+        pending = [checkpoint for checkpoint in checkpoints if not checkpoint.finished_at]
+        if not pending:
+            self.stdout.write(f"Nothing left to renew for {year}.")
+            return
+        for checkpoint in pending:
+            self.stdout.write(f"range {checkpoint.pk}: ids {checkpoint.range_start}-{checkpoint.range_end}, "
+                              f"resuming after {checkpoint.last_pk or 'start'}")
+
+        jobs = [(checkpoint.pk, options["chunk_size"], options["paid_only"], options["verbosity"] > 1)
+                for checkpoint in pending]
+        workers = min(options["workers"], len(jobs))
+        started = time.perf_counter()
+        if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # Children must not share the parent's database connections
+            connections.close_all()
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                results = pool.map(work_in_child, jobs, chunksize=1)
+        else:
+            results = [work(job) for job in jobs]
+
+        total, wall = 0, time.perf_counter() - started
+        for checkpoint_id, renewed, seconds in results:
+            total += renewed
+            rate = renewed / seconds if seconds else 0
+            self.stdout.write(f"range {checkpoint_id}: {renewed} renewed in {seconds:.1f}s ({rate:.0f} rows/s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Renewed {total} permits for {year + 1} in {wall:.1f}s ({total / wall if wall else 0:.0f} rows/s)"
+        ))
@@ -0,0 +1,70 @@
+# revenue/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+
+from .replicas import pin_to_primary
+
+
+class ASGIURLConfMiddleware:
+    """
+    Resolves requests served over ASGI against ``ASGI_ROOT_URLCONF``, which
+    puts the async views (revenue/async_views.py) in front of the DRF ones.
+    WSGI requests keep ``ROOT_URLCONF``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, "ASGI_ROOT_URLCONF", None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.urlconf:
+            request.urlconf = self.urlconf
+        return await self.get_response(request)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a user's reads to the primary for ``REPLICA_PIN_SECONDS`` after a
+    successful write request, with a signed cookie on the response and a
+    cache entry (see revenue/replicas.py). Put it after
+    ``AuthenticationMiddleware``; DRF's token users are seen too, as DRF
+    sets ``request.user`` on the underlying request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.record(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            await sync_to_async(self.record)(request, response)
+        return response
+
+    @staticmethod
+    def record(request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.pk, response=response)
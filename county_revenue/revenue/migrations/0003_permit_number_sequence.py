@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revenue', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PermitNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+                ('permit_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='number_sequences', to='revenue.permittype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('permit_type', 'year'), name='unique_permit_sequence_per_year')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:30
+
+from datetime import timedelta
+
+from django.db import migrations, models, transaction
+
+BACKFILL_BATCH_SIZE = 5000
+
+TIME_UNIT_DELTAS = {
+    "minutes": timedelta(minutes=1),
+    "hours": timedelta(hours=1),
+    "days": timedelta(days=1),
+}
+
+
+def backfill_expires_at(apps, schema_editor):
+    """Fill expires_at in primary-key batches, committing each batch separately."""
+    ParkingTicket = apps.get_model('revenue', 'ParkingTicket')
+    db = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        batch = list(
+            ParkingTicket.objects.using(db)
+            .filter(pk__gt=last_pk, expires_at__isnull=True)
+            .order_by('pk')
+            .only('id', 'created_at', 'duration', 'time_unit')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for ticket in batch:
+            ticket.expires_at = ticket.created_at + TIME_UNIT_DELTAS.get(ticket.time_unit, timedelta(0)) * ticket.duration
+        with transaction.atomic(using=db):
+            ParkingTicket.objects.using(db).bulk_update(batch, ['expires_at'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own so large tables are not locked for the whole run
+    atomic = False
+
+    dependencies = [
+        ('revenue', '0003_permit_number_sequence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingticket',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='parkingticket',
+            index=models.Index(fields=['section', 'expires_at'], name='ticket_section_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from django.db import migrations, models, transaction
+
+BACKFILL_BATCH_SIZE = 5000
+
+
+def normalize_plate(plate):
+    return "".join(char for char in (plate or "") if char.isalnum()).upper()
+
+
+def backfill_plate_normalized(apps, schema_editor):
+    """Fill plate_normalized in primary-key batches, committing each batch separately."""
+    ParkingTicket = apps.get_model('revenue', 'ParkingTicket')
+    db = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        batch = list(
+            ParkingTicket.objects.using(db)
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('id', 'plate_number')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for ticket in batch:
+            ticket.plate_normalized = normalize_plate(ticket.plate_number)
+        with transaction.atomic(using=db):
+            ParkingTicket.objects.using(db).bulk_update(batch, ['plate_normalized'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('revenue', '0004_parkingticket_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingticket',
+            name='plate_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(backfill_plate_normalized, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='parkingticket',
+            index=models.Index(fields=['plate_normalized', 'expires_at'], name='ticket_plate_norm_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revenue', '0005_parkingticket_plate_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(choices=[('permit', 'Permit'), ('ticket', 'Parking Ticket')], max_length=10)),
+                ('town_name', models.CharField(blank=True, default='', max_length=100)),
+                ('area_name', models.CharField(blank=True, default='', max_length=100)),
+                ('category', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('billed', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'source', 'town_name', 'area_name', 'category'), name='unique_revenue_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revenue', '0006_revenue_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parkingticket',
+            index=models.Index(fields=['created_at', 'id'], name='ticket_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='permit',
+            index=models.Index(fields=['start_date', 'id'], name='permit_start_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='permit',
+            index=models.Index(fields=['owner', 'start_date', 'id'], name='permit_owner_start_id_idx'),
+        ),
+    ]
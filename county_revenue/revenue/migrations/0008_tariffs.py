@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:46
+
+from datetime import date
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The rates that used to be hard-coded in ParkingTicket.calculate_amount()
+HOURLY_RATES = {
+    'saloon': Decimal('60'),
+    'van': Decimal('100'),
+    'bus_lorry': Decimal('140'),
+    'truck_tanker': Decimal('180'),
+}
+RATES_EFFECTIVE_FROM = date(2000, 1, 1)
+MONTHLY_CAP = Decimal('2400')
+
+
+def seed_tariffs(apps, schema_editor):
+    """Move the inlined tariffs into the new tables."""
+    PermitType = apps.get_model('revenue', 'PermitType')
+    VehicleRate = apps.get_model('revenue', 'VehicleRate')
+    db = schema_editor.connection.alias
+    # calculate_fee() capped every monthly permit at 2400
+    PermitType.objects.using(db).filter(is_monthly=True).update(monthly_cap=MONTHLY_CAP)
+    VehicleRate.objects.using(db).bulk_create([
+        VehicleRate(vehicle_type=vehicle_type, effective_from=RATES_EFFECTIVE_FROM, hourly_rate=rate)
+        for vehicle_type, rate in HOURLY_RATES.items()
+    ])
+
+
+def unseed_tariffs(apps, schema_editor):
+    apps.get_model('revenue', 'VehicleRate').objects.using(schema_editor.connection.alias).filter(
+        effective_from=RATES_EFFECTIVE_FROM, vehicle_type__in=HOURLY_RATES,
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revenue', '0007_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='permittype',
+            name='monthly_cap',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='VehicleRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vehicle_type', models.CharField(choices=[('saloon', 'Saloon Car'), ('van', 'Van'), ('bus_lorry', 'Bus / Small Lorry'), ('truck_tanker', 'Truck / Tanker')], max_length=40)),
+                ('effective_from', models.DateField()),
+                ('hourly_rate', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('vehicle_type', 'effective_from'), name='unique_vehicle_rate_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PermitTariff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_from', models.DateField()),
+                ('registration_fee', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('annual_fee', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('monthly_fee', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('daily_fee', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('monthly_cap', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('permit_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tariffs', to='revenue.permittype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('permit_type', 'effective_from'), name='unique_permit_tariff_date')],
+            },
+        ),
+        migrations.RunPython(seed_tariffs, unseed_tariffs),
+    ]
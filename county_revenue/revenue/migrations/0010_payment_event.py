@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revenue', '0009_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider_ref', models.CharField(max_length=64, unique=True)),
+                ('account_ref', models.CharField(blank=True, max_length=64)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('msisdn', models.CharField(blank=True, max_length=20)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('source', models.CharField(choices=[('callback', 'Callback'), ('statement', 'Statement file')], max_length=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('matched', 'Matched'), ('unmatched', 'Unmatched'), ('review', 'Needs review')], default='pending', max_length=10)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('permit', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='revenue.permit')),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='revenue.parkingticket')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='payment_status_idx')],
+            },
+        ),
+    ]
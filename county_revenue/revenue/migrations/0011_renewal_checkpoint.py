@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revenue', '0010_payment_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenewalCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField()),
+                ('range_start', models.PositiveBigIntegerField()),
+                ('range_end', models.PositiveBigIntegerField()),
+                ('last_pk', models.PositiveBigIntegerField(default=0)),
+                ('renewed_count', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'range_start', 'range_end'), name='unique_renewal_range')],
+            },
+        ),
+    ]
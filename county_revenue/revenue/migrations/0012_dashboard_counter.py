@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('revenue', '0011_renewal_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('permit', 'Permit'), ('ticket', 'Parking Ticket')], max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('paid', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'expires_at', 'paid'), name='unique_dashboard_counter')],
+            },
+        ),
+    ]
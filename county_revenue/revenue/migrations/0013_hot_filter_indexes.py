@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from revenue.operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+    # Indexes build while the tables stay writable (see revenue/operations.py)
+    atomic = False
+
+    dependencies = [
+        ('revenue', '0012_dashboard_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='parkingticket',
+            index=models.Index(fields=['vehicle', 'created_at', 'id'], name='ticket_vehicle_created_id_idx'),
+        ),
+        AddIndexOnline(
+            model_name='permit',
+            index=models.Index(fields=['owner', 'end_date'], name='permit_owner_end_idx'),
+        ),
+        AddIndexOnline(
+            model_name='permit',
+            index=models.Index(fields=['end_date', 'id'], name='permit_end_id_idx'),
+        ),
+        # The composite indexes above lead with these foreign keys, which
+        # makes their single-column indexes redundant
+        migrations.AlterField(
+            model_name='parkingticket',
+            name='vehicle',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='revenue.vehicle'),
+        ),
+        migrations.AlterField(
+            model_name='permit',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:32
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models import Count, Min
+
+BACKFILL_BATCH_SIZE = 5000
+DEDUPE_BATCH_SIZE = 500
+
+
+def normalize_plate(plate):
+    return "".join(char for char in (plate or "") if char.isalnum()).upper()
+
+
+def backfill_plate_normalized(apps, schema_editor):
+    """Fill plate_normalized in primary-key batches, committing each batch separately."""
+    Vehicle = apps.get_model('revenue', 'Vehicle')
+    db = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        batch = list(
+            Vehicle.objects.using(db)
+            .filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('id', 'plate_number')[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for vehicle in batch:
+            vehicle.plate_normalized = normalize_plate(vehicle.plate_number)
+        with transaction.atomic(using=db):
+            Vehicle.objects.using(db).bulk_update(batch, ['plate_normalized'])
+        last_pk = batch[-1].pk
+
+
+def merge_duplicate_vehicles(apps, schema_editor):
+    """
+    Keep the oldest vehicle per owner and normalized plate, move the
+    others' tickets onto it and delete them, a batch of plates per
+    transaction.
+    """
+    Vehicle = apps.get_model('revenue', 'Vehicle')
+    ParkingTicket = apps.get_model('revenue', 'ParkingTicket')
+    db = schema_editor.connection.alias
+    while True:
+        groups = list(
+            Vehicle.objects.using(db)
+            .values('owner_id', 'plate_normalized')
+            .annotate(keep=Min('id'), n=Count('id'))
+            .filter(n__gt=1)
+            .order_by('keep')[:DEDUPE_BATCH_SIZE]
+        )
+        if not groups:
+            break
+        with transaction.atomic(using=db):
+            for group in groups:
+                duplicates = list(
+                    Vehicle.objects.using(db)
+                    .filter(owner_id=group['owner_id'], plate_normalized=group['plate_normalized'])
+                    .exclude(pk=group['keep'])
+                    .values_list('id', flat=True)
+                )
+                ParkingTicket.objects.using(db).filter(vehicle_id__in=duplicates).update(vehicle_id=group['keep'])
+                Vehicle.objects.using(db).filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('revenue', '0013_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='plate_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(backfill_plate_normalized, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicate_vehicles, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vehicle',
+            constraint=models.UniqueConstraint(fields=('owner', 'plate_normalized'), name='unique_vehicle_plate_per_owner'),
+        ),
+    ]
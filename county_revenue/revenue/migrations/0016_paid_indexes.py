@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+from revenue.operations import AddIndexOnline
+
+
+class Migration(migrations.Migration):
+    # Indexes build while the tables stay writable (see revenue/operations.py)
+    atomic = False
+
+    dependencies = [
+        ('revenue', '0015_cache_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='parkingticket',
+            index=models.Index(fields=['paid', 'created_at'], name='ticket_paid_created_idx'),
+        ),
+        AddIndexOnline(
+            model_name='permit',
+            index=models.Index(fields=['paid', 'end_date'], name='permit_paid_end_idx'),
+        ),
+    ]
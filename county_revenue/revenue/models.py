@@ -1,9 +1,76 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from decimal import Decimal
 from datetime import date, timedelta
-import uuid
 from django.conf import settings
+from django.utils import timezone
 from decimal import Decimal, ROUND_HALF_UP
+
+from .permit_numbers import get_permit_number_allocator
+from .tariffs import base_permit_rates, get_tariffs
+
+
+# ------------------------------
+# Change tracking
+# ------------------------------
+class TrackedFieldsMixin:
+    """
+    Remembers the field values an instance was loaded (or last saved) with,
+    so save hooks can tell which columns a save actually changed.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        # The refreshed columns are what the row holds now; a stale snapshot
+        # would make the next save re-apply another writer's change
+        refreshed = {
+            f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields
+            if (f.attname not in deferred if fields is None else f.attname in fields or f.name in fields)
+        }
+        self._loaded_values = {**(getattr(self, "_loaded_values", None) or {}), **refreshed}
+
+    def has_changed(self, field_names):
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return True
+        return any(
+            name not in loaded or loaded[name] is models.DEFERRED or loaded[name] != getattr(self, name)
+            for name in field_names
+        )
+
+    def changed_fields(self):
+        """
+        Fields whose value differs from the snapshot, fields set after being
+        deferred at load time (``only()``/``defer()``), plus auto_now fields.
+        """
+        loaded = self._loaded_values
+        return [
+            f.attname for f in self._meta.concrete_fields
+            if not f.primary_key and f.attname in self.__dict__ and (
+                loaded.get(f.attname, models.DEFERRED) is models.DEFERRED
+                or getattr(f, "auto_now", False) or loaded[f.attname] != getattr(self, f.attname)
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        # Updates of loaded rows write only the columns that changed. With none
+        # changed it is a full save: update_fields=[] would skip it and post_save.
+        if not args and not self._state.adding and getattr(self, "_loaded_values", None) is not None \
+                and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = self.changed_fields() or None
+        super().save(*args, **kwargs)
+        self._loaded_values = {
+            f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields
+            if f.attname in self.__dict__
+        }
+
+
 # ------------------------------
 # Permit Type
 # ------------------------------
@@ -16,17 +83,46 @@ class PermitType(models.Model):
     is_yearly = models.BooleanField(default=False)
     is_monthly = models.BooleanField(default=False)
     is_daily = models.BooleanField(default=False)
+    # Most a monthly permit can cost, whatever its duration (blank = no cap)
+    monthly_cap = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
     def __str__(self):
         return self.name
 
 
+class PermitTariff(models.Model):
+    """Fees for a permit type from ``effective_from`` on, replacing the PermitType's own."""
+    permit_type = models.ForeignKey(PermitType, on_delete=models.CASCADE, related_name="tariffs")
+    effective_from = models.DateField()
+    registration_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    annual_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    monthly_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    daily_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    monthly_cap = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["permit_type", "effective_from"], name="unique_permit_tariff_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.permit_type.name} from {self.effective_from}"
+
+
 # ------------------------------
 # Permit
 # ------------------------------
-class Permit(models.Model):
+class Permit(TrackedFieldsMixin, models.Model):
+    # Values rendered into permit_pdf.html; changing one invalidates the cached PDF
+    PDF_TEMPLATE = "revenue/permit/permit_pdf.html"
+    PDF_FIELDS = (
+        "permit_number", "owner_name", "permit_type_id", "start_date",
+        "end_date", "total_fee", "amount_paid", "paid",
+    )
+
     permit_type = models.ForeignKey(PermitType, on_delete=models.CASCADE)
-    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Indexed by the (owner, ...) indexes below
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     owner_name = models.CharField(max_length=200)
     permit_number = models.CharField(max_length=20, unique=True, blank=True)
     start_date = models.DateField(default=date.today)
@@ -46,51 +142,155 @@ class Permit(models.Model):
 
     notes = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the permit list (pagination.py)
+            models.Index(fields=["start_date", "id"], name="permit_start_id_idx"),
+            models.Index(fields=["owner", "start_date", "id"], name="permit_owner_start_id_idx"),
+            # A trader's current permits
+            models.Index(fields=["owner", "end_date"], name="permit_owner_end_idx"),
+            # Expiry ranges (renewal chunks in id order)
+            models.Index(fields=["end_date", "id"], name="permit_end_id_idx"),
+            # Unpaid permits by expiry. MySQL seeks it with ``paid = false``; SQLite, where
+            # Django filters booleans as ``NOT paid``, falls back to permit_end_id_idx
+            models.Index(fields=["paid", "end_date"], name="permit_paid_end_idx"),
+        ]
+
+    def pdf_cache_values(self):
+        return [getattr(self, name) for name in self.PDF_FIELDS] + [self.permit_type.name]
+
     def calculate_fee(self):
         """
-        Calculates the total fee based on permit type.
+        Calculates the total fee from the tariff in effect on the start date
+        (yearly: registration + pro-rated annual fee, monthly: capped, daily).
         """
-        # Yearly permits
-        if self.permit_type.is_yearly:
-            remaining_months = 12 - self.start_date.month + 1
-            monthly_portion = self.permit_type.annual_fee / 12
-            return self.permit_type.registration_fee + (monthly_portion * remaining_months)
+        try:
+            return get_tariffs().permit_fee(
+                self.permit_type_id, self.start_date, self.duration_days, self.duration_months
+            )
+        except KeyError:
+            # Permit type created in this transaction, not compiled yet
+            return base_permit_rates(self.permit_type).fee(
+                self.start_date, self.duration_days, self.duration_months
+            )
+
+    def normalize_durations(self):
+        """Keep only the duration field that applies to the permit type."""
+        if self.permit_type.is_monthly:
+            self.duration_months = self.duration_months or 1
+            self.duration_days = None
+        elif self.permit_type.is_daily:
+            self.duration_days = self.duration_days or 1
+            self.duration_months = None
+        elif self.permit_type.is_yearly:
+            self.duration_days = None
+            self.duration_months = None
 
-        # Monthly permits (Hawking, capped at 2400)
+    def calculate_end_date(self):
+        """
+        Calculates the last valid day based on permit type.
+        """
+        if self.permit_type.is_yearly:
+            return date(self.start_date.year, 12, 31)
         elif self.permit_type.is_monthly:
             months = self.duration_months or 1
-            fee = self.permit_type.monthly_fee * months
-            return min(fee, Decimal(2400))
-
-        # Daily permits (Alcohol Special Event)
+            return self.start_date + timedelta(days=30 * months - 1)
         elif self.permit_type.is_daily:
             days = self.duration_days or 1
-            return self.permit_type.daily_fee * days
+            return self.start_date + timedelta(days=days - 1)
+        return self.end_date
 
-        return Decimal(0)
-
-    def save(self, *args, **kwargs):
+    def assign_permit_number(self):
         # Assign unique permit number if not already assigned
         if not self.permit_number:
-            self.permit_number = str(uuid.uuid4()).split('-')[0].upper()
+            self.permit_number = get_permit_number_allocator().allocate(self)
+            return True
+        return False
 
-        # Calculate total fee
+    def save(self, *args, **kwargs):
+        self.normalize_durations()
+        auto_number = self.assign_permit_number()
         self.total_fee = self.calculate_fee()
+        self.end_date = self.calculate_end_date()
+        if not auto_number:
+            # Atomic so post_save bookkeeping (rollups, counters) commits with the row
+            with transaction.atomic():
+                return super().save(*args, **kwargs)
+
+        # Retry with a fresh number if the allocated one is already taken
+        allocator = get_permit_number_allocator()
+        for attempt in range(allocator.max_attempts):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = self.permit_number
+                if attempt + 1 == allocator.max_attempts or \
+                        not Permit.objects.filter(permit_number=taken).exists():
+                    raise
+                allocator.collided(self, taken)
+                self.permit_number = allocator.allocate(self)
+
+    @classmethod
+    def bulk_issue(cls, permits, batch_size=500):
+        """
+        Insert many unsaved permits in one transaction. Each permit must carry
+        its ``permit_type`` instance already, so pricing needs no queries, and
+        fee/end date are computed once per distinct pricing input. No signals
+        are sent; rollups and dashboard counters are updated here instead.
+        """
+        from . import dashboard, reports    # both import this module
+
+        pricing = {}
+        auto_numbered = []
+        for permit in permits:
+            permit.normalize_durations()
+            key = (permit.permit_type.pk, permit.start_date, permit.duration_days, permit.duration_months)
+            if key not in pricing:
+                pricing[key] = (permit.calculate_fee(), permit.calculate_end_date())
+            permit.total_fee, permit.end_date = pricing[key]
+            if permit.assign_permit_number():
+                auto_numbered.append(permit)
+
+        allocator = get_permit_number_allocator()
+        with transaction.atomic():
+            for attempt in range(allocator.max_attempts):
+                try:
+                    with transaction.atomic():
+                        created = cls.objects.bulk_create(permits, batch_size=batch_size)
+                        reports.record_bulk_create(created)
+                        dashboard.record_bulk_create(created)
+                        return created
+                except IntegrityError:
+                    numbers = [permit.permit_number for permit in auto_numbered]
+                    taken = set(cls.objects.filter(permit_number__in=numbers).values_list("permit_number", flat=True))
+                    if attempt + 1 == allocator.max_attempts or not taken:
+                        raise
+                    for permit in auto_numbered:
+                        if permit.permit_number in taken:
+                            allocator.collided(permit, permit.permit_number)
+                            permit.permit_number = allocator.allocate(permit)
 
-        # Set end_date based on permit type
-        if self.permit_type.is_yearly:
-            self.end_date = date(self.start_date.year, 12, 31)
-        elif self.permit_type.is_monthly:
-            months = self.duration_months or 1
-            self.end_date = self.start_date + timedelta(days=30 * months - 1)
-        elif self.permit_type.is_daily:
-            days = self.duration_days or 1
-            self.end_date = self.start_date + timedelta(days=days - 1)
+    def __str__(self):
+        return f"{self.owner_name} - {self.permit_type.name} ({self.permit_number})"
 
-        super().save(*args, **kwargs)
+
+# ------------------------------
+# Permit number sequences
+# ------------------------------
+class PermitNumberSequence(models.Model):
+    """Next unreserved sequence value per permit type and year (see permit_numbers.py)."""
+    permit_type = models.ForeignKey(PermitType, on_delete=models.CASCADE, related_name="number_sequences")
+    year = models.PositiveIntegerField()
+    next_value = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["permit_type", "year"], name="unique_permit_sequence_per_year"),
+        ]
 
     def __str__(self):
-        return f"{self.owner_name} - {self.permit_type.name} ({self.permit_number})"
+        return f"{self.permit_type.name} {self.year}: {self.next_value}"
 
 
 # ------------------------------
@@ -101,7 +301,7 @@ def create_permit_types():
         {"name": "Large Business", "annual_fee": 40000, "registration_fee": 3000, "is_yearly": True},
         {"name": "Small Business", "annual_fee": 12000, "registration_fee": 3000, "is_yearly": True},
         {"name": "Market Stall", "annual_fee": 17000, "registration_fee": 3000, "is_yearly": True},
-        {"name": "Hawking", "monthly_fee": 200, "is_monthly": True},
+        {"name": "Hawking", "monthly_fee": 200, "monthly_cap": 2400, "is_monthly": True},
         {"name": "Alcohol On-Sale", "annual_fee": 27000, "registration_fee": 3000, "is_yearly": True},
         {"name": "Alcohol Off-Sale", "annual_fee": 17000, "registration_fee": 3000, "is_yearly": True},
         {"name": "Alcohol Special Event", "daily_fee": 3000, "is_daily": True},
@@ -145,6 +345,11 @@ class ParkingSection(models.Model):
 # ------------------------------
 # Vehicle
 # ------------------------------
+def normalize_plate(plate):
+    """Canonical plate for lookups: "kcb 124b" and "KCB-124B" both become "KCB124B"."""
+    return "".join(char for char in (plate or "") if char.isalnum()).upper()
+
+
 class Vehicle(models.Model):
     VEHICLE_CHOICES = [
         ("saloon", "Saloon Car"),
@@ -155,21 +360,69 @@ class Vehicle(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="vehicles")
     plate_number = models.CharField(max_length=40)
     vehicle_type = models.CharField(max_length=40, choices=VEHICLE_CHOICES)
+    plate_normalized = models.CharField(max_length=40, blank=True, default="", editable=False)
+
+    class Meta:
+        constraints = [
+            # One vehicle per plate and owner, however the plate is typed; also the ticket purchase lookup
+            models.UniqueConstraint(fields=["owner", "plate_normalized"], name="unique_vehicle_plate_per_owner"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.plate_normalized = normalize_plate(self.plate_number)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.plate_number} ({self.get_vehicle_type_display()})"
 
+
+class VehicleRate(models.Model):
+    """Hourly parking rate for a vehicle class from ``effective_from`` on."""
+    vehicle_type = models.CharField(max_length=40, choices=Vehicle.VEHICLE_CHOICES)
+    effective_from = models.DateField()
+    hourly_rate = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["vehicle_type", "effective_from"], name="unique_vehicle_rate_date"),
+        ]
+
+    def __str__(self):
+        return f"{self.vehicle_type} {self.hourly_rate}/h from {self.effective_from}"
+
 # ------------------------------
 # Parking Ticket
 # ------------------------------
-class ParkingTicket(models.Model):
+class ParkingTicketQuerySet(models.QuerySet):
+    def active(self, at=None):
+        """Tickets whose paid time has not run out (uses the expires_at indexes)."""
+        return self.filter(expires_at__gt=at or timezone.now())
+
+    def expired(self, at=None):
+        return self.filter(expires_at__lte=at or timezone.now())
+
+
+class ParkingTicket(TrackedFieldsMixin, models.Model):
+    # Values rendered into ticket_pdf.html; changing one invalidates the cached PDF
+    PDF_TEMPLATE = "revenue/parking/ticket_pdf.html"
+    PDF_FIELDS = (
+        "id", "town_name", "area_name", "section_id", "plate_number",
+        "duration", "time_unit", "amount", "paid", "created_at",
+    )
+
     TIME_UNIT_CHOICES = [
         ("minutes", "Minutes"),
         ("hours", "Hours"),
         ("days", "Days"),
     ]
-
-    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE)
+    TIME_UNIT_DELTAS = {
+        "minutes": timedelta(minutes=1),
+        "hours": timedelta(hours=1),
+        "days": timedelta(days=1),
+    }
+
+    # Indexed by ticket_vehicle_created_id_idx
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, db_index=False)
     section = models.ForeignKey(ParkingSection, on_delete=models.CASCADE)
     custom_place = models.CharField(max_length=255, blank=True, null=True)
     duration = models.PositiveIntegerField()
@@ -186,37 +439,226 @@ class ParkingTicket(models.Model):
     # Add timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(null=True, blank=True, editable=False)
+    plate_normalized = models.CharField(max_length=40, blank=True, default="", editable=False)
+
+    objects = ParkingTicketQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Per-section active counts and officer plate lookups
+            models.Index(fields=["section", "expires_at"], name="ticket_section_expiry_idx"),
+            models.Index(fields=["plate_normalized", "expires_at"], name="ticket_plate_norm_expiry_idx"),
+            # Keyset pagination of the ticket list (pagination.py)
+            models.Index(fields=["created_at", "id"], name="ticket_created_id_idx"),
+            # Unpaid tickets by purchase time (MySQL; SQLite uses ticket_created_id_idx)
+            models.Index(fields=["paid", "created_at"], name="ticket_paid_created_idx"),
+            # A driver's ticket list, joined through their vehicles: a range per vehicle on deep pages
+            models.Index(fields=["vehicle", "created_at", "id"], name="ticket_vehicle_created_id_idx"),
+        ]
+
+    def pdf_cache_values(self):
+        return [getattr(self, name) for name in self.PDF_FIELDS] + [self.section.name]
+
+    def calculate_expiry(self):
+        """When the paid parking time runs out."""
+        start = self.created_at or timezone.now()
+        return start + self.TIME_UNIT_DELTAS.get(self.time_unit, timedelta(0)) * self.duration
+
+    def tariff_date(self):
+        """Parking is priced at the rate in effect on the day the ticket was bought."""
+        return timezone.localdate(self.created_at) if self.created_at else timezone.localdate()
 
     def calculate_amount(self):
-        VEHICLE_RATES = {
-            "saloon": Decimal("60"),
-            "van": Decimal("100"),
-            "bus_lorry": Decimal("140"),
-            "truck_tanker": Decimal("180"),
-        }
-        rate = VEHICLE_RATES.get(self.vehicle.vehicle_type, Decimal(0))
-
-        if self.time_unit == "minutes":
-            amount = rate / Decimal(60) * Decimal(self.duration)
-        elif self.time_unit == "hours":
-            amount = rate * Decimal(self.duration)
-        elif self.time_unit == "days":
-            amount = rate * Decimal(24) * Decimal(self.duration)
-        else:
-            amount = Decimal(0)
-
-        # Round to 2 decimal places
-        return amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        # Hourly VehicleRate scaled to the time unit, rounded to 2 decimal places
+        return get_tariffs().parking_amount(
+            self.vehicle.vehicle_type, self.duration, self.time_unit, self.tariff_date()
+        )
 
     def save(self, *args, **kwargs):
         self.amount = self.calculate_amount()
+        self.expires_at = self.calculate_expiry()
         if self.vehicle:
             self.plate_number = self.vehicle.plate_number
             self.vehicle_type = self.vehicle.vehicle_type
+        self.plate_normalized = normalize_plate(self.plate_number)
         if self.section:
             self.town_name = self.section.area.town.name
             self.area_name = self.section.area.name
-        super().save(*args, **kwargs)
+        # Atomic so post_save bookkeeping (rollups, counters) commits with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.plate_number} - {self.section.name} ({self.duration} {self.time_unit})"
+
+
+# ------------------------------
+# Revenue rollups
+# ------------------------------
+class RevenueRollup(models.Model):
+    """
+    Daily revenue totals, kept current by signals (see reports.py) and
+    rebuilt by ``manage.py rebuild_revenue_rollups``.
+    """
+    SOURCE_CHOICES = [
+        ("permit", "Permit"),
+        ("ticket", "Parking Ticket"),
+    ]
+
+    date = models.DateField()
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    town_name = models.CharField(max_length=100, blank=True, default="")
+    area_name = models.CharField(max_length=100, blank=True, default="")
+    # Permit type name for permits, vehicle type for tickets
+    category = models.CharField(max_length=100)
+
+    count = models.IntegerField(default=0)
+    billed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "source", "town_name", "area_name", "category"], name="unique_revenue_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.source} {self.category}: {self.billed}"
+
+
+# ------------------------------
+# Dashboard counters
+# ------------------------------
+class DashboardCounter(models.Model):
+    """
+    How many permits or tickets with one paid state stop being active at
+    ``expires_at``, kept current by signals (see dashboard.py). Only sums
+    matter: reconciliation merges old buckets.
+    """
+    source = models.CharField(max_length=10, choices=RevenueRollup.SOURCE_CHOICES)
+    expires_at = models.DateTimeField()
+    paid = models.BooleanField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["source", "expires_at", "paid"], name="unique_dashboard_counter"),
+        ]
+
+    def __str__(self):
+        return f"{self.source} expiring {self.expires_at} paid={self.paid}: {self.count}"
+
+
+# ------------------------------
+# Idempotency keys
+# ------------------------------
+class IdempotencyKey(models.Model):
+    """
+    A client-supplied Idempotency-Key and the response it produced (see
+    idempotency.py). ``status_code`` is empty while the first request runs.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_keys")
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key_per_user"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key} ({self.status_code or 'pending'})"
+
+
+# ------------------------------
+# Payments
+# ------------------------------
+class PaymentEvent(models.Model):
+    """
+    One payment reported by the provider, by callback or in a statement
+    file. Rows queue up as ``pending`` and the reconciliation worker
+    (payments.py) matches them to a permit or ticket.
+    """
+    SOURCE_CHOICES = [
+        ("callback", "Callback"),
+        ("statement", "Statement file"),
+    ]
+    PENDING, MATCHED, UNMATCHED, REVIEW = "pending", "matched", "unmatched", "review"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (MATCHED, "Matched"),
+        (UNMATCHED, "Unmatched"),
+        (REVIEW, "Needs review"),
+    ]
+
+    provider_ref = models.CharField(max_length=64, unique=True)    # e.g. M-Pesa TransID
+    account_ref = models.CharField(max_length=64, blank=True)      # what the payer typed as account
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    msisdn = models.CharField(max_length=20, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    note = models.CharField(max_length=200, blank=True)
+    permit = models.ForeignKey(Permit, on_delete=models.SET_NULL, null=True, blank=True, related_name="payments")
+    ticket = models.ForeignKey(ParkingTicket, on_delete=models.SET_NULL, null=True, blank=True, related_name="payments")
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker's queue scan
+            models.Index(fields=["status", "id"], name="payment_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.provider_ref} {self.amount} -> {self.account_ref} ({self.status})"
+
+
+# ------------------------------
+# Permit renewals
+# ------------------------------
+class RenewalCheckpoint(models.Model):
+    """
+    Progress of one ``renew_permits`` worker: yearly permits expiring at the
+    end of ``year`` with ids in ``range_start..range_end``, renewed up to
+    ``last_pk``. A rerun resumes from here.
+    """
+    year = models.PositiveIntegerField()
+    range_start = models.PositiveBigIntegerField()
+    range_end = models.PositiveBigIntegerField()
+    last_pk = models.PositiveBigIntegerField(default=0)
+    renewed_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["year", "range_start", "range_end"], name="unique_renewal_range"),
+        ]
+
+    def __str__(self):
+        state = "done" if self.finished_at else f"at {self.last_pk}"
+        return f"{self.year} {self.range_start}-{self.range_end}: {self.renewed_count} renewed ({state})"
+
+
+# ------------------------------
+# Cache versions
+# ------------------------------
+class CacheVersion(models.Model):
+    """
+    Version of a table every worker caches in memory (the location tree,
+    the tariff table); bumped on edits, see versions.py.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,135 @@
+# revenue/occupancy.py
+"""
+Live parking occupancy per section.
+
+Each process keeps a counter of active tickets per section plus a min-heap
+of expiry times. Ticket creation (see signals.py) increments a counter and
+pushes the expiry; reads pop whatever has expired since, so a lookup costs
+O(1) amortised instead of a scan over ParkingTicket.
+
+Tickets sold by other web workers are picked up by a resync from the
+database every ``PARKING_OCCUPANCY_RESYNC_SECONDS``, which also corrects
+any drift from edits the signals do not track.
+"""
+import heapq
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class OccupancyTracker:
+    def __init__(self, resync_seconds=60, clock=timezone.now):
+        self.resync_interval = timedelta(seconds=resync_seconds)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._heap = []
+        self._removed = Counter()
+        self._capacities = {}
+        self._synced_at = None
+
+    # ---- loading ----
+    def load_active_tickets(self, now):
+        """Returns ``[(expires_at, section_id), ...]`` for tickets active at ``now``."""
+        from .models import ParkingTicket
+
+        return list(ParkingTicket.objects.active(now).values_list("expires_at", "section_id"))
+
+    def load_capacities(self):
+        from .models import ParkingSection
+
+        return dict(ParkingSection.objects.values_list("id", "capacity"))
+
+    def resync(self):
+        now = self.clock()
+        active = self.load_active_tickets(now)
+        capacities = self.load_capacities()
+        heapq.heapify(active)
+        with self._lock:
+            self._heap = active
+            self._counts = Counter(section_id for _, section_id in active)
+            self._removed = Counter()
+            self._capacities = capacities
+            self._synced_at = now
+
+    def _refresh(self, now):
+        """Resync when stale, then drop expired tickets. Call without the lock held."""
+        if self._synced_at is None or now - self._synced_at >= self.resync_interval:
+            self.resync()
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                entry = heapq.heappop(heap)
+                if self._removed[entry]:
+                    self._removed[entry] -= 1
+                    continue
+                self._counts[entry[1]] -= 1
+
+    # ---- updates ----
+    def ticket_started(self, section_id, expires_at):
+        if expires_at <= self.clock():
+            return
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, section_id))
+            self._counts[section_id] += 1
+
+    def ticket_removed(self, section_id, expires_at):
+        if expires_at <= self.clock():
+            return
+        with self._lock:
+            if self._counts[section_id] > 0:
+                # Leave the heap entry in place; _refresh skips it when it surfaces
+                self._removed[(expires_at, section_id)] += 1
+                self._counts[section_id] -= 1
+
+    def set_capacity(self, section_id, capacity):
+        with self._lock:
+            if capacity is None:
+                self._capacities.pop(section_id, None)
+            else:
+                self._capacities[section_id] = capacity
+
+    # ---- reads ----
+    def section(self, section_id):
+        """Returns ``{"capacity", "occupied", "available", "full"}``, or ``None`` if unknown."""
+        self._refresh(self.clock())
+        with self._lock:
+            if section_id not in self._capacities:
+                return None
+            return self._describe(section_id)
+
+    def sections(self, section_ids=None):
+        self._refresh(self.clock())
+        with self._lock:
+            ids = self._capacities if section_ids is None else [i for i in section_ids if i in self._capacities]
+            return {section_id: self._describe(section_id) for section_id in ids}
+
+    def is_full(self, section_id):
+        state = self.section(section_id)
+        return state is not None and state["full"]
+
+    def _describe(self, section_id):
+        capacity = self._capacities[section_id]
+        occupied = self._counts[section_id]
+        return {
+            "capacity": capacity,
+            "occupied": occupied,
+            "available": max(capacity - occupied, 0),
+            "full": occupied >= capacity,
+        }
+
+
+_tracker = None
+
+
+def get_tracker():
+    """Per-process occupancy tracker configured from settings."""
+    global _tracker
+    if _tracker is None:
+        _tracker = OccupancyTracker(
+            resync_seconds=getattr(settings, "PARKING_OCCUPANCY_RESYNC_SECONDS", 60),
+        )
+    return _tracker
@@ -0,0 +1,34 @@
+# revenue/operations.py
+"""
+Migration operations for large tables.
+
+``AddIndexOnline`` builds an index without blocking writes to the table:
+- MySQL: ``ALGORITHM=INPLACE, LOCK=NONE``, so the server refuses with an
+  error instead of silently falling back to a locking table copy;
+- PostgreSQL: ``CREATE INDEX CONCURRENTLY``;
+- anything else (SQLite in development): a plain ``CREATE INDEX``.
+
+Migrations using it must set ``atomic = False``: a concurrent build
+cannot run inside a transaction, and MySQL DDL commits anyway.
+"""
+from django.db import migrations
+
+
+class AddIndexOnline(migrations.AddIndex):
+    def describe(self):
+        return f"{super().describe()} without blocking writes"
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        vendor = schema_editor.connection.vendor
+        if vendor == "mysql":
+            schema_editor.execute(f"{self.index.create_sql(model, schema_editor)} ALGORITHM=INPLACE LOCK=NONE",
+                                  params=None)
+        elif vendor == "postgresql":
+            if schema_editor.connection.in_atomic_block:
+                raise ValueError("AddIndexOnline needs a migration with atomic = False on PostgreSQL.")
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
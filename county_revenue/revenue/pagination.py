@@ -0,0 +1,132 @@
+# revenue/pagination.py
+"""
+Keyset (cursor) pagination for the permit and ticket lists.
+
+Pages are ordered newest first on ``(<column>, id)`` and each cursor holds
+the last row's values, so fetching a page is an index range scan of
+``page_size`` rows no matter how deep it is. Rows inserted while a client
+pages through land before its first page and never shift later pages.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Newest-first pages keyed on ``(ordering_field, id)``"""
+    ordering_field = None
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        default = getattr(settings, "API_PAGE_SIZE", 50)
+        maximum = getattr(settings, "API_MAX_PAGE_SIZE", 500)
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, default))
+        except (TypeError, ValueError):
+            return default
+        return min(max(size, 1), maximum)
+
+    # ------------------------------
+    # Cursors
+    # ------------------------------
+    def encode_cursor(self, obj, reverse):
+        value = getattr(obj, self.ordering_field)
+        payload = json.dumps([value.isoformat(), obj.pk, int(reverse)], separators=(",", ":"))
+        return urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            value, pk, reverse = json.loads(raw)
+            value = queryset.model._meta.get_field(self.ordering_field).to_python(value)
+            if value is None:
+                raise ValueError(value)
+            return value, int(pk), bool(reverse)
+        except (BinasciiError, UnicodeDecodeError, ValueError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_link(self, obj, reverse):
+        if obj is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(obj, reverse))
+
+    # ------------------------------
+    # Paging
+    # ------------------------------
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        field = self.ordering_field
+        cursor = self.decode_cursor(request, queryset)
+        reverse = bool(cursor and cursor[2])
+
+        if cursor:
+            value, pk, _ = cursor
+            # A range on the leading index column, then the tie-break on id
+            if reverse:
+                queryset = queryset.filter(**{f"{field}__gte": value}).filter(
+                    Q(**{f"{field}__gt": value}) | Q(pk__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(**{f"{field}__lte": value}).filter(
+                    Q(**{f"{field}__lt": value}) | Q(pk__lt=pk)
+                )
+        ordering = (field, "pk") if reverse else (f"-{field}", "-pk")
+        # One extra row tells us whether another page follows
+        rows = list(queryset.order_by(*ordering)[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        first, last = (rows[0], rows[-1]) if rows else (None, None)
+        if reverse:
+            self.next_link = self.get_link(last, reverse=False) if cursor else None
+            self.previous_link = self.get_link(first, reverse=True) if has_more else None
+        else:
+            self.next_link = self.get_link(last, reverse=False) if has_more else None
+            self.previous_link = self.get_link(first, reverse=True) if cursor else None
+        if reverse and not rows:
+            # Paged back past the newest row: point forward at the first page
+            self.next_link = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.next_link,
+            "previous": self.previous_link,
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class PermitPagination(KeysetPagination):
+    ordering_field = "start_date"
+
+
+class ParkingTicketPagination(KeysetPagination):
+    ordering_field = "created_at"
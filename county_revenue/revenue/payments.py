@@ -0,0 +1,328 @@
+# revenue/payments.py
+"""
+Payment reconciliation.
+
+Payments reach us in two ways:
+- callback batches, which POST to /revenue/payments/callback/;
+- daily statement files, loaded with ``manage.py import_payment_statement``.
+
+Both only append rows to the ``PaymentEvent`` table. ``provider_ref`` is
+unique, so a payment seen in both places is stored once. The worker
+(``manage.py process_payments``) takes pending rows in batches. Each
+payment's account reference is matched, in this order, to:
+1. a permit number;
+2. a ticket number ("123", "T123", "TKT-123");
+3. the newest unpaid ticket for that plate.
+
+Each batch commits with a handful of queries: one lookup per match
+kind, then batched updates of permits, tickets and events. Rollups,
+dashboard counters and caches are updated here, since ``bulk_update``
+sends no signals.
+"""
+import csv
+import random
+import re
+import string
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import dashboard, reports
+from .enforcement import invalidate_plate
+from .models import ParkingTicket, PaymentEvent, Permit, PermitType, normalize_plate
+from .pdf import get_pdf_cache
+
+TICKET_REF = re.compile(r"^(?:TKT|T)?-?(\d{1,18})$")
+
+# Column names in the provider's statement export
+STATEMENT_COLUMNS = {
+    "provider_ref": "Receipt No.",
+    "paid_at": "Completion Time",
+    "status": "Transaction Status",
+    "amount": "Paid In",
+    "msisdn": "Other Party Info",
+    "account_ref": "A/C No.",
+}
+
+
+class PaymentParseError(ValueError):
+    pass
+
+
+# ------------------------------
+# Parsing
+# ------------------------------
+def parse_amount(value):
+    try:
+        amount = Decimal(str(value).replace(",", "").strip())
+    except (InvalidOperation, AttributeError):
+        raise PaymentParseError(f"Invalid amount {value!r}.")
+    if not amount.is_finite() or amount <= 0:
+        raise PaymentParseError(f"Invalid amount {value!r}.")
+    return amount.quantize(Decimal("0.01"))
+
+
+def parse_time(value, formats=("%Y%m%d%H%M%S", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S")):
+    """Provider timestamps are local time without an offset."""
+    if not value:
+        return None
+    for fmt in formats:
+        try:
+            return timezone.make_aware(datetime.strptime(str(value).strip(), fmt))
+        except ValueError:
+            continue
+    raise PaymentParseError(f"Invalid time {value!r}.")
+
+
+def event_from_callback(item):
+    """An unsaved PaymentEvent from one M-Pesa style C2B confirmation."""
+    if not isinstance(item, dict) or not item.get("TransID"):
+        raise PaymentParseError("TransID is required.")
+    return PaymentEvent(
+        provider_ref=str(item["TransID"]).strip()[:64],
+        account_ref=str(item.get("BillRefNumber") or "").strip()[:64],
+        amount=parse_amount(item.get("TransAmount")),
+        msisdn=str(item.get("MSISDN") or "")[:20],
+        paid_at=parse_time(item.get("TransTime")),
+        source="callback",
+    )
+
+
+def event_from_statement_row(row):
+    """An unsaved PaymentEvent, or ``None`` for rows that are not completed incoming payments."""
+    columns = STATEMENT_COLUMNS
+    if (row.get(columns["status"]) or "").strip().lower() != "completed" or not (row.get(columns["amount"]) or "").strip():
+        return None
+    return PaymentEvent(
+        provider_ref=row[columns["provider_ref"]].strip()[:64],
+        account_ref=(row.get(columns["account_ref"]) or "").strip()[:64],
+        amount=parse_amount(row[columns["amount"]]),
+        msisdn=(row.get(columns["msisdn"]) or "").split(" - ")[0].strip()[:20],
+        paid_at=parse_time(row.get(columns["paid_at"])),
+        source="statement",
+    )
+
+
+def enqueue(events, batch_size=1000):
+    """Append events to the queue; ones already there (same provider_ref) are skipped."""
+    PaymentEvent.objects.bulk_create(events, batch_size=batch_size, ignore_conflicts=True)
+    return len(events)
+
+
+def import_statement(lines, chunk_size=5000):
+    """
+    Stream a statement CSV (any iterable of lines) into the queue,
+    ``chunk_size`` rows per INSERT batch. Returns ``(queued, skipped, errors)``.
+    """
+    queued = skipped = 0
+    errors = []
+    chunk = []
+    for line_number, row in enumerate(csv.DictReader(lines), start=2):
+        try:
+            event = event_from_statement_row(row)
+        except (PaymentParseError, KeyError, AttributeError) as exc:
+            errors.append((line_number, str(exc)))
+            continue
+        if event is None:
+            skipped += 1
+            continue
+        chunk.append(event)
+        if len(chunk) >= chunk_size:
+            queued += enqueue(chunk, batch_size=chunk_size)
+            chunk = []
+    if chunk:
+        queued += enqueue(chunk, batch_size=chunk_size)
+    return queued, skipped, errors
+
+
+# ------------------------------
+# Matching
+# ------------------------------
+def normalize_ref(ref):
+    return "".join((ref or "").split()).upper()
+
+
+def save_rows(objs, per_row=(), shared=()):
+    """
+    Write ``objs`` back. ``per_row`` fields go through ``bulk_update``
+    (a CASE arm per row); ``shared`` fields, which hold the same values
+    across most rows, are written with one plain UPDATE per distinct value,
+    which is far cheaper to build and to execute.
+    """
+    objs = list(objs)
+    if not objs:
+        return
+    model = type(objs[0])
+    if per_row:
+        model.objects.bulk_update(objs, per_row)
+    if shared:
+        attnames = [model._meta.get_field(name).attname for name in shared]
+        groups = {}
+        for obj in objs:
+            groups.setdefault(tuple(getattr(obj, attname) for attname in attnames), []).append(obj.pk)
+        for values, pks in groups.items():
+            model.objects.filter(pk__in=pks).update(**dict(zip(attnames, values)))
+
+
+def match_batch(events):
+    """Match and apply ``events`` (locked, pending) in one transaction."""
+    now = timezone.now()
+    refs = {event.pk: normalize_ref(event.account_ref) for event in events}
+
+    permits = {
+        permit.permit_number: permit
+        for permit in Permit.objects.select_for_update().filter(permit_number__in=set(refs.values()) - {""})
+    }
+    # contribution() reads permit_type.name
+    permit_types = PermitType.objects.in_bulk({permit.permit_type_id for permit in permits.values()})
+    for permit in permits.values():
+        permit.permit_type = permit_types[permit.permit_type_id]
+
+    ticket_ids = {}
+    for pk, ref in refs.items():
+        found = TICKET_REF.match(ref)
+        if ref not in permits and found:
+            ticket_ids[pk] = int(found.group(1))
+    tickets = ParkingTicket.objects.select_for_update().filter(pk__in=set(ticket_ids.values())).in_bulk()
+
+    plates = {
+        normalize_plate(ref) for pk, ref in refs.items()
+        if ref and ref not in permits and ticket_ids.get(pk) not in tickets
+    }
+    unpaid_by_plate = {}
+    if plates:
+        unpaid = ParkingTicket.objects.select_for_update().filter(plate_normalized__in=plates, paid=False)
+        for ticket in unpaid.order_by("plate_normalized", "-expires_at", "-id"):
+            unpaid_by_plate.setdefault(ticket.plate_normalized, []).append(tickets.setdefault(ticket.pk, ticket))
+
+    changed_permits, changed_tickets = {}, {}
+    for event in events:
+        ref = refs[event.pk]
+        event.processed_at = now
+        if ref in permits:
+            apply_to_permit(event, permits[ref], changed_permits)
+        elif ticket_ids.get(event.pk) in tickets:
+            apply_to_ticket(event, tickets[ticket_ids[event.pk]], changed_tickets, now)
+        elif unpaid_by_plate.get(normalize_plate(ref)):
+            apply_to_ticket(event, unpaid_by_plate[normalize_plate(ref)].pop(0), changed_tickets, now)
+        else:
+            event.status = PaymentEvent.UNMATCHED
+            event.note = "No permit or unpaid ticket for this account reference."
+
+    save_rows(changed_permits.values(), per_row=["amount_paid"], shared=["paid"])
+    save_rows(changed_tickets.values(), shared=["paid", "updated_at"])
+    reports.record_bulk_update([*changed_permits.values(), *changed_tickets.values()])
+    dashboard.record_bulk_update([*changed_permits.values(), *changed_tickets.values()])
+    save_rows([event for event in events if event.permit_id], per_row=["permit"])
+    save_rows([event for event in events if event.ticket_id], per_row=["ticket"])
+    save_rows(events, shared=["status", "note", "processed_at"])
+
+    labels = [f"permit-{pk}" for pk in changed_permits] + [f"parkingticket-{pk}" for pk in changed_tickets]
+    plates_paid = {ticket.plate_normalized for ticket in changed_tickets.values()}
+
+    def after_commit():
+        cache = get_pdf_cache()
+        for label in labels:
+            cache.invalidate(label)
+        for plate in plates_paid:
+            invalidate_plate(plate)
+
+    transaction.on_commit(after_commit)
+
+
+def apply_to_permit(event, permit, changed):
+    event.permit = permit
+    if permit.paid:
+        event.status, event.note = PaymentEvent.REVIEW, "Permit was already paid in full; not applied."
+        return
+    permit.amount_paid += event.amount
+    permit.paid = permit.amount_paid >= permit.total_fee
+    changed[permit.pk] = permit
+    event.status = PaymentEvent.MATCHED
+    if permit.amount_paid > permit.total_fee:
+        event.note = f"Overpaid by {permit.amount_paid - permit.total_fee}."
+
+
+def apply_to_ticket(event, ticket, changed, now):
+    event.ticket = ticket
+    if ticket.paid:
+        event.status, event.note = PaymentEvent.REVIEW, "Ticket was already paid; not applied."
+    elif event.amount < ticket.amount:
+        event.status, event.note = PaymentEvent.REVIEW, f"Short by {ticket.amount - event.amount}; not applied."
+    else:
+        ticket.paid = True
+        ticket.updated_at = now
+        changed[ticket.pk] = ticket
+        event.status = PaymentEvent.MATCHED
+        if event.amount > ticket.amount:
+            event.note = f"Overpaid by {event.amount - ticket.amount}."
+
+
+def process_pending(batch_size=1000):
+    """
+    Match one batch of pending events. Returns ``{status: count}``, empty
+    when the queue is drained. Workers can run side by side: each claims
+    its batch with SKIP LOCKED where the database supports it.
+    """
+    with transaction.atomic():
+        queue = PaymentEvent.objects.filter(status=PaymentEvent.PENDING).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            queue = queue.select_for_update(skip_locked=True)
+        else:
+            queue = queue.select_for_update()
+        events = list(queue[:batch_size])
+        if not events:
+            return {}
+        match_batch(events)
+    counts = {}
+    for event in events:
+        counts[event.status] = counts.get(event.status, 0) + 1
+    return counts
+
+
+# ------------------------------
+# Fake provider (local testing)
+# ------------------------------
+class FakeProvider:
+    """
+    Generates payments in the provider's callback and statement formats,
+    so the pipeline can be exercised without the real provider.
+    """
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def transaction_id(self):
+        return "".join(self.random.choices(string.ascii_uppercase + string.digits, k=10))
+
+    def payment(self, account_ref, amount, when=None, msisdn=None):
+        when = timezone.localtime(when or timezone.now())
+        return {
+            "TransactionType": "Pay Bill",
+            "TransID": self.transaction_id(),
+            "TransTime": when.strftime("%Y%m%d%H%M%S"),
+            "TransAmount": f"{Decimal(amount):.2f}",
+            "BusinessShortCode": "600000",
+            "BillRefNumber": account_ref,
+            "MSISDN": msisdn or f"2547{self.random.randint(0, 99999999):08d}",
+        }
+
+    def statement_rows(self, payments):
+        """Statement lines (dicts keyed by STATEMENT_COLUMNS names) for callback-format payments."""
+        columns = STATEMENT_COLUMNS
+        for payment in payments:
+            yield {
+                columns["provider_ref"]: payment["TransID"],
+                columns["paid_at"]: datetime.strptime(payment["TransTime"], "%Y%m%d%H%M%S").strftime("%Y-%m-%d %H:%M:%S"),
+                columns["status"]: "Completed",
+                columns["amount"]: payment["TransAmount"],
+                columns["msisdn"]: f"{payment['MSISDN']} - PAYER",
+                columns["account_ref"]: payment["BillRefNumber"],
+            }
+
+    def write_statement(self, fileobj, payments):
+        writer = csv.DictWriter(fileobj, fieldnames=list(STATEMENT_COLUMNS.values()))
+        writer.writeheader()
+        writer.writerows(self.statement_rows(payments))
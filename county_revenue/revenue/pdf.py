@@ -0,0 +1,328 @@
+# revenue/pdf.py
+"""
+PDF rendering service for permit and ticket documents.
+
+Templates are rendered to HTML in the request worker (cheap), while the
+xhtml2pdf conversion (CPU heavy) runs in a bounded process pool so that
+month-end peaks do not tie up every web worker. Finished jobs are written
+to ``PDF_JOB_DIR`` so any web worker on the host can answer status and
+download requests for them.
+
+Rendered documents are kept in a content-addressed cache under
+``PDF_CACHE_DIR``: the key hashes the template source together with the
+rendered field values, so an unchanged permit is never rendered twice.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+
+
+class PDFRenderError(Exception):
+    """Raised when xhtml2pdf cannot convert a document."""
+
+
+def html_to_pdf(html):
+    """Convert an HTML string to PDF bytes."""
+    buffer = BytesIO()
+    status = pisa.CreatePDF(html, dest=buffer)
+    if status.err:
+        raise PDFRenderError("Error generating PDF")
+    return buffer.getvalue()
+
+
+def _render_job(html, path):
+    """
+    Pool entry point: render ``html`` into ``path``.
+    Writes ``<job>.err`` instead when conversion fails.
+    """
+    path = Path(path)
+    try:
+        data = html_to_pdf(html)
+    except Exception as exc:  # report any failure to the polling client
+        path.with_suffix(".err").write_text(str(exc) or exc.__class__.__name__)
+        return False
+    tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+
+# ------------------------------
+# Render service
+# ------------------------------
+class PDFRenderService:
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, max_workers=2, inline_threshold=1, job_dir=None, job_ttl=3600):
+        self.max_workers = max_workers
+        self.inline_threshold = inline_threshold
+        self.job_dir = Path(job_dir)
+        self.job_ttl = job_ttl
+        self._executor = None
+        self._in_flight = 0    # pool jobs
+        self._inline = 0       # renders running in request threads
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                # "spawn" keeps children free of the parent's DB connections and threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    @property
+    def queue_depth(self):
+        """Renders this process has running, inline or in the pool."""
+        return self._in_flight + self._inline
+
+    def render_inline(self, html):
+        """
+        Render ``html`` in the calling thread while fewer than
+        ``inline_threshold`` renders are running; returns the PDF bytes, or
+        ``None`` when the caller should ``submit`` it to the pool instead.
+        """
+        with self._lock:
+            if self._in_flight + self._inline >= self.inline_threshold:
+                return None
+            self._inline += 1
+        try:
+            return html_to_pdf(html)
+        finally:
+            with self._lock:
+                self._inline -= 1
+
+    def _paths(self, job_id):
+        base = self.job_dir / str(job_id)
+        return base.with_suffix(".json"), base.with_suffix(".pdf")
+
+    def submit(self, html, filename, owner_id, dest=None, on_done=None):
+        """
+        Queue ``html`` for rendering and return the job id.
+        The PDF is written to ``dest`` when given (e.g. a cache entry);
+        ``on_done(path)`` is called in this process once it is there.
+        """
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self._purge_expired()
+
+        job_id = str(uuid.uuid4())
+        meta_path, pdf_path = self._paths(job_id)
+        if dest is not None:
+            pdf_path = Path(dest)
+            pdf_path.with_suffix(".err").unlink(missing_ok=True)
+        meta_path.write_text(json.dumps({
+            "owner": owner_id,
+            "filename": filename,
+            "path": str(pdf_path),
+            "created": time.time(),
+        }))
+
+        executor = self.executor
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = executor.submit(_render_job, html, str(pdf_path))
+        except Exception:
+            self._job_done()
+            raise
+        future.add_done_callback(lambda future: self._job_done(future, pdf_path, on_done))
+        return job_id
+
+    def _job_done(self, future=None, pdf_path=None, on_done=None):
+        try:
+            if on_done is not None and not future.cancelled() and future.exception() is None and future.result():
+                on_done(pdf_path)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def job(self, job_id):
+        """
+        Returns ``(status, meta, pdf_path)`` for a job, or ``None`` if unknown.
+        """
+        meta_path, _ = self._paths(job_id)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        pdf_path = Path(meta["path"])
+        if pdf_path.exists():
+            return self.READY, meta, pdf_path
+        if pdf_path.with_suffix(".err").exists():
+            return self.FAILED, meta, None
+        return self.PENDING, meta, None
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < 600:
+            return
+        self._last_purge = now
+        for entry in os.scandir(self.job_dir):
+            try:
+                if now - entry.stat().st_mtime > self.job_ttl:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+# ------------------------------
+# Content-addressed PDF cache
+# ------------------------------
+class PDFCache:
+    """
+    On-disk PDF store keyed by ``sha256(template source + rendered values)``.
+
+    Entries are evicted least-recently-used once the directory grows past
+    ``max_bytes``; hits refresh the entry's mtime. A small index maps each
+    object (``permit-12``) to its current key so a save that changes the
+    rendered fields can drop the stale document.
+    """
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = Path(root)
+        self.index_dir = self.root / "index"
+        self.max_bytes = max_bytes
+        self._template_digests = {}
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _template_digest(self, template_name):
+        digest = self._template_digests.get(template_name)
+        if digest is None:
+            source = get_template(template_name).template.source
+            digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+            self._template_digests[template_name] = digest
+        return digest
+
+    def key_for(self, template_name, values):
+        payload = json.dumps([self._template_digest(template_name), values], default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return self.root / f"{key}.pdf"
+
+    def get(self, key):
+        """Returns the cached file path for ``key`` or ``None``."""
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # LRU: a hit makes the entry young again
+        except OSError:
+            return None
+        return path
+
+    def reserve(self, key, label):
+        """Point ``label`` at ``key`` and return the path the PDF belongs at."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        pointer = self.index_dir / label
+        tmp = pointer.with_suffix(".tmp")
+        tmp.write_text(key)
+        os.replace(tmp, pointer)
+        return self.path_for(key)
+
+    def put(self, key, label, data):
+        """Store ``data`` for ``key`` and return its path."""
+        path = self.reserve(key, label)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._account(len(data))
+        return path
+
+    def added(self, path):
+        """Count a file written straight into the cache (by the render pool) toward ``max_bytes``."""
+        try:
+            size = Path(path).stat().st_size
+        except OSError:
+            return
+        self._account(size)
+
+    def invalidate(self, label):
+        """Drop the cached document of ``label`` (e.g. ``permit-12``)."""
+        pointer = self.index_dir / label
+        try:
+            key = pointer.read_text().strip()
+            os.unlink(pointer)
+        except OSError:
+            return
+        try:
+            os.unlink(self.path_for(key))
+        except OSError:
+            pass
+
+    def _account(self, added):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(
+                    entry.stat().st_size for entry in os.scandir(self.root)
+                    if entry.name.endswith(".pdf")
+                )
+            else:
+                self._size += added
+            if self._size > self.max_bytes:
+                self._size = self._evict()
+
+    def _evict(self):
+        """Delete oldest entries until the cache is below 90% of its cap."""
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".pdf"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        size = sum(e[1] for e in entries)
+        target = self.max_bytes * 0.9
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            size -= entry_size
+        return size
+
+
+_service = None
+_cache = None
+
+
+def get_render_service():
+    """Per-process render service configured from settings."""
+    global _service
+    if _service is None:
+        _service = PDFRenderService(
+            max_workers=getattr(settings, "PDF_RENDER_WORKERS", 2),
+            inline_threshold=getattr(settings, "PDF_INLINE_QUEUE_THRESHOLD", 1),
+            job_dir=getattr(settings, "PDF_JOB_DIR", Path(settings.MEDIA_ROOT) / "pdf_jobs"),
+            job_ttl=getattr(settings, "PDF_JOB_TTL", 3600),
+        )
+    return _service
+
+
+def get_pdf_cache():
+    """Per-process PDF cache configured from settings."""
+    global _cache
+    if _cache is None:
+        _cache = PDFCache(
+            root=getattr(settings, "PDF_CACHE_DIR", Path(settings.MEDIA_ROOT) / "pdf_cache"),
+            max_bytes=getattr(settings, "PDF_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+        )
+    return _cache
@@ -0,0 +1,13 @@
+# revenue/permissions.py
+from rest_framework import permissions
+
+
+class IsEnforcementOfficer(permissions.BasePermission):
+    """County staff: Django staff users or users with the staff/admin role."""
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated
+            and (user.is_staff or getattr(user, "role", "") in ("staff", "admin"))
+        )
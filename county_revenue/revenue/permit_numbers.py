@@ -0,0 +1,126 @@
+# revenue/permit_numbers.py
+"""
+Permit number allocators.
+
+``Permit.save()`` asks the allocator configured in
+``settings.PERMIT_NUMBER_ALLOCATOR`` for a number. The default hands out
+sequential numbers per permit type and year from blocks reserved in the
+``PermitNumberSequence`` table, so inserts land at the right edge of the
+unique index instead of at random positions. Both allocators are retried
+by the caller when a number turns out to be taken.
+"""
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def luhn_check_digit(digits):
+    """Luhn (mod 10) check digit for a string of digits."""
+    total = 0
+    for position, char in enumerate(reversed(digits)):
+        value = int(char)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def is_valid_permit_number(number):
+    """True when a sequential permit number's check digit matches."""
+    digits = number.replace("-", "")
+    return digits.isdigit() and luhn_check_digit(digits[:-1]) == digits[-1]
+
+
+class PermitNumberAllocator:
+    """Base class: ``allocate`` returns a number, ``collided`` reports a clash."""
+
+    # How many numbers save() tries before giving up on IntegrityErrors
+    max_attempts = 5
+
+    def allocate(self, permit):
+        raise NotImplementedError
+
+    def collided(self, permit, number):
+        """Called when ``number`` already exists in the permit table."""
+
+
+class RandomPermitNumberAllocator(PermitNumberAllocator):
+    """The original scheme: first 8 hex characters of a UUID4."""
+
+    max_attempts = 10
+
+    def allocate(self, permit):
+        return str(uuid.uuid4()).split('-')[0].upper()
+
+
+class BlockSequencePermitNumberAllocator(PermitNumberAllocator):
+    """
+    Numbers look like ``003-2026-0000125-6``: permit type, year, sequence
+    and a Luhn check digit. Each process reserves ``block_size`` sequence
+    values at a time and hands them out from memory.
+    """
+
+    def __init__(self, block_size=None, reserve_block=None):
+        self.block_size = block_size or getattr(settings, "PERMIT_NUMBER_BLOCK_SIZE", 50)
+        self._reserve_block = reserve_block or self.reserve_block
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def format_number(permit_type_id, year, sequence):
+        body = f"{permit_type_id:03d}{year:04d}{sequence:07d}"
+        return f"{permit_type_id:03d}-{year:04d}-{sequence:07d}-{luhn_check_digit(body)}"
+
+    def reserve_block(self, permit_type_id, year, size):
+        """Atomically claim ``size`` sequence values; returns ``(first, end)``."""
+        from .models import PermitNumberSequence
+
+        with transaction.atomic():
+            sequence, _ = PermitNumberSequence.objects.select_for_update().get_or_create(
+                permit_type_id=permit_type_id, year=year,
+            )
+            first = sequence.next_value
+            sequence.next_value = first + size
+            sequence.save(update_fields=["next_value"])
+        return first, first + size
+
+    def next_sequence(self, permit_type_id, year):
+        key = (permit_type_id, year)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[0] >= block[1]:
+                block = list(self._reserve_block(permit_type_id, year, self.block_size))
+                self._blocks[key] = block
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def allocate(self, permit):
+        year = permit.start_date.year
+        return self.format_number(permit.permit_type_id, year, self.next_sequence(permit.permit_type_id, year))
+
+    def collided(self, permit, number):
+        # The block was reserved in a transaction that rolled back, or the
+        # table was seeded by hand: drop it and reserve a fresh one.
+        with self._lock:
+            self._blocks.pop((permit.permit_type_id, permit.start_date.year), None)
+
+
+_allocator = None
+
+
+def get_permit_number_allocator():
+    """Per-process allocator configured by ``PERMIT_NUMBER_ALLOCATOR``."""
+    global _allocator
+    if _allocator is None:
+        path = getattr(
+            settings, "PERMIT_NUMBER_ALLOCATOR",
+            "revenue.permit_numbers.BlockSequencePermitNumberAllocator",
+        )
+        _allocator = import_string(path)()
+    return _allocator
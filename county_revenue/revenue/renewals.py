@@ -0,0 +1,121 @@
+# revenue/renewals.py
+"""
+Annual permit rollover (``manage.py renew_permits``).
+
+Yearly permits all end on Dec 31. Renewing year ``Y`` walks the permits
+expiring then in primary-key order, ``chunk_size`` at a time, and for each
+chunk in one transaction:
+
+- issues next year's permits with ``Permit.bulk_issue`` (fees priced from
+  the tariff in effect on Jan 1 of ``Y + 1``, new permit numbers, rollups
+  and dashboard counters);
+- marks the originals ``renewed``;
+- moves the range's ``RenewalCheckpoint`` past the chunk.
+
+Each checkpoint covers one id range, so workers given different ranges
+never touch the same rows, and a run that stops (crash, deploy, Ctrl-C)
+resumes after the last committed chunk. Permits already ``renewed`` are
+skipped, so renewing twice never issues a second permit.
+"""
+import copy
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .models import Permit, RenewalCheckpoint
+from .tariffs import get_tariffs
+
+
+def expiring(year, paid_only=False):
+    """Yearly permits ending on Dec 31 of ``year`` that have not been renewed."""
+    yearly = [pk for pk, permit_type in get_tariffs().permit_types.items() if permit_type.is_yearly]
+    permits = Permit.objects.filter(permit_type_id__in=yearly, end_date=date(year, 12, 31), renewed=False)
+    if paid_only:
+        permits = permits.filter(paid=True)
+    return permits
+
+
+def plan(year, workers=1, paid_only=False):
+    """
+    The checkpoints for ``year``: the existing ones when resuming, else
+    the expiring id range split into ``workers`` equal parts. Permits
+    added past the planned ranges since get one more range.
+    """
+    permits = expiring(year, paid_only)
+    planned_up_to = RenewalCheckpoint.objects.filter(year=year).aggregate(end=Max("range_end"))["end"]
+    if planned_up_to is not None:
+        permits, workers = permits.filter(pk__gt=planned_up_to), 1
+    bounds = permits.aggregate(low=Min("pk"), high=Max("pk"))
+    if bounds["low"] is None:
+        return list(RenewalCheckpoint.objects.filter(year=year).order_by("range_start"))
+    low, high = bounds["low"], bounds["high"]
+    step = max(1, -(-(high - low + 1) // workers))
+    for start in range(low, high + 1, step):
+        RenewalCheckpoint.objects.get_or_create(year=year, range_start=start, range_end=min(high, start + step - 1))
+    return list(RenewalCheckpoint.objects.filter(year=year).order_by("range_start"))
+
+
+def renew_chunk(checkpoint_id, chunk_size, paid_only=False):
+    """Renew the next chunk of a checkpoint's range; returns how many permits, ``None`` when done."""
+    checkpoint = RenewalCheckpoint.objects.get(pk=checkpoint_id)
+    if checkpoint.finished_at:
+        return None
+    rows = list(
+        expiring(checkpoint.year, paid_only)
+        .filter(pk__gt=max(checkpoint.last_pk, checkpoint.range_start - 1), pk__lte=checkpoint.range_end)
+        .order_by("pk")
+        .values_list("pk", "permit_type_id", "owner_id", "owner_name", "permit_number")[:chunk_size]
+    )
+    if not rows:
+        RenewalCheckpoint.objects.filter(pk=checkpoint_id, finished_at=None).update(finished_at=timezone.now())
+        return None
+
+    permit_types = get_tariffs().permit_types
+    start_date = date(checkpoint.year + 1, 1, 1)
+    renewals = {}
+    for pk, permit_type_id, owner_id, owner_name, permit_number in rows:
+        # A copy: the compiled table's instances are shared by every thread
+        permit = Permit(
+            permit_type=copy.copy(permit_types[permit_type_id]), owner_id=owner_id, owner_name=owner_name,
+            start_date=start_date, notes=f"Renewed from {permit_number}",
+        )
+        # Numbered before the transaction: reserving a block locks its
+        # sequence row, and holding that for the whole chunk would make
+        # parallel workers queue behind each other
+        permit.assign_permit_number()
+        renewals[pk] = permit
+
+    with transaction.atomic():
+        checkpoint = RenewalCheckpoint.objects.select_for_update().get(pk=checkpoint_id)
+        # Another worker given the same range may have renewed some meanwhile
+        still_due = list(
+            Permit.objects.select_for_update().filter(pk__in=list(renewals), renewed=False)
+            .values_list("pk", flat=True)
+        )
+        created = Permit.bulk_issue([renewals[pk] for pk in sorted(still_due)])
+        Permit.objects.filter(pk__in=still_due).update(renewed=True)
+
+        checkpoint.last_pk = max(checkpoint.last_pk, rows[-1][0])
+        checkpoint.renewed_count += len(created)
+        checkpoint.save(update_fields=["last_pk", "renewed_count", "updated_at"])
+    return len(created)
+
+
+def renew_range(checkpoint_id, chunk_size=None, paid_only=False, progress=None):
+    """
+    Renew a checkpoint's range to the end. Returns ``(renewed, seconds)``;
+    ``progress(renewed, seconds)`` is called after every chunk.
+    """
+    chunk_size = chunk_size or getattr(settings, "RENEWAL_CHUNK_SIZE", 1000)
+    renewed, started = 0, time.perf_counter()
+    while True:
+        count = renew_chunk(checkpoint_id, chunk_size, paid_only)
+        if count is None:
+            return renewed, time.perf_counter() - started
+        renewed += count
+        if progress:
+            progress(renewed, time.perf_counter() - started)
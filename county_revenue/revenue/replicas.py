@@ -0,0 +1,145 @@
+# revenue/replicas.py
+"""
+Read-replica routing.
+
+Writes and most reads go to ``default``, the primary. Views that opt in
+with ``ReplicaReadMixin`` read from one of the ``DATABASE_REPLICAS``
+aliases for GET/HEAD/OPTIONS requests: lists, reports, PDFs and exports
+that would otherwise compete with payment writes for the primary.
+
+Replicas lag behind the primary. So a user who just wrote something is
+not sent to a replica: ``ReadYourWritesMiddleware`` pins the user's
+reads to the primary for ``REPLICA_PIN_SECONDS`` after every successful
+write request. The pin goes out as a signed cookie on the write's
+response, so it reaches whichever worker serves the next read; it is
+also kept in Django's cache for clients that drop cookies, which only
+covers other workers when the cache is shared (e.g. redis).
+Views whose data users do not write, such as permit types, set
+``read_your_writes = False`` and always read from a replica. The async
+views served under ASGI (async_views.py) make the same choice and pass
+it to their querysets with ``.using()``.
+
+Versioned caches (tariffs, the location tree) are rebuilt inside
+``use_primary()``, so a lagging replica never stores old rows under a
+new version.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = "revenue:primary:{user_pk}"
+PIN_COOKIE = "revenue_primary"
+PIN_SALT = "revenue.replicas.pin"
+
+# Alias the current request reads from; None = the primary
+_read_alias = ContextVar("revenue_read_alias", default=None)
+
+
+def replica_aliases():
+    return [alias for alias in getattr(settings, "DATABASE_REPLICAS", ()) if alias in settings.DATABASES]
+
+
+def choose_replica():
+    """A random configured replica, or ``None`` without one."""
+    aliases = replica_aliases()
+    return random.choice(aliases) if aliases else None
+
+
+@contextmanager
+def use_primary():
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+# ------------------------------
+# Read-your-writes pins
+# ------------------------------
+def pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+def pin_to_primary(user_pk, seconds=None, response=None):
+    seconds = pin_seconds() if seconds is None else seconds
+    if seconds:
+        cache.set(PIN_KEY.format(user_pk=user_pk), True, seconds)
+        if response is not None:
+            response.set_signed_cookie(PIN_COOKIE, str(user_pk), salt=PIN_SALT, max_age=seconds,
+                                       httponly=True, samesite="Lax")
+
+
+def pinned_by_cookie(user_pk, request):
+    # The signature's timestamp is checked too, so the client cannot stretch the pin
+    pinned = request.get_signed_cookie(PIN_COOKIE, default=None, salt=PIN_SALT, max_age=pin_seconds())
+    return pinned == str(user_pk)
+
+
+def is_pinned(user_pk, request=None):
+    if request is not None and pinned_by_cookie(user_pk, request):
+        return True
+    return bool(cache.get(PIN_KEY.format(user_pk=user_pk)))
+
+
+async def ais_pinned(user_pk, request=None):
+    """``is_pinned`` for async views."""
+    if request is not None and pinned_by_cookie(user_pk, request):
+        return True
+    return bool(await cache.aget(PIN_KEY.format(user_pk=user_pk)))
+
+
+# ------------------------------
+# Router
+# ------------------------------
+class ReplicaRouter:
+    """Reads inside a replica-reading view go to its replica; everything else to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication
+        return False if db in replica_aliases() else None
+
+
+# ------------------------------
+# Views
+# ------------------------------
+class ReplicaReadMixin:
+    """
+    Serve safe requests from a replica. ``read_replica = False`` turns it
+    off for a view; ``read_your_writes = False`` ignores recent-write pins.
+    """
+    read_replica = True
+    read_your_writes = True
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _read_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permission checks read from the primary
+        super().initial(request, *args, **kwargs)
+        _read_alias.set(self.read_alias(request))
+
+    def read_alias(self, request):
+        if not self.read_replica or request.method not in SAFE_METHODS:
+            return None
+        if self.read_your_writes and request.user.is_authenticated and is_pinned(request.user.pk, request):
+            return None
+        return choose_replica()
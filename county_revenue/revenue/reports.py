@@ -0,0 +1,259 @@
+# revenue/reports.py
+"""
+Daily revenue rollups.
+
+Every permit and ticket contributes ``(count=1, billed, collected)`` to one
+``RevenueRollup`` row keyed by date x town x area x category. Signals apply
+the difference between an object's old and new contribution inside the
+same transaction as the save, so dashboards read a few hundred rollup
+rows instead of scanning Permit and ParkingTicket. ``manage.py
+rebuild_revenue_rollups`` recomputes them from the source tables, e.g.
+after writes that bypassed the bookkeeping.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import ParkingTicket, Permit, PermitType, RevenueRollup
+
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+GROUP_FIELDS = {
+    "date": "date",
+    "source": "source",
+    "town": "town_name",
+    "area": "area_name",
+    "category": "category",
+}
+
+
+# ------------------------------
+# Contributions
+# ------------------------------
+def money(value):
+    """Round like the DecimalField(decimal_places=2) columns will store it."""
+    return Decimal(value or 0).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def permit_contribution(values, permit_type_name):
+    key = {
+        "date": values["start_date"], "source": "permit",
+        "town_name": "", "area_name": "", "category": permit_type_name,
+    }
+    return key, (1, money(values["total_fee"]), money(values["amount_paid"]))
+
+
+def ticket_contribution(values):
+    key = {
+        "date": timezone.localdate(values["created_at"]), "source": "ticket",
+        "town_name": values["town_name"] or "", "area_name": values["area_name"] or "",
+        "category": values["vehicle_type"],
+    }
+    amount = money(values["amount"])
+    return key, (1, amount, amount if values["paid"] else ZERO)
+
+
+def contribution(instance, values=None):
+    """``(key, (count, billed, collected))`` of an instance, from ``values`` if given."""
+    if values is None:
+        values = {f.attname: getattr(instance, f.attname) for f in instance._meta.concrete_fields}
+    if isinstance(instance, Permit):
+        if values["permit_type_id"] == instance.permit_type_id:
+            name = instance.permit_type.name
+        else:
+            name = PermitType.objects.filter(pk=values["permit_type_id"]).values_list("name", flat=True).first() or ""
+        return permit_contribution(values, name)
+    return ticket_contribution(values)
+
+
+def load_previous_values(instance):
+    """
+    Before an update whose starting values are not all known (an instance
+    built by hand or read with ``only()``), read the missing columns back
+    so the save moves its contribution instead of skipping it.
+    """
+    if instance.pk is None:
+        return
+    loaded = getattr(instance, "_loaded_values", None) or {}
+    missing = [
+        f.attname for f in instance._meta.concrete_fields
+        if loaded.get(f.attname, models.DEFERRED) is models.DEFERRED
+    ]
+    if not missing:
+        return
+    row = type(instance)._base_manager.filter(pk=instance.pk).values(*missing).first()
+    if row is not None:    # otherwise this save inserts the row
+        instance._loaded_values = {**loaded, **row}
+
+
+def previous_contribution(instance):
+    """The contribution recorded at the last load/save, or ``None`` if unknown."""
+    loaded = getattr(instance, "_loaded_values", None)
+    fields = [f.attname for f in instance._meta.concrete_fields]
+    if not loaded or any(name not in loaded for name in fields):
+        return None
+    return contribution(instance, loaded)
+
+
+# ------------------------------
+# Incremental updates
+# ------------------------------
+def apply_delta(key, count, billed, collected):
+    if not (count or billed or collected):
+        return
+    changes = {
+        "count": F("count") + count,
+        "billed": F("billed") + billed,
+        "collected": F("collected") + collected,
+    }
+    if RevenueRollup.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            RevenueRollup.objects.create(count=count, billed=billed, collected=collected, **key)
+    except IntegrityError:
+        # Another transaction created the row first
+        RevenueRollup.objects.filter(**key).update(**changes)
+
+
+def record_save(instance, created):
+    new_key, new = contribution(instance)
+    old = None if created else previous_contribution(instance)
+    if old is None:
+        if not created:
+            return  # the row had vanished (see load_previous_values); rebuild_revenue_rollups corrects it
+        apply_delta(new_key, *new)
+        return
+
+    old_key, old_values = old
+    if old_key == new_key:
+        apply_delta(new_key, *(n - o for n, o in zip(new, old_values)))
+    else:
+        apply_delta(old_key, *(-o for o in old_values))
+        apply_delta(new_key, *new)
+
+
+def apply_deltas(changes):
+    """Sum ``(key, values, sign)`` triples per rollup row, then apply each row once."""
+    deltas = {}
+    for key, values, sign in changes:
+        frozen = tuple(sorted(key.items()))
+        total = deltas.get(frozen, (0, ZERO, ZERO))
+        deltas[frozen] = tuple(t + sign * v for t, v in zip(total, values))
+    for frozen, values in deltas.items():
+        apply_delta(dict(frozen), *values)
+
+
+def record_bulk_update(instances):
+    """
+    Rollup bookkeeping for instances changed with ``bulk_update`` (which
+    sends no signals): one update per affected rollup row.
+    """
+    changes = []
+    for instance in instances:
+        old = previous_contribution(instance)
+        if old is not None:
+            changes += [(*old, -1), (*contribution(instance), 1)]
+    apply_deltas(changes)
+
+
+def record_bulk_create(instances):
+    """Rollup bookkeeping for instances inserted with ``bulk_create``."""
+    apply_deltas((*contribution(instance), 1) for instance in instances)
+
+
+def record_delete(instance):
+    key, values = contribution(instance)
+    apply_delta(key, *(-v for v in values))
+
+
+# ------------------------------
+# Backfill
+# ------------------------------
+def rebuild(start=None, end=None):
+    """Recompute rollups for ``start..end`` (inclusive) from the source tables."""
+    permits = Permit.objects.all()
+    tickets = ParkingTicket.objects.annotate(day=TruncDate("created_at", tzinfo=timezone.get_current_timezone()))
+    rollups = RevenueRollup.objects.all()
+    if start:
+        permits, tickets, rollups = permits.filter(start_date__gte=start), tickets.filter(day__gte=start), \
+            rollups.filter(date__gte=start)
+    if end:
+        permits, tickets, rollups = permits.filter(start_date__lte=end), tickets.filter(day__lte=end), \
+            rollups.filter(date__lte=end)
+
+    money_field = DecimalField(max_digits=14, decimal_places=2)
+    zero = Value(ZERO, output_field=money_field)
+    rows = [
+        RevenueRollup(
+            date=row["start_date"], source="permit", category=row["permit_type__name"],
+            count=row["n"], billed=row["billed"], collected=row["collected"],
+        )
+        for row in permits.values("start_date", "permit_type__name").annotate(
+            n=Count("id"),
+            billed=Coalesce(Sum("total_fee"), zero, output_field=money_field),
+            collected=Coalesce(Sum("amount_paid"), zero, output_field=money_field),
+        )
+    ]
+    rows += [
+        RevenueRollup(
+            date=row["day"], source="ticket", town_name=row["town_name"] or "", area_name=row["area_name"] or "",
+            category=row["vehicle_type"], count=row["n"], billed=row["billed"], collected=row["collected"],
+        )
+        for row in tickets.values("day", "town_name", "area_name", "vehicle_type").annotate(
+            n=Count("id"),
+            billed=Coalesce(Sum("amount"), zero, output_field=money_field),
+            collected=Coalesce(Sum("amount", filter=Q(paid=True)), zero, output_field=money_field),
+        )
+    ]
+    # NULL and "" town names land in the same rollup row
+    merged = {}
+    for row in rows:
+        key = (row.date, row.source, row.town_name, row.area_name, row.category)
+        if key in merged:
+            merged[key].count += row.count
+            merged[key].billed += row.billed
+            merged[key].collected += row.collected
+        else:
+            merged[key] = row
+
+    with transaction.atomic():
+        rollups.delete()
+        RevenueRollup.objects.bulk_create(merged.values(), batch_size=1000)
+    return len(merged)
+
+
+# ------------------------------
+# Queries
+# ------------------------------
+def summarize(group_by=("date",), start=None, end=None, source=None, town=None, category=None):
+    """Totals from the rollup table grouped by any of ``GROUP_FIELDS``."""
+    rollups = RevenueRollup.objects.all()
+    if start:
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        rollups = rollups.filter(date__lte=end)
+    if source:
+        rollups = rollups.filter(source=source)
+    if town:
+        rollups = rollups.filter(town_name=town)
+    if category:
+        rollups = rollups.filter(category=category)
+
+    money_field = DecimalField(max_digits=14, decimal_places=2)
+    totals = {
+        "count": Sum("count"),
+        "billed": Sum("billed", output_field=money_field),
+        "collected": Sum("collected", output_field=money_field),
+    }
+    fields = [GROUP_FIELDS[name] for name in group_by]
+    if not fields:
+        return [rollups.aggregate(**totals)]
+    return list(
+        rollups.values(*fields)
+        .annotate(**totals)
+        .order_by(*fields)
+    )
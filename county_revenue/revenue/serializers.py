@@ -1,4 +1,6 @@
 # revenue/serializers.py
+import copy
+
 from rest_framework import serializers
 from .models import (
     Permit, PermitType, ParkingSection, ParkingTicket,
@@ -16,7 +18,30 @@ class PermitTypeSerializer(serializers.ModelSerializer):
 # ------------------------------
 # PERMIT
 # ------------------------------
+class PrefetchedPermitTypeField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves permit types from ``context["permit_types"]`` instead of one
+    query per row. Ids missing there (a type this worker has not compiled
+    yet) are looked up in the database.
+    """
+
+    def to_internal_value(self, data):
+        permit_types = self.context.get("permit_types")
+        if permit_types is None:
+            return super().to_internal_value(data)
+        try:
+            permit_type = permit_types[int(data)]
+        except KeyError:
+            return super().to_internal_value(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        # A copy: the compiled table's instances are shared by every request and thread
+        return copy.copy(permit_type)
+
+
 class PermitSerializer(serializers.ModelSerializer):
+    permit_type = PrefetchedPermitTypeField(queryset=PermitType.objects.all())
+
     class Meta:
         model = Permit
         fields = "__all__"
@@ -30,6 +55,40 @@ class PermitSerializer(serializers.ModelSerializer):
             "paid",
         ]
 
+# ------------------------------
+# BULK PERMIT ISSUANCE
+# ------------------------------
+class PermitBulkItemSerializer(serializers.ModelSerializer):
+    permit_type = PrefetchedPermitTypeField(queryset=PermitType.objects.all())
+    owner_name = serializers.CharField(max_length=200, required=False)
+
+    class Meta:
+        model = Permit
+        fields = ["permit_type", "owner_name", "duration_days", "duration_months", "notes"]
+
+
+# ------------------------------
+# FEE QUOTES
+# ------------------------------
+class PermitQuoteSerializer(serializers.Serializer):
+    # Id or name, resolved against the compiled tariff table in context["tariffs"]
+    permit_type = serializers.CharField()
+    start_date = serializers.DateField(required=False)
+    duration = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_permit_type(self, value):
+        permit_type = self.context["tariffs"].permit_type(value)
+        if permit_type is None:
+            raise serializers.ValidationError(f'Unknown permit type "{value}".')
+        return permit_type
+
+
+class ParkingQuoteSerializer(serializers.Serializer):
+    vehicle_type = serializers.ChoiceField(choices=Vehicle.VEHICLE_CHOICES)
+    duration = serializers.IntegerField(min_value=1)
+    time_unit = serializers.ChoiceField(choices=ParkingTicket.TIME_UNIT_CHOICES)
+
+
 # ------------------------------
 # TOWNS / AREAS / PARKING SECTIONS
 # ------------------------------
@@ -52,6 +111,23 @@ class ParkingSectionSerializer(serializers.ModelSerializer):
         model = ParkingSection
         fields = "__all__"
 
+# Flat variants for ?compact=1 (no nested objects)
+class CompactAreaSerializer(serializers.ModelSerializer):
+    town_name = serializers.CharField(source="town.name", read_only=True)
+
+    class Meta:
+        model = Area
+        fields = ["id", "name", "town_id", "town_name"]
+
+class CompactParkingSectionSerializer(serializers.ModelSerializer):
+    area_name = serializers.CharField(source="area.name", read_only=True)
+    town_id = serializers.IntegerField(source="area.town_id", read_only=True)
+    town_name = serializers.CharField(source="area.town.name", read_only=True)
+
+    class Meta:
+        model = ParkingSection
+        fields = ["id", "name", "capacity", "is_custom", "area_id", "area_name", "town_id", "town_name"]
+
 # ------------------------------
 # VEHICLE (for tickets)
 # ------------------------------
@@ -66,8 +142,13 @@ class VehicleSerializer(serializers.ModelSerializer):
 # ------------------------------
 class ParkingTicketSerializer(serializers.ModelSerializer):
     vehicle = VehicleSerializer(read_only=True)
+    # The view and ParkingTicket.save() read section.area.town
+    section = serializers.PrimaryKeyRelatedField(queryset=ParkingSection.objects.select_related("area__town"))
     town_name = serializers.CharField(read_only=True)
     area_name = serializers.CharField(read_only=True)
+    # Written on purchase to find or create the vehicle, then copied from it
+    plate_number = serializers.CharField(max_length=40)
+    vehicle_type = serializers.ChoiceField(choices=Vehicle.VEHICLE_CHOICES)
 
     class Meta:
         model = ParkingTicket
@@ -76,6 +157,13 @@ class ParkingTicketSerializer(serializers.ModelSerializer):
             "town_name",
             "area_name",
             "vehicle",
-            "vehicle_type",
-            "plate_number",  # derived from vehicle
+        ]
+
+# Minimal row for enforcement officers (no nested vehicle)
+class ActiveTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ParkingTicket
+        fields = [
+            "id", "plate_number", "vehicle_type", "section", "town_name", "area_name",
+            "paid", "created_at", "expires_at",
         ]
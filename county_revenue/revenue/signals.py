@@ -0,0 +1,150 @@
+# revenue/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from . import dashboard, locations, reports, tariffs
+from .enforcement import invalidate_plate
+from .occupancy import get_tracker
+from .models import Area, ParkingSection, ParkingTicket, Permit, PermitTariff, PermitType, Town, Vehicle, VehicleRate
+from .pdf import get_pdf_cache
+from .vehicles import get_vehicle_cache
+
+
+# ------------------------------
+# PDF cache invalidation
+# ------------------------------
+@receiver(post_save, sender=Permit)
+@receiver(post_save, sender=ParkingTicket)
+def invalidate_pdf_on_save(sender, instance, created, **kwargs):
+    if not created and instance.has_changed(sender.PDF_FIELDS):
+        get_pdf_cache().invalidate(f"{sender._meta.model_name}-{instance.pk}")
+
+
+@receiver(post_delete, sender=Permit)
+@receiver(post_delete, sender=ParkingTicket)
+def invalidate_pdf_on_delete(sender, instance, **kwargs):
+    get_pdf_cache().invalidate(f"{sender._meta.model_name}-{instance.pk}")
+
+
+# ------------------------------
+# Location tree version
+# ------------------------------
+@receiver(post_save, sender=Town)
+@receiver(post_save, sender=Area)
+@receiver(post_save, sender=ParkingSection)
+@receiver(post_delete, sender=Town)
+@receiver(post_delete, sender=Area)
+@receiver(post_delete, sender=ParkingSection)
+def bump_location_tree_version(sender, **kwargs):
+    # After commit, so a concurrent rebuild cannot cache the old rows under the new version
+    transaction.on_commit(locations.bump_version)
+
+
+# ------------------------------
+# Tariff table version
+# ------------------------------
+@receiver(post_save, sender=PermitType)
+@receiver(post_save, sender=PermitTariff)
+@receiver(post_save, sender=VehicleRate)
+@receiver(post_delete, sender=PermitType)
+@receiver(post_delete, sender=PermitTariff)
+@receiver(post_delete, sender=VehicleRate)
+def bump_tariff_version(sender, **kwargs):
+    # Now so this transaction prices with its own rows, and again after commit
+    # in case another worker recompiled from the old rows in between
+    tariffs.bump_version()
+    transaction.on_commit(tariffs.bump_version)
+
+
+# ------------------------------
+# Parking occupancy
+# ------------------------------
+@receiver(post_save, sender=ParkingTicket)
+def track_ticket_start(sender, instance, created, **kwargs):
+    if created:
+        section_id, expires_at = instance.section_id, instance.expires_at
+        transaction.on_commit(lambda: get_tracker().ticket_started(section_id, expires_at))
+
+
+@receiver(post_delete, sender=ParkingTicket)
+def track_ticket_removal(sender, instance, **kwargs):
+    section_id, expires_at = instance.section_id, instance.expires_at
+    if expires_at is None:
+        return
+    transaction.on_commit(lambda: get_tracker().ticket_removed(section_id, expires_at))
+
+
+@receiver(post_save, sender=ParkingSection)
+def track_section_capacity(sender, instance, **kwargs):
+    section_id, capacity = instance.pk, instance.capacity
+    transaction.on_commit(lambda: get_tracker().set_capacity(section_id, capacity))
+
+
+@receiver(post_delete, sender=ParkingSection)
+def forget_section_capacity(sender, instance, **kwargs):
+    section_id = instance.pk
+    transaction.on_commit(lambda: get_tracker().set_capacity(section_id, None))
+
+
+# ------------------------------
+# Plate lookup cache
+# ------------------------------
+@receiver(post_save, sender=ParkingTicket)
+@receiver(post_delete, sender=ParkingTicket)
+def invalidate_plate_status(sender, instance, **kwargs):
+    plate = instance.plate_normalized
+    invalidate_plate(plate)
+    # Again after commit, in case a lookup re-cached the old rows meanwhile
+    transaction.on_commit(lambda: invalidate_plate(plate))
+
+
+# ------------------------------
+# Revenue rollups
+# ------------------------------
+@receiver(pre_save, sender=Permit)
+@receiver(pre_save, sender=ParkingTicket)
+def load_previous_values(sender, instance, raw=False, **kwargs):
+    # Rollups and dashboard counters move an update's old contribution
+    if not raw:
+        reports.load_previous_values(instance)
+
+
+@receiver(post_save, sender=Permit)
+@receiver(post_save, sender=ParkingTicket)
+def update_revenue_rollups(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        reports.record_save(instance, created)
+
+
+@receiver(post_delete, sender=Permit)
+@receiver(post_delete, sender=ParkingTicket)
+def remove_from_revenue_rollups(sender, instance, **kwargs):
+    reports.record_delete(instance)
+
+
+# ------------------------------
+# Dashboard counters
+# ------------------------------
+@receiver(post_save, sender=Permit)
+@receiver(post_save, sender=ParkingTicket)
+def update_dashboard_counters(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        dashboard.record_save(instance, created)
+
+
+@receiver(post_delete, sender=Permit)
+@receiver(post_delete, sender=ParkingTicket)
+def remove_from_dashboard_counters(sender, instance, **kwargs):
+    dashboard.record_delete(instance)
+
+
+# ------------------------------
+# Vehicle cache
+# ------------------------------
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def invalidate_cached_vehicle(sender, instance, **kwargs):
+    vehicle_pk = instance.pk
+    get_vehicle_cache().invalidate(vehicle_pk)
+    transaction.on_commit(lambda: get_vehicle_cache().invalidate(vehicle_pk))
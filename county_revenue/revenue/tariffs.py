@@ -0,0 +1,242 @@
+# revenue/tariffs.py
+"""
+Compiled permit and parking tariffs.
+
+Fees live in the database:
+- a PermitType's own fee columns are its base tariff;
+- PermitTariff rows replace them from their ``effective_from`` date;
+- VehicleRate rows hold hourly parking rates per vehicle class, also
+  effective-dated.
+
+``get_tariffs()`` compiles all of them into an immutable ``TariffTable``
+that each worker keeps in memory. Tariff saves and deletes bump a version
+number kept in the database (see signals.py and versions.py); every
+worker checks it at most every ``CACHE_VERSION_CHECK_SECONDS`` and
+recompiles its table when it has moved. Otherwise pricing is a
+dictionary lookup plus a bisect on effective dates, with no queries.
+"""
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from types import MappingProxyType
+from typing import NamedTuple, Optional
+
+from django.utils import timezone
+
+from . import versions
+from .replicas import use_primary
+
+VERSION_NAME = "tariffs"
+ZERO = Decimal(0)
+CENT = Decimal("0.01")
+BEGINNING = date.min
+
+
+# Last table this process compiled, as (version, TariffTable)
+_local = (None, None)
+
+
+class PermitQuote(NamedTuple):
+    permit_type_id: int
+    start_date: date
+    duration_days: Optional[int] = None
+    duration_months: Optional[int] = None
+
+
+class ParkingQuote(NamedTuple):
+    vehicle_type: str
+    duration: int
+    time_unit: str
+    on: Optional[date] = None
+
+
+class PermitRates(NamedTuple):
+    basis: str    # "yearly", "monthly", "daily" or "" (free)
+    registration_fee: Decimal
+    annual_fee: Decimal
+    monthly_fee: Decimal
+    daily_fee: Decimal
+    monthly_cap: Optional[Decimal]
+    # Registration plus the pro-rated annual fee, by start month (index 0 = January)
+    yearly_by_month: tuple
+
+    @classmethod
+    def compile(cls, basis, registration_fee, annual_fee, monthly_fee, daily_fee, monthly_cap):
+        monthly_portion = annual_fee / 12
+        yearly_by_month = tuple(registration_fee + monthly_portion * (12 - month + 1) for month in range(1, 13))
+        return cls(basis, registration_fee, annual_fee, monthly_fee, daily_fee, monthly_cap, yearly_by_month)
+
+    def fee(self, start_date, duration_days=None, duration_months=None):
+        if self.basis == "yearly":
+            return self.yearly_by_month[start_date.month - 1]
+        if self.basis == "monthly":
+            fee = self.monthly_fee * (duration_months or 1)
+            return fee if self.monthly_cap is None else min(fee, self.monthly_cap)
+        if self.basis == "daily":
+            return self.daily_fee * (duration_days or 1)
+        return ZERO
+
+
+def permit_basis(permit_type):
+    if permit_type.is_yearly:
+        return "yearly"
+    if permit_type.is_monthly:
+        return "monthly"
+    if permit_type.is_daily:
+        return "daily"
+    return ""
+
+
+def base_permit_rates(permit_type):
+    """The tariff carried on the PermitType row itself."""
+    return PermitRates.compile(
+        permit_basis(permit_type), permit_type.registration_fee, permit_type.annual_fee,
+        permit_type.monthly_fee, permit_type.daily_fee, permit_type.monthly_cap,
+    )
+
+
+def unit_rates(hourly_rate):
+    """Price of one minute / hour / day of parking at ``hourly_rate``."""
+    return MappingProxyType({
+        "minutes": hourly_rate / Decimal(60),
+        "hours": hourly_rate,
+        "days": hourly_rate * Decimal(24),
+    })
+
+
+NO_RATES = unit_rates(ZERO)
+
+
+# ------------------------------
+# Compiled table
+# ------------------------------
+class TariffTable:
+    """
+    Read-only lookup structure. ``permits`` maps a permit type id, and
+    ``vehicles`` maps a vehicle type, to ``(effective_from dates, rates)``,
+    both sorted by date. ``permit_types`` holds the PermitType rows the
+    table was compiled from, by id; treat them as read-only.
+    """
+
+    def __init__(self, permits, vehicles, permit_types=None):
+        self.permits = MappingProxyType(permits)
+        self.vehicles = MappingProxyType(vehicles)
+        self.permit_types = MappingProxyType(permit_types or {})
+        self.permit_type_ids = MappingProxyType({
+            permit_type.name: pk for pk, permit_type in self.permit_types.items()
+        })
+
+    def permit_type(self, id_or_name):
+        """A PermitType by id or name, or ``None``."""
+        if isinstance(id_or_name, str) and not id_or_name.isdigit():
+            id_or_name = self.permit_type_ids.get(id_or_name)
+        try:
+            return self.permit_types.get(int(id_or_name))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def in_effect(schedule, on):
+        dates, values = schedule
+        index = bisect_right(dates, on) - 1
+        return values[index] if index >= 0 else None
+
+    def permit_rates(self, permit_type_id, on):
+        schedule = self.permits.get(permit_type_id)
+        return self.in_effect(schedule, on) if schedule else None
+
+    def unit_rates(self, vehicle_type, on):
+        schedule = self.vehicles.get(vehicle_type)
+        rates = self.in_effect(schedule, on) if schedule else None
+        return NO_RATES if rates is None else rates
+
+    def permit_fee(self, permit_type_id, start_date, duration_days=None, duration_months=None):
+        rates = self.permit_rates(permit_type_id, start_date)
+        if rates is None:
+            raise KeyError(permit_type_id)
+        return rates.fee(start_date, duration_days, duration_months)
+
+    def parking_amount(self, vehicle_type, duration, time_unit, on=None):
+        rate = self.unit_rates(vehicle_type, on or timezone.localdate()).get(time_unit, ZERO)
+        return (rate * Decimal(duration)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def compile_tariffs():
+    """Three queries: permit types, permit tariffs, vehicle rates."""
+    from .models import PermitTariff, PermitType, VehicleRate
+
+    permit_schedules = {}
+    bases = {}
+    permit_types = PermitType.objects.in_bulk()
+    for permit_type in permit_types.values():
+        bases[permit_type.pk] = permit_basis(permit_type)
+        permit_schedules[permit_type.pk] = [(BEGINNING, base_permit_rates(permit_type))]
+    for tariff in PermitTariff.objects.order_by("effective_from"):
+        if tariff.permit_type_id not in bases:
+            continue
+        permit_schedules[tariff.permit_type_id].append((tariff.effective_from, PermitRates.compile(
+            bases[tariff.permit_type_id], tariff.registration_fee, tariff.annual_fee,
+            tariff.monthly_fee, tariff.daily_fee, tariff.monthly_cap,
+        )))
+
+    vehicle_schedules = {}
+    for rate in VehicleRate.objects.order_by("effective_from"):
+        vehicle_schedules.setdefault(rate.vehicle_type, []).append((rate.effective_from, unit_rates(rate.hourly_rate)))
+
+    def freeze(schedules):
+        # A later row with the same effective date wins
+        frozen = {}
+        for key, entries in schedules.items():
+            by_date = dict(entries)
+            dates = tuple(sorted(by_date))
+            frozen[key] = (dates, tuple(by_date[day] for day in dates))
+        return frozen
+
+    return TariffTable(freeze(permit_schedules), freeze(vehicle_schedules), permit_types)
+
+
+# ------------------------------
+# Per-process cache
+# ------------------------------
+def get_version():
+    return versions.get_version(VERSION_NAME)
+
+
+def bump_version():
+    versions.bump_version(VERSION_NAME)
+
+
+def get_tariffs():
+    global _local
+    version = get_version()
+    if _local[0] != version:
+        with use_primary():
+            _local = (version, compile_tariffs())
+    return _local[1]
+
+
+# ------------------------------
+# Batch pricing
+# ------------------------------
+def quote_many(items, tariffs=None):
+    """
+    Price a list of ``PermitQuote`` / ``ParkingQuote`` items, or unsaved
+    Permit / ParkingTicket instances, against one compiled table. Returns
+    the fees in the same order; no queries once the table is compiled.
+    """
+    from .models import ParkingTicket, Permit
+
+    tariffs = tariffs or get_tariffs()
+    today = timezone.localdate()
+    fees = []
+    for item in items:
+        if isinstance(item, Permit):
+            item = PermitQuote(item.permit_type_id, item.start_date, item.duration_days, item.duration_months)
+        elif isinstance(item, ParkingTicket):
+            item = ParkingQuote(item.vehicle_type, item.duration, item.time_unit, item.tariff_date())
+
+        if isinstance(item, PermitQuote):
+            fees.append(tariffs.permit_fee(*item))
+        else:
+            fees.append(tariffs.parking_amount(item.vehicle_type, item.duration, item.time_unit, item.on or today))
+    return fees
@@ -1,3 +1,1566 @@
-from django.test import TestCase
+import copy
+import csv
+import gzip
+import importlib
+import io
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from django.db import connection, connections
+from django.db.models.signals import post_save
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from county_revenue.caching import TTLCache, per_process
+
+from . import (
+    dashboard, idempotency, occupancy, payments, pdf, renewals, replicas, reports, tariffs, vehicles, versions,
+)
+from .models import (
+    Area, DashboardCounter, IdempotencyKey, ParkingSection, ParkingTicket, PaymentEvent, Permit, PermitTariff, PermitType,
+    RenewalCheckpoint, RevenueRollup, Town, Vehicle, VehicleRate, create_permit_types, normalize_plate,
+)
+from .permit_numbers import BlockSequencePermitNumberAllocator, is_valid_permit_number, luhn_check_digit
+from .serializers import PermitSerializer
+from .views import ParkingTicketViewSet
+
+User = get_user_model()
+
+
+# ------------------------------
+# PERMIT NUMBERS
+# ------------------------------
+class PermitNumberAllocatorTests(TestCase):
+    def test_luhn_check_digit(self):
+        self.assertEqual(luhn_check_digit("7992739871"), "3")
+        self.assertTrue(is_valid_permit_number(BlockSequencePermitNumberAllocator.format_number(4, 2026, 125)))
+        self.assertFalse(is_valid_permit_number("004-2026-0000125-0"))
+
+    def test_parallel_writers_get_unique_increasing_numbers(self):
+        reserved = []
+        reserve_lock = threading.Lock()
+        next_free = {}
+
+        def reserve_block(permit_type_id, year, size):
+            with reserve_lock:
+                first = next_free.get((permit_type_id, year), 1)
+                next_free[(permit_type_id, year)] = first + size
+                reserved.append(first)
+                return first, first + size
+
+        allocator = BlockSequencePermitNumberAllocator(block_size=7, reserve_block=reserve_block)
+
+        def writer(_):
+            return [allocator.next_sequence(3, 2026) for _ in range(200)]
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(writer, range(16)))
+
+        issued = [value for values in results for value in values]
+        self.assertEqual(len(issued), len(set(issued)))
+        self.assertEqual(sorted(issued), list(range(1, 16 * 200 + 1)))
+        for values in results:
+            self.assertEqual(values, sorted(values))
+
+    def test_save_assigns_sequential_numbers_per_type_and_year(self):
+        create_permit_types()
+        user = User.objects.create_user("trader", password="pass")
+        hawking = PermitType.objects.get(name="Hawking")
+        first = Permit.objects.create(permit_type=hawking, owner=user, owner_name="A")
+        second = Permit.objects.create(permit_type=hawking, owner=user, owner_name="B")
+        self.assertTrue(is_valid_permit_number(first.permit_number))
+        self.assertLess(first.permit_number, second.permit_number)
+        self.assertTrue(first.permit_number.startswith(f"{hawking.pk:03d}-{first.start_date.year}-"))
+
+    def test_save_retries_after_collision(self):
+        create_permit_types()
+        user = User.objects.create_user("trader", password="pass")
+        hawking = PermitType.objects.get(name="Hawking")
+        taken = BlockSequencePermitNumberAllocator.format_number(hawking.pk, Permit().start_date.year, 1)
+        Permit.objects.create(permit_type=hawking, owner=user, owner_name="Seeded", permit_number=taken)
+
+        permit = Permit.objects.create(permit_type=hawking, owner=user, owner_name="A")
+        self.assertNotEqual(permit.permit_number, taken)
+
+
+class PermitNumberConcurrencyTests(TransactionTestCase):
+    def test_parallel_writers_against_the_database(self):
+        if connection.vendor == "sqlite":
+            self.skipTest("SQLite serialises writers; run against MySQL")
+        create_permit_types()
+        user = User.objects.create_user("sacco", password="pass")
+        psv = PermitType.objects.get(name="PSV")
+
+        def writer(index):
+            try:
+                return [
+                    Permit.objects.create(permit_type=psv, owner=user, owner_name=f"{index}-{n}").permit_number
+                    for n in range(20)
+                ]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            numbers = [number for batch in pool.map(writer, range(8)) for number in batch]
+        self.assertEqual(len(numbers), len(set(numbers)))
+        self.assertEqual(Permit.objects.count(), 160)
+
+
+# ------------------------------
+# QUERY COUNT BUDGETS
+# ------------------------------
+class QueryBudgetTestCase(TestCase):
+    def assertMaxQueries(self, limit, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            result = func(*args, **kwargs)
+        self.assertLessEqual(
+            len(queries), limit,
+            f"{len(queries)} queries, budget {limit}:\n" + "\n".join(q["sql"] for q in queries),
+        )
+        return result
+
+
+class LocationListQueryTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.town = Town.objects.create(name="Meru")
+        cls.area = Area.objects.create(town=cls.town, name="CBD")
+        for index in range(20):
+            Area.objects.create(town=cls.town, name=f"Ward {index}")
+        ParkingSection.objects.bulk_create(
+            ParkingSection(area=cls.area, name=f"S{index}", capacity=10) for index in range(200)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_town_list(self):
+        response = self.assertMaxQueries(1, self.client.get, "/revenue/towns/")
+        self.assertEqual(len(response.json()), 1)
+
+    def test_areas_by_town(self):
+        for query in ("", "?compact=1"):
+            response = self.assertMaxQueries(1, self.client.get, f"/revenue/towns/{self.town.pk}/areas/{query}")
+            self.assertEqual(len(response.json()), 21)
+
+    def test_sections_by_area(self):
+        response = self.assertMaxQueries(1, self.client.get, f"/revenue/areas/{self.area.pk}/sections/")
+        self.assertEqual(len(response.json()), 200)
+        self.assertEqual(response.json()[0]["area"]["town"]["name"], "Meru")
+
+    def test_sections_by_area_compact(self):
+        response = self.assertMaxQueries(1, self.client.get, f"/revenue/areas/{self.area.pk}/sections/?compact=1")
+        row = response.json()[0]
+        self.assertEqual(
+            set(row), {"id", "name", "capacity", "is_custom", "area_id", "area_name", "town_id", "town_name"}
+        )
+        self.assertEqual((row["area_name"], row["town_name"]), ("CBD", "Meru"))
+
+
+class TicketListQueryTests(QueryBudgetTestCase):
+    def test_ticket_list(self):
+        user = User.objects.create_user("driver", password="pass")
+        section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        for index in range(30):
+            vehicle = Vehicle.objects.create(owner=user, plate_number=f"KCB {index:03d}A", vehicle_type="saloon")
+            ParkingTicket.objects.create(vehicle=vehicle, section=section, duration=1, time_unit="hours")
+
+        client = APIClient()
+        client.force_authenticate(user)
+        response = self.assertMaxQueries(1, client.get, "/revenue/tickets/")
+        self.assertEqual(len(response.json()["results"]), 30)
+
+
+class CreateQueryTests(TestCase):
+    """Creation is a single INSERT plus its rollup and counter UPDATEs (savepoints come from the atomic save)"""
+
+    def setUp(self):
+        create_permit_types()
+        self.user = User.objects.create_user("trader", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_permit_create(self):
+        hawking = PermitType.objects.get(name="Hawking")
+        payload = {"permit_type": hawking.pk, "duration_months": 2, "duration_days": 9}
+        # The first one warms the tariff table and permit number block and creates the rollup and counter rows
+        self.client.post("/revenue/permits/", payload, format="json")
+        with self.assertNumQueries(5):
+            response = self.client.post("/revenue/permits/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        permit = Permit.objects.get(pk=response.json()["id"])
+        self.assertEqual((permit.duration_months, permit.duration_days, permit.total_fee), (2, None, 400))
+
+    def test_permit_type_added_by_another_worker(self):
+        tariffs.get_tariffs()
+        seen = dict(versions._checked)
+        stalls = PermitType.objects.create(name="Night Market", monthly_fee=150, is_monthly=True)
+        # Saved by another process: this one's tariff table does not have it yet
+        versions._checked.update(seen)
+        self.assertNotIn(stalls.pk, tariffs.get_tariffs().permit_types)
+        response = self.client.post("/revenue/permits/", {"permit_type": stalls.pk, "duration_months": 2},
+                                    format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["total_fee"], "300.00")
+
+    def test_permit_types_are_copies(self):
+        permit_types = tariffs.get_tariffs().permit_types
+        hawking = PermitType.objects.get(name="Hawking")
+        field = PermitSerializer(context={"permit_types": permit_types}).fields["permit_type"]
+        permit_type = field.to_internal_value(hawking.pk)
+        self.assertEqual(permit_type, hawking)
+        self.assertIsNot(permit_type, permit_types[hawking.pk])
+
+    def test_ticket_create(self):
+        payload = {
+            "section": self.section.pk, "plate_number": "KCB 124B", "vehicle_type": "van",
+            "duration": 2, "time_unit": "hours",
+        }
+        self.client.post("/revenue/tickets/", payload, format="json")
+        # Section with area and town, the vehicle, the INSERT, the rollup and counter UPDATEs
+        with self.assertNumQueries(7):
+            response = self.client.post("/revenue/tickets/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()["town_name"], response.json()["amount"]), ("Meru", "200.00"))
+
+    def test_updates_write_only_changed_columns(self):
+        vehicle = Vehicle.objects.create(owner=self.user, plate_number="KCB 124B", vehicle_type="van")
+        ticket = ParkingTicket.objects.create(vehicle=vehicle, section=self.section, duration=1, time_unit="hours")
+        ticket = ParkingTicket.objects.select_related("vehicle", "section__area__town").get(pk=ticket.pk)
+        ticket.paid = True
+        with CaptureQueriesContext(connection) as queries:
+            ticket.save()
+        update = next(query["sql"] for query in queries if query["sql"].startswith("UPDATE \"revenue_parkingticket\""))
+        self.assertIn('"paid"', update)
+        self.assertIn('"updated_at"', update)
+        self.assertNotIn('"duration"', update)
+
+    def test_unchanged_saves_still_write_and_signal(self):
+        permit = Permit.objects.create(permit_type=PermitType.objects.get(name="Hawking"), owner=self.user,
+                                       owner_name="trader")
+        permit = Permit.objects.get(pk=permit.pk)
+        saved = mock.Mock()
+        post_save.connect(saved, sender=Permit)
+        self.addCleanup(post_save.disconnect, saved, sender=Permit)
+        with CaptureQueriesContext(connection) as queries:
+            permit.save()
+        self.assertTrue(any(query["sql"].startswith("UPDATE \"revenue_permit\"") for query in queries))
+        saved.assert_called_once()
+
+
+class PermitBulkTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.hawking = PermitType.objects.get(name="Hawking")
+        self.user = User.objects.create_user("trader", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rows = [
+            {"permit_type": self.hawking.pk, "duration_months": 1},
+            {"permit_type": self.hawking.pk, "duration_months": 2, "owner_name": "Stall 12"},
+            {"permit_type": self.hawking.pk, "duration_days": 10},
+        ]
+
+    def test_issues_every_row(self):
+        response = self.client.post("/revenue/permits/bulk/", self.rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(body["created"], 3)
+        self.assertEqual([permit["owner_name"] for permit in body["permits"]], ["trader", "Stall 12", "trader"])
+        self.assertEqual(sorted(permit["id"] for permit in body["permits"]),
+                         sorted(Permit.objects.filter(owner=self.user).values_list("pk", flat=True)))
+        self.assertTrue(all(is_valid_permit_number(permit["permit_number"]) for permit in body["permits"]))
+
+    def test_returns_ids_when_the_database_does_not(self):
+        # As on MySQL, where bulk_create leaves pk unset
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            response = self.client.post("/revenue/permits/bulk/", self.rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        for permit in response.json()["permits"]:
+            self.assertEqual(Permit.objects.get(pk=permit["id"]).permit_number, permit["permit_number"])
+
+    def test_any_invalid_row_rejects_the_batch(self):
+        rows = self.rows + [{"permit_type": 9999, "duration_months": 1}, {"duration_months": 1}]
+        response = self.client.post("/revenue/permits/bulk/", rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertEqual([error["index"] for error in errors], [3, 4])
+        self.assertIn("permit_type", errors[0]["errors"])
+        self.assertFalse(Permit.objects.exists())
+
+        for payload in ([], {"permit_type": self.hawking.pk}):
+            self.assertEqual(self.client.post("/revenue/permits/bulk/", payload, format="json").status_code, 400)
+        with override_settings(PERMIT_BULK_MAX_ROWS=2):
+            self.assertEqual(self.client.post("/revenue/permits/bulk/", self.rows, format="json").status_code, 400)
+
+    def test_failed_insert_leaves_nothing_behind(self):
+        with mock.patch.object(dashboard, "record_bulk_create", side_effect=RuntimeError("killed")):
+            with self.assertRaises(RuntimeError):
+                self.client.post("/revenue/permits/bulk/", self.rows, format="json")
+        self.assertFalse(Permit.objects.exists())
+        self.assertFalse(RevenueRollup.objects.exists())
+
+
+@override_settings(API_PAGE_SIZE=4)
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.user = User.objects.create_user("clerk", password="pass", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        hawking = PermitType.objects.get(name="Hawking")
+        # Several permits share a start date, so the id tie-break matters
+        for index in range(10):
+            Permit.objects.create(
+                permit_type=hawking, owner=self.user, owner_name=f"P{index}",
+                start_date=date(2026, 1, 1) + timedelta(days=index // 3),
+            )
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            page = self.client.get(url).json()
+            pages.append(page)
+            ids += [row["id"] for row in page["results"]]
+            url = page["next"]
+        return ids, pages
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        ids, pages = self.walk("/revenue/permits/")
+        expected = list(Permit.objects.order_by("-start_date", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(page["results"]) for page in pages], [4, 4, 2])
+        self.assertIsNone(pages[0]["previous"])
+
+        back = self.client.get(pages[2]["previous"]).json()
+        self.assertEqual([row["id"] for row in back["results"]], expected[4:8])
+
+    def test_inserts_while_paging_do_not_shift_later_pages(self):
+        first = self.client.get("/revenue/permits/").json()
+        Permit.objects.create(
+            permit_type=PermitType.objects.get(name="Hawking"), owner=self.user, owner_name="late",
+            start_date=date(2026, 2, 1),
+        )
+        ids, _ = self.walk(first["next"])
+        expected = list(Permit.objects.order_by("-start_date", "-id").values_list("id", flat=True))
+        self.assertEqual([row["id"] for row in first["results"]] + ids, expected[1:])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get("/revenue/permits/", {"cursor": "not-a-cursor"}).status_code, 404)
+
+
+# ------------------------------
+# ASYNC READ VIEWS (ASGI)
+# ------------------------------
+class AsyncReadViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_permit_types()
+        cls.town = Town.objects.create(name="Meru")
+        cls.area = Area.objects.create(town=cls.town, name="CBD")
+        ParkingSection.objects.bulk_create(
+            ParkingSection(area=cls.area, name=f"S{index}", capacity=10) for index in range(5)
+        )
+        cls.officer = User.objects.create_user("officer", password="pass", role="staff")
+        cls.driver = User.objects.create_user("driver", password="pass")
+
+    async def test_asgi_requests_get_the_same_payloads(self):
+        sync_client = APIClient()
+        paths = [
+            "/api/permit-types/",
+            f"/api/permit-types/{(await PermitType.objects.afirst()).pk}/",
+            "/api/permit-types/999999/",
+            "/revenue/towns/",
+            f"/revenue/towns/{self.town.pk}/areas/",
+            f"/revenue/towns/{self.town.pk}/areas/?compact=1",
+            f"/revenue/areas/{self.area.pk}/sections/",
+            f"/revenue/areas/{self.area.pk}/sections/?compact=1",
+        ]
+        for path in paths:
+            expected = await sync_to_async(sync_client.get)(path, HTTP_ACCEPT="application/json")
+            response = await AsyncClient().get(path)
+            self.assertEqual((response.status_code, response.json()), (expected.status_code, expected.json()), path)
+            # Served by the async view, not the DRF one
+            self.assertNotIn("Allow", response)
+
+    async def test_async_plate_status_authenticates_like_drf(self):
+        await sync_to_async(cache.clear)()
+        path = "/revenue/enforcement/plate/kcb 124b/"
+        self.assertEqual((await AsyncClient().get(path)).status_code, 401)
+        self.assertEqual((await AsyncClient().get(path, headers={"Authorization": "Token nope"})).status_code, 401)
+        driver = await Token.objects.acreate(user=self.driver)
+        response = await AsyncClient().get(path, headers={"Authorization": f"Token {driver.key}"})
+        self.assertEqual(response.status_code, 403)
+
+        officer = await Token.objects.acreate(user=self.officer)
+        for _ in range(2):    # second call: token and plate both cached
+            response = await AsyncClient().get(path, headers={"Authorization": f"Token {officer.key}"})
+            self.assertEqual(response.json(), {
+                "plate": "KCB124B", "found": False, "paid": False, "active": False, "expires_at": None,
+            })
+
+
+# ------------------------------
+# LOCATION TREE
+# ------------------------------
+class LocationTreeTests(QueryBudgetTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        area = Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD")
+        ParkingSection.objects.create(area=area, name="A1", capacity=12)
+
+    def test_tree_is_cached_and_conditional(self):
+        response = self.assertMaxQueries(3, self.client.get, "/revenue/locations/tree/")
+        towns = response.json()["towns"]
+        self.assertEqual(towns[0]["areas"][0]["sections"][0]["capacity"], 12)
+
+        cached = self.assertMaxQueries(0, self.client.get, "/revenue/locations/tree/")
+        self.assertEqual(cached.content, response.content)
+
+        not_modified = self.client.get("/revenue/locations/tree/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_save_bumps_version(self):
+        etag = self.client.get("/revenue/locations/tree/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Town.objects.create(name="Nkubu")
+
+        response = self.client.get("/revenue/locations/tree/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual([town["name"] for town in response.json()["towns"]], ["Meru", "Nkubu"])
+
+    def test_edit_in_another_worker_reaches_this_one(self):
+        etag = self.client.get("/revenue/locations/tree/")["ETag"]
+        seen = dict(versions._checked)
+        with self.captureOnCommitCallbacks(execute=True):
+            Town.objects.create(name="Nkubu")
+        # Saved by another process: this one still holds the version it read
+        versions._checked.update(seen)
+        self.assertEqual(self.client.get("/revenue/locations/tree/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with override_settings(CACHE_VERSION_CHECK_SECONDS=0):
+            response = self.client.get("/revenue/locations/tree/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([town["name"] for town in response.json()["towns"]], ["Meru", "Nkubu"])
+
+
+# ------------------------------
+# PARKING OCCUPANCY
+# ------------------------------
+class OccupancyTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.tracker = occupancy.OccupancyTracker(resync_seconds=3600, clock=lambda: self.now)
+        patcher = mock.patch.object(occupancy, "_tracker", self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        vehicles.get_vehicle_cache().clear()
+
+        self.user = User.objects.create_user("driver", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1", capacity=2
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def buy(self, plate, duration=1, time_unit="hours"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post("/revenue/tickets/", {
+                "section": self.section.pk, "plate_number": plate, "vehicle_type": "saloon",
+                "duration": duration, "time_unit": time_unit,
+            })
+
+    def occupied(self):
+        return self.client.get(f"/revenue/sections/{self.section.pk}/occupancy/").json()["occupied"]
+
+    def test_counts_new_tickets_and_expiries(self):
+        self.assertEqual(self.occupied(), 0)
+        self.assertEqual(self.buy("KCB 001A", 30, "minutes").status_code, 201)
+        self.assertEqual(self.buy("KCB 002A", 2, "hours").status_code, 201)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.occupied(), 2)
+        self.assertEqual(len(queries), 0)
+
+        self.now += timedelta(hours=1)
+        self.assertEqual(self.occupied(), 1)
+        occupancy_map = self.client.get("/revenue/sections/occupancy/").json()
+        self.assertEqual(occupancy_map[str(self.section.pk)]["available"], 1)
+
+    def test_resync_picks_up_tickets_sold_elsewhere(self):
+        self.occupied()
+        vehicle = Vehicle.objects.create(owner=self.user, plate_number="KCB 003A", vehicle_type="van")
+        ParkingTicket.objects.create(vehicle=vehicle, section=self.section, duration=1, time_unit="hours")
+        self.tracker.resync()
+        self.assertEqual(self.occupied(), 1)
+
+    @override_settings(PARKING_ENFORCE_CAPACITY=True)
+    def test_rejects_tickets_when_full(self):
+        self.buy("KCB 001A")
+        self.buy("KCB 002A")
+        response = self.buy("KCB 003A")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("section", response.json())
+
+
+# ------------------------------
+# VEHICLES
+# ------------------------------
+class VehicleUpsertTests(TestCase):
+    def setUp(self):
+        vehicles.get_vehicle_cache().clear()
+        self.user = User.objects.create_user("driver", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def buy(self, plate, vehicle_type="saloon"):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/revenue/tickets/", {
+                "section": self.section.pk, "plate_number": plate, "vehicle_type": vehicle_type,
+                "duration": 1, "time_unit": "hours",
+            })
+        self.assertEqual(response.status_code, 201)
+        return ParkingTicket.objects.get(pk=response.json()["id"])
+
+    def test_spellings_of_a_plate_share_one_vehicle(self):
+        first = self.buy("kcb 124b")
+        with CaptureQueriesContext(connection) as queries:
+            second = self.buy("KCB-124B", "van")
+        self.assertEqual(first.vehicle_id, second.vehicle_id)
+        # The repeat purchase takes the vehicle from the cache
+        self.assertFalse([query for query in queries
+                          if 'FROM "revenue_vehicle"' in query["sql"] or 'INTO "revenue_vehicle"' in query["sql"]])
+        vehicle = Vehicle.objects.get(owner=self.user)
+        self.assertEqual((vehicle.plate_normalized, vehicle.vehicle_type), ("KCB124B", "saloon"))
+        self.assertEqual(vehicles.get_vehicle_cache().stats()["hits"], 1)
+
+    def test_upsert_leaves_an_existing_vehicle_alone(self):
+        existing = Vehicle.objects.create(owner=self.user, plate_number="KCB 124B", vehicle_type="van")
+        vehicles.upsert(self.user, "kcb124b", "saloon")
+        self.assertEqual(list(Vehicle.objects.values_list("pk", "plate_number", "vehicle_type")),
+                         [(existing.pk, "KCB 124B", "van")])
+        vehicles.upsert(self.user, "KBZ 001A", "bus_lorry")
+        self.assertEqual(Vehicle.objects.get(plate_normalized="KBZ001A").vehicle_type, "bus_lorry")
+
+    def test_changed_vehicle_is_dropped_from_cache(self):
+        vehicle = self.buy("KCB 124B").vehicle
+        with self.captureOnCommitCallbacks(execute=True):
+            vehicle.vehicle_type = "van"
+            vehicle.save()
+        self.assertEqual(self.buy("KCB 124B").vehicle_type, "van")
+        self.assertEqual(vehicles.get_vehicle_cache().stats()["hits"], 0)
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_size_bound_expiry_and_invalidation(self):
+        lru = TTLCache(2, ttl=60)
+        lru.put("a", 1)
+        lru.put("b", 2)
+        lru.get("a")
+        lru.put("c", 3)    # "b" is the least recently used
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+        self.assertEqual(lru.pop_where(lambda value: value > 2), ["c"])
+        self.assertEqual(len(lru), 1)
+        lru.put("d", 4, ttl=0)
+        self.assertIsNone(lru.get("d"))
+
+    def test_per_process_builds_once(self):
+        factory = mock.Mock(side_effect=object)
+        get = per_process(factory)
+        self.assertIs(get(), get())
+        factory.assert_called_once()
+
+
+class StaleVehicleCacheTests(TransactionTestCase):
+    # Committed transactions: SQLite only checks foreign keys on commit
+    def test_vehicle_deleted_by_another_worker(self):
+        vehicle_cache = vehicles.get_vehicle_cache()
+        vehicle_cache.clear()
+        user = User.objects.create_user("driver", password="pass")
+        section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {"section": section.pk, "plate_number": "KCB 124B", "vehicle_type": "van",
+                   "duration": 1, "time_unit": "hours"}
+        self.assertEqual(client.post("/revenue/tickets/", payload).status_code, 201)
+
+        vehicle = Vehicle.objects.get()
+        stale = copy.copy(vehicle)
+        vehicle.delete()
+        # Deleted by another process: this one's cache still has it
+        vehicle_cache.put((user.pk, "KCB124B"), stale)
+
+        response = client.post("/revenue/tickets/", payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(vehicle_cache.stats()["hits"], 1)
+        ticket = ParkingTicket.objects.get(pk=response.json()["id"])
+        self.assertNotEqual(ticket.vehicle_id, stale.pk)
+        self.assertEqual(Vehicle.objects.get().pk, ticket.vehicle_id)
+
+
+# ------------------------------
+# TICKET EXPIRY / ENFORCEMENT
+# ------------------------------
+class TicketExpiryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("driver", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.vehicle = Vehicle.objects.create(owner=self.user, plate_number="KCB 124B", vehicle_type="saloon")
+        self.officer = User.objects.create_user("officer", password="pass", role="staff")
+
+    def ticket(self, duration, time_unit):
+        return ParkingTicket.objects.create(
+            vehicle=self.vehicle, section=self.section, duration=duration, time_unit=time_unit
+        )
+
+    def test_save_sets_expires_at(self):
+        ticket = self.ticket(90, "minutes")
+        self.assertAlmostEqual(
+            (ticket.expires_at - ticket.created_at).total_seconds(), 90 * 60, delta=1
+        )
+
+    def test_active_and_expired_querysets(self):
+        running = self.ticket(2, "hours")
+        finished = self.ticket(1, "hours")
+        ParkingTicket.objects.filter(pk=finished.pk).update(expires_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(list(ParkingTicket.objects.active()), [running])
+        self.assertEqual(list(ParkingTicket.objects.expired()), [finished])
+
+    def test_backfill_migration_fills_missing_expiry(self):
+        ticket = self.ticket(3, "days")
+        ParkingTicket.objects.filter(pk=ticket.pk).update(expires_at=None)
+        migration = importlib.import_module("revenue.migrations.0004_parkingticket_expires_at")
+        migration.backfill_expires_at(apps, mock.Mock(connection=connection))
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.expires_at, ticket.created_at + timedelta(days=3))
+
+    def test_officer_endpoints(self):
+        self.ticket(1, "hours")
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get("/revenue/enforcement/active/?plate=KCB 124B").status_code, 403)
+
+        client.force_authenticate(self.officer)
+        by_plate = client.get("/revenue/enforcement/active/", {"plate": "KCB 124B"}).json()
+        self.assertEqual(len(by_plate), 1)
+        self.assertIn("expires_at", by_plate[0])
+        by_section = client.get(f"/revenue/enforcement/sections/{self.section.pk}/active/").json()
+        self.assertEqual([row["plate_number"] for row in by_section], ["KCB 124B"])
+
+    def test_plate_status_normalizes_and_caches(self):
+        cache.clear()
+        self.assertEqual(normalize_plate(" kcb-124b "), "KCB124B")
+        client = APIClient()
+        client.force_authenticate(self.officer)
+        self.assertEqual(client.get("/revenue/enforcement/plate/kcb124b/").json()["found"], False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = self.ticket(1, "hours")
+        status = client.get("/revenue/enforcement/plate/kcb 124B/").json()
+        self.assertEqual(
+            {k: status[k] for k in ("plate", "found", "active", "paid")},
+            {"plate": "KCB124B", "found": True, "active": True, "paid": False},
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get("/revenue/enforcement/plate/KCB124B/")
+        self.assertEqual(len(queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.paid = True
+            ticket.save()
+        self.assertTrue(client.get("/revenue/enforcement/plate/KCB124B/").json()["paid"])
+
+
+# ------------------------------
+# REVENUE ROLLUPS
+# ------------------------------
+class RevenueRollupTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.user = User.objects.create_user("trader", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.vehicle = Vehicle.objects.create(owner=self.user, plate_number="KCB 124B", vehicle_type="van")
+
+    def snapshot(self):
+        return sorted(RevenueRollup.objects.values_list(
+            "date", "source", "town_name", "area_name", "category", "count", "billed", "collected",
+        ))
+
+    def test_signals_keep_rollups_equal_to_a_rebuild(self):
+        hawking = PermitType.objects.get(name="Hawking")
+        permit = Permit.objects.create(permit_type=hawking, owner=self.user, owner_name="A", duration_months=2)
+        Permit.objects.create(permit_type=PermitType.objects.get(name="PSV"), owner=self.user, owner_name="B")
+        ticket = ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=2, time_unit="hours")
+        gone = ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=1, time_unit="hours")
+
+        permit = Permit.objects.get(pk=permit.pk)
+        permit.amount_paid = permit.total_fee
+        permit.duration_months = 3
+        permit.save()
+        ticket = ParkingTicket.objects.get(pk=ticket.pk)
+        ticket.paid = True
+        ticket.save()
+        gone.delete()
+
+        incremental = self.snapshot()
+        reports.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+        ticket_row = RevenueRollup.objects.get(source="ticket")
+        self.assertEqual((ticket_row.count, ticket_row.billed, ticket_row.collected), (1, 200, 200))
+
+    def test_updates_of_partially_loaded_rows_move_their_contribution(self):
+        hawking = PermitType.objects.get(name="Hawking")
+        permit = Permit.objects.create(permit_type=hawking, owner=self.user, owner_name="A", duration_months=2)
+        ticket = ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=2, time_unit="hours")
+
+        permit = Permit.objects.only("id", "amount_paid").get(pk=permit.pk)
+        permit.amount_paid = 100
+        permit.save()
+        ticket = ParkingTicket.objects.only("id", "paid").get(pk=ticket.pk)
+        ticket.paid = True
+        ticket.save()
+
+        incremental = self.snapshot()
+        self.assertEqual(RevenueRollup.objects.get(source="permit").collected, 100)
+        reports.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_saves_after_refresh_start_from_the_refreshed_values(self):
+        hawking = PermitType.objects.get(name="Hawking")
+        permit = Permit.objects.create(permit_type=hawking, owner=self.user, owner_name="A", duration_months=2)
+        permit = Permit.objects.get(pk=permit.pk)
+        other = Permit.objects.get(pk=permit.pk)
+        other.amount_paid += 100
+        other.save()
+
+        permit.refresh_from_db()
+        permit.notes = "Checked"
+        permit.save()
+        self.assertEqual(RevenueRollup.objects.get(source="permit").collected, 100)
+        incremental = self.snapshot()
+        reports.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_deferred_fields_set_before_save_are_written(self):
+        hawking = PermitType.objects.get(name="Hawking")
+        permit = Permit.objects.create(permit_type=hawking, owner=self.user, owner_name="A", duration_months=2)
+        ticket = ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=2, time_unit="hours")
+
+        permit = Permit.objects.only("id", "notes").get(pk=permit.pk)
+        permit.notes = "Paid at the counter"
+        permit.amount_paid = 400
+        permit.paid = True
+        permit.save()
+        ticket = ParkingTicket.objects.defer("paid").get(pk=ticket.pk)
+        ticket.paid = True
+        ticket.save()
+
+        self.assertEqual(Permit.objects.values_list("notes", "amount_paid", "paid").get(),
+                         ("Paid at the counter", 400, True))
+        self.assertTrue(ParkingTicket.objects.get().paid)
+        incremental = self.snapshot()
+        reports.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_report_endpoint(self):
+        ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=1, time_unit="hours")
+        Permit.objects.create(permit_type=PermitType.objects.get(name="Hawking"), owner=self.user, owner_name="A")
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get("/revenue/reports/").status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = client.get("/revenue/reports/", {"group_by": "source,town"})
+        results = {(row["source"], row["town_name"]): row["billed"] for row in response.json()["results"]}
+        self.assertEqual(results, {("permit", ""): "200.00", ("ticket", "Meru"): "100.00"})
+        self.assertEqual(client.get("/revenue/reports/", {"group_by": "owner"}).status_code, 400)
+
+
+# ------------------------------
+# DASHBOARD COUNTERS
+# ------------------------------
+class DashboardCounterTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.user = User.objects.create_user("trader", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.vehicle = Vehicle.objects.create(owner=self.user, plate_number="KCB 124B", vehicle_type="van")
+
+    def direct_counts(self, now):
+        today = timezone.localdate(now)
+        permits, tickets = Permit.objects.all(), ParkingTicket.objects.all()
+        return {
+            "permits": {
+                "active": permits.filter(end_date__gte=today).count(),
+                "expired": permits.filter(end_date__lt=today).count(),
+                "paid": permits.filter(paid=True).count(), "unpaid": permits.filter(paid=False).count(),
+                "total": permits.count(),
+            },
+            "tickets": {
+                "active": tickets.active(now).count(), "expired": tickets.expired(now).count(),
+                "paid": tickets.filter(paid=True).count(), "unpaid": tickets.filter(paid=False).count(),
+                "total": tickets.count(),
+            },
+        }
+
+    def test_counters_follow_saves_bulk_writes_and_time(self):
+        hawking = PermitType.objects.get(name="Hawking")
+        permit = Permit.objects.create(permit_type=hawking, owner=self.user, owner_name="A")
+        Permit.objects.create(permit_type=hawking, owner=self.user, owner_name="Old", start_date=date(2020, 1, 1))
+        Permit.bulk_issue([Permit(permit_type=hawking, owner=self.user, owner_name="B", duration_months=3)])
+        tickets = [
+            ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=2, time_unit="days")
+            for _ in range(3)
+        ]
+        permit = Permit.objects.get(pk=permit.pk)
+        permit.paid = True
+        permit.save()
+        tickets[0].delete()
+        payment = payments.FakeProvider(seed=1).payment(f"T{tickets[1].pk}", tickets[1].amount)
+        payments.enqueue([payments.event_from_callback(payment)])
+        payments.process_pending()
+
+        now = timezone.now()
+        summary = dashboard.summary(now)
+        self.assertEqual({key: summary[key] for key in ("permits", "tickets")}, self.direct_counts(now))
+        self.assertEqual(summary["permits"], {"active": 2, "expired": 1, "paid": 1, "unpaid": 2, "total": 3})
+        self.assertEqual(summary["tickets"], {"active": 2, "expired": 0, "paid": 1, "unpaid": 1, "total": 2})
+
+        # Three days on, both tickets have run out without any writes
+        later = dashboard.summary(now + timedelta(days=3))
+        self.assertEqual((later["tickets"]["active"], later["tickets"]["expired"]), (0, 2))
+
+        before, after = dashboard.reconcile(now)
+        self.assertEqual(before, after)
+
+    def test_saves_after_refresh_move_counters_once(self):
+        permit = Permit.objects.create(permit_type=PermitType.objects.get(name="Hawking"), owner=self.user,
+                                       owner_name="A")
+        permit = Permit.objects.get(pk=permit.pk)
+        other = Permit.objects.get(pk=permit.pk)
+        other.paid = True
+        other.save()
+
+        permit.refresh_from_db()
+        permit.notes = "Checked"
+        permit.save()
+        now = timezone.now()
+        self.assertEqual(dashboard.summary(now)["permits"], self.direct_counts(now)["permits"])
+        before, after = dashboard.reconcile(now)
+        self.assertEqual(before, after)
+
+    def test_reconcile_corrects_drift(self):
+        Permit.objects.create(permit_type=PermitType.objects.get(name="PSV"), owner=self.user, owner_name="A")
+        Permit.objects.update(paid=True)    # no signals
+        before, after = dashboard.reconcile()
+        self.assertEqual((before["permits"]["paid"], after["permits"]["paid"]), (0, 1))
+        out = io.StringIO()
+        call_command("reconcile_dashboard_counters", stdout=out)
+        self.assertIn("drift: none", out.getvalue())
+
+    def test_summary_endpoint_is_one_query_for_staff(self):
+        Permit.objects.create(permit_type=PermitType.objects.get(name="PSV"), owner=self.user, owner_name="A")
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get("/revenue/dashboard/summary/").status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/revenue/dashboard/summary/")
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.json()["permits"]["unpaid"], 1)
+        self.assertEqual(response.json()["tickets"]["total"], 0)
+
+
+# ------------------------------
+# EXPORTS
+# ------------------------------
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.user = User.objects.create_user("auditor", password="pass", is_staff=True)
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.vehicle = Vehicle.objects.create(owner=self.user, plate_number="KCB 124B", vehicle_type="van")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_ticket_ndjson_streams_every_row(self):
+        for hours in range(1, 6):
+            ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=hours, time_unit="hours")
+        response = self.client.get("/revenue/exports/tickets.ndjson", {"town": "Meru"})
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([row["duration"] for row in rows], [1, 2, 3, 4, 5])
+        self.assertEqual(rows[0]["amount"], "100.00")
+        self.assertEqual(rows[0]["section"], "A1")
+
+        response = self.client.get("/revenue/exports/tickets.ndjson", {"town": "Embu"})
+        self.assertEqual(b"".join(response.streaming_content), b"")
+
+    def test_permit_csv_with_filters_and_gzip(self):
+        Permit.objects.create(permit_type=PermitType.objects.get(name="Hawking"), owner=self.user, owner_name="A")
+        Permit.objects.create(permit_type=PermitType.objects.get(name="PSV"), owner=self.user, owner_name="B")
+        response = self.client.get("/revenue/exports/permits.csv", {"type": "Hawking"}, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).decode().splitlines()
+        rows = list(csv.DictReader(lines))
+        self.assertEqual([(row["permit_type"], row["owner_name"]) for row in rows], [("Hawking", "A")])
+
+        self.assertEqual(self.client.get("/revenue/exports/permits.csv", {"town": "Meru"}).status_code, 400)
+        self.assertEqual(self.client.get("/revenue/exports/permits.xml").status_code, 404)
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.client.get("/revenue/exports/permits.csv").status_code, 403)
+
+
+# ------------------------------
+# TARIFFS
+# ------------------------------
+class TariffTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.user = User.objects.create_user("trader", password="pass")
+        self.hawking = PermitType.objects.get(name="Hawking")
+        self.psv = PermitType.objects.get(name="PSV")
+
+    def test_fees_match_the_former_hard_coded_rules(self):
+        tariffs.get_tariffs()
+        with self.assertNumQueries(0):
+            fees = tariffs.quote_many([
+                tariffs.PermitQuote(self.psv.pk, date(2026, 7, 1)),
+                tariffs.PermitQuote(self.hawking.pk, date(2026, 7, 1), duration_months=3),
+                tariffs.PermitQuote(self.hawking.pk, date(2026, 7, 1), duration_months=24),
+                tariffs.ParkingQuote("van", 90, "minutes"),
+                tariffs.ParkingQuote("truck_tanker", 2, "days"),
+                tariffs.ParkingQuote("bicycle", 2, "hours"),
+            ])
+        self.assertEqual(fees, [
+            Decimal(3000) + Decimal(10000) / 12 * 6, Decimal(600), Decimal(2400),
+            Decimal("150.00"), Decimal("8640.00"), Decimal("0.00"),
+        ])
+
+    def test_edit_in_another_worker_reaches_this_one(self):
+        today = timezone.localdate()
+        self.assertEqual(tariffs.get_tariffs().parking_amount("saloon", 1, "hours", on=today), Decimal("60.00"))
+        seen = dict(versions._checked)
+        VehicleRate.objects.create(vehicle_type="saloon", effective_from=date(2001, 1, 1), hourly_rate=90)
+        # Saved by another process: this one still holds the version it read
+        versions._checked.update(seen)
+        self.assertEqual(tariffs.get_tariffs().parking_amount("saloon", 1, "hours", on=today), Decimal("60.00"))
+
+        with override_settings(CACHE_VERSION_CHECK_SECONDS=0):
+            table = tariffs.get_tariffs()
+        self.assertEqual(table.parking_amount("saloon", 1, "hours", on=today), Decimal("90.00"))
+
+    def test_effective_dated_rates_and_invalidation(self):
+        VehicleRate.objects.create(vehicle_type="saloon", effective_from=date(2026, 7, 1), hourly_rate=80)
+        PermitTariff.objects.create(permit_type=self.hawking, effective_from=date(2026, 7, 1), monthly_fee=250)
+        table = tariffs.get_tariffs()
+        self.assertEqual(table.parking_amount("saloon", 1, "hours", on=date(2026, 6, 30)), Decimal("60.00"))
+        self.assertEqual(table.parking_amount("saloon", 1, "hours", on=date(2026, 7, 1)), Decimal("80.00"))
+        self.assertEqual(table.permit_fee(self.hawking.pk, date(2026, 6, 30), duration_months=2), 400)
+        # The new tariff row has no cap of its own
+        self.assertEqual(table.permit_fee(self.hawking.pk, date(2026, 7, 1), duration_months=20), 5000)
+
+        permit = Permit.objects.create(
+            permit_type=self.hawking, owner=self.user, owner_name="A", start_date=date(2026, 8, 1), duration_months=2,
+        )
+        self.assertEqual(permit.total_fee, 500)
+
+        self.hawking.monthly_fee = 300
+        self.hawking.save()
+        self.assertIsNot(tariffs.get_tariffs(), table)
+        self.assertEqual(tariffs.get_tariffs().permit_fee(self.hawking.pk, date(2026, 1, 1), duration_months=1), 300)
+
+    def test_quote_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        items = [
+            {"vehicle_type": "van", "duration": 90, "time_unit": "minutes"},
+            {"permit_type": "Hawking", "start_date": "2026-03-01", "duration": 3},
+            {"permit_type": self.psv.pk, "start_date": "2026-07-01"},
+        ]
+        tariffs.get_tariffs()
+        with self.assertNumQueries(0):
+            response = client.post("/revenue/quotes/", items, format="json")
+        self.assertEqual(response.status_code, 200)
+        quotes = response.json()["quotes"]
+        self.assertEqual(quotes[0]["amount"], "150.00")
+        self.assertEqual((quotes[1]["total_fee"], quotes[1]["end_date"]), ("600.00", "2026-05-29"))
+        self.assertEqual((quotes[2]["total_fee"], quotes[2]["duration_months"]), ("8000.00", None))
+        self.assertEqual(response.json()["total"], "8750.00")
+
+        response = client.post("/revenue/quotes/", [{"permit_type": "Kiosk"}, items[0]], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["index"] for error in response.json()["errors"]], [0])
+
+
+# ------------------------------
+# IDEMPOTENCY KEYS
+# ------------------------------
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        idempotency.get_front_cache().clear()
+        self.user = User.objects.create_user("driver", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {
+            "section": self.section.pk, "plate_number": "KCB 124B", "vehicle_type": "van",
+            "duration": 2, "time_unit": "hours",
+        }
+
+    def post(self, key, payload=None, url="/revenue/tickets/"):
+        return self.client.post(url, payload or self.payload, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_the_first_response(self):
+        first = self.post("retry-1")
+        self.assertEqual(first.status_code, 201)
+        replay = self.post("retry-1")
+        self.assertEqual((replay.status_code, replay.json()), (201, first.json()))
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+
+        # Another worker: no front cache entry, the stored row answers
+        idempotency.get_front_cache().clear()
+        replay = self.post("retry-1")
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(ParkingTicket.objects.count(), 1)
+
+        self.assertEqual(self.post("retry-1", dict(self.payload, duration=3)).status_code, 422)
+        self.assertEqual(self.post("retry-2").status_code, 201)
+        self.assertEqual(ParkingTicket.objects.count(), 2)
+
+        permit = {"permit_type": PermitType.objects.get(name="Hawking").pk}
+        self.assertEqual(self.post("permit-1", permit, url="/api/permits/").status_code, 201)
+        self.assertEqual(self.post("permit-1", permit, url="/api/permits/").status_code, 201)
+        self.assertEqual(Permit.objects.count(), 1)
+
+    def test_failed_requests_free_the_key(self):
+        self.assertEqual(self.post("bad", dict(self.payload, section=999)).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post("bad").status_code, 201)
+
+    def test_duplicate_arriving_mid_request_gets_409(self):
+        duplicates = []
+        original = ParkingTicketViewSet.perform_create
+
+        def perform_create(view, serializer):
+            # The client's retry lands while the first request is still writing
+            duplicates.append(self.post("slow"))
+            original(view, serializer)
+
+        with mock.patch.object(ParkingTicketViewSet, "perform_create", perform_create):
+            first = self.post("slow")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(duplicates[0].status_code, 409)
+        self.assertEqual(self.post("slow").json(), first.json())
+        self.assertEqual(ParkingTicket.objects.count(), 1)
+
+    def test_expired_keys_are_reusable_and_purged(self):
+        self.post("old")
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        idempotency.get_front_cache().clear()
+        self.assertNotIn("Idempotent-Replayed", self.post("old"))
+        self.assertEqual(ParkingTicket.objects.count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command("purge_idempotency_keys", stdout=io.StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class IdempotencyConcurrencyTests(TransactionTestCase):
+    def test_simultaneous_duplicates_create_one_ticket(self):
+        if connection.vendor == "sqlite":
+            self.skipTest("SQLite serialises writers; run against MySQL")
+        idempotency.get_front_cache().clear()
+        user = User.objects.create_user("driver", password="pass")
+        section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        payload = {"section": section.pk, "plate_number": "KCB 124B", "vehicle_type": "van",
+                   "duration": 2, "time_unit": "hours"}
+        start = threading.Barrier(8)
+
+        def submit(_):
+            try:
+                client = APIClient()
+                client.force_authenticate(user)
+                start.wait()
+                return client.post("/revenue/tickets/", payload, format="json", HTTP_IDEMPOTENCY_KEY="same")
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(pool.map(submit, range(8)))
+        self.assertEqual(ParkingTicket.objects.count(), 1)
+        self.assertEqual({response.status_code for response in responses} - {201, 409}, set())
+        ids = {response.json()["id"] for response in responses if response.status_code == 201}
+        self.assertEqual(len(ids), 1)
+
+
+# ------------------------------
+# PAYMENTS
+# ------------------------------
+@override_settings(PAYMENT_CALLBACK_TOKEN="s3cret")
+class PaymentTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.provider = payments.FakeProvider(seed=7)
+        self.user = User.objects.create_user("trader", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.vehicle = Vehicle.objects.create(owner=self.user, plate_number="KCB 124B", vehicle_type="van")
+        self.permit = Permit.objects.create(
+            permit_type=PermitType.objects.get(name="Hawking"), owner=self.user, owner_name="A", duration_months=2,
+        )
+        self.older, self.newer = (
+            ParkingTicket.objects.create(vehicle=self.vehicle, section=self.section, duration=1, time_unit="hours")
+            for _ in range(2)
+        )
+        self.client = APIClient()
+
+    def callback(self, body, token="s3cret"):
+        return self.client.post("/revenue/payments/callback/", body, format="json", HTTP_X_CALLBACK_TOKEN=token)
+
+    def test_callback_queues_each_receipt_once(self):
+        payment = self.provider.payment(self.permit.permit_number, 100)
+        self.assertEqual(self.callback(payment, token="wrong").status_code, 403)
+        with override_settings(PAYMENT_CALLBACK_TOKEN=None):
+            self.assertEqual(self.callback(payment).status_code, 403)
+
+        response = self.callback([payment, {"TransAmount": "5"}, dict(payment, TransID="X1", TransAmount="-1")])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["queued"], 1)
+        self.assertEqual([item["index"] for item in response.json()["rejected"]], [1, 2])
+        self.callback(payment)    # provider retry
+        self.assertEqual(PaymentEvent.objects.get().status, PaymentEvent.PENDING)
+
+    def test_matching_applies_payments_and_keeps_rollups(self):
+        queued = [
+            self.provider.payment(self.permit.permit_number, 150),
+            self.provider.payment(self.permit.permit_number.lower(), 250),
+            self.provider.payment(f"TKT-{self.older.pk}", 100),
+            self.provider.payment("kcb 124b", 100),     # newest unpaid ticket for the plate: self.newer
+            self.provider.payment("KCB124B", 100),      # nothing unpaid left
+            self.provider.payment(f"T{self.newer.pk}", 40),
+            self.provider.payment("NO-SUCH-REF", 10),
+        ]
+        payments.enqueue([payments.event_from_callback(item) for item in queued])
+        counts = payments.process_pending(batch_size=3)
+        counts_rest = payments.process_pending(batch_size=10)
+        self.assertEqual(payments.process_pending(), {})
+        self.assertEqual(sum(counts.values()) + sum(counts_rest.values()), len(queued))
+
+        self.permit.refresh_from_db()
+        self.older.refresh_from_db()
+        self.newer.refresh_from_db()
+        self.assertEqual((self.permit.amount_paid, self.permit.paid), (Decimal("400.00"), True))
+        self.assertTrue(self.older.paid and self.newer.paid)
+
+        events = {event.provider_ref: event for event in PaymentEvent.objects.all()}
+        statuses = [events[item["TransID"]].status for item in queued]
+        self.assertEqual(statuses, [
+            PaymentEvent.MATCHED, PaymentEvent.MATCHED, PaymentEvent.MATCHED, PaymentEvent.MATCHED,
+            PaymentEvent.UNMATCHED, PaymentEvent.REVIEW, PaymentEvent.UNMATCHED,
+        ])
+        self.assertEqual(events[queued[3]["TransID"]].ticket_id, self.newer.pk)
+        self.assertEqual(self.permit.payments.count(), 2)
+
+        rows = {(row["source"], row["collected"]) for row in
+                RevenueRollup.objects.values("source", "collected")}
+        self.assertEqual(rows, {("permit", Decimal("400.00")), ("ticket", Decimal("200.00"))})
+        incremental = sorted(RevenueRollup.objects.values_list("date", "source", "category", "count", "billed", "collected"))
+        reports.rebuild()
+        self.assertEqual(incremental, sorted(RevenueRollup.objects.values_list(
+            "date", "source", "category", "count", "billed", "collected",
+        )))
+
+    def test_statement_import(self):
+        queued = [self.provider.payment(f"T{self.older.pk}", 100), self.provider.payment("KCB 124B", 100)]
+        self.callback(queued[0])    # also reported by callback: stored once
+        statement = io.StringIO()
+        self.provider.write_statement(statement, queued)
+        statement.write("BAD1,2026-01-01 10:00:00,Completed,abc,,X\r\n")
+        statement.write("OUT1,2026-01-01 10:00:00,Completed,,,X\r\n")
+        statement.seek(0)
+
+        self.assertEqual(payments.import_statement(statement, chunk_size=1), (2, 1, [(4, "Invalid amount 'abc'.")]))
+        self.assertEqual(PaymentEvent.objects.count(), 2)
+        call_command("process_payments", stdout=io.StringIO())
+        self.assertEqual(PaymentEvent.objects.filter(status=PaymentEvent.MATCHED).count(), 2)
+        self.assertEqual(ParkingTicket.objects.filter(paid=True).count(), 2)
+
+
+# ------------------------------
+# RENEWALS
+# ------------------------------
+class RenewalTests(TestCase):
+    def setUp(self):
+        create_permit_types()
+        self.user = User.objects.create_user("trader", password="pass")
+        self.psv = PermitType.objects.get(name="PSV")
+        self.permits = [
+            Permit.objects.create(permit_type=self.psv, owner=self.user, owner_name=f"Owner {index}",
+                                  start_date=date(2026, 1, 1), paid=index % 2 == 0)
+            for index in range(5)
+        ]
+        # Not due: a monthly permit, and a yearly one for another year
+        Permit.objects.create(permit_type=PermitType.objects.get(name="Hawking"), owner=self.user, owner_name="H",
+                              start_date=date(2026, 12, 1))
+        Permit.objects.create(permit_type=self.psv, owner=self.user, owner_name="Old", start_date=date(2025, 6, 1))
+
+    def renew(self, *args):
+        out = io.StringIO()
+        call_command("renew_permits", "2026", *args, stdout=out)
+        return out.getvalue()
+
+    def test_renews_each_expiring_permit_once_at_next_years_fee(self):
+        PermitTariff.objects.create(permit_type=self.psv, effective_from=date(2027, 1, 1), registration_fee=3000,
+                                    annual_fee=12000)
+        self.assertIn("Renewed 5 permits for 2027", self.renew("--chunk-size", "2"))
+        self.assertIn("Nothing left to renew", self.renew())
+
+        renewed = Permit.objects.filter(start_date=date(2027, 1, 1)).order_by("pk")
+        self.assertEqual(
+            [(p.owner_name, p.end_date, p.total_fee, p.notes) for p in renewed],
+            [(old.owner_name, date(2027, 12, 31), Decimal("15000.00"), f"Renewed from {old.permit_number}")
+             for old in self.permits],
+        )
+        self.assertTrue(all(is_valid_permit_number(p.permit_number) for p in renewed))
+        self.assertEqual(Permit.objects.filter(renewed=True).count(), 5)
+        self.assertEqual(RenewalCheckpoint.objects.get().renewed_count, 5)
+
+        incremental = sorted(RevenueRollup.objects.values_list("date", "category", "count", "billed", "collected"))
+        reports.rebuild()
+        self.assertEqual(incremental, sorted(RevenueRollup.objects.values_list(
+            "date", "category", "count", "billed", "collected",
+        )))
+
+    def test_renewals_get_their_own_permit_types(self):
+        shared = tariffs.get_tariffs().permit_types[self.psv.pk]
+        checkpoint = renewals.plan(2026)[0]
+        with mock.patch.object(Permit, "bulk_issue", wraps=Permit.bulk_issue) as bulk_issue:
+            self.assertEqual(renewals.renew_chunk(checkpoint.pk, chunk_size=5), 5)
+        issued = bulk_issue.call_args.args[0]
+        self.assertEqual({permit.permit_type for permit in issued}, {self.psv})
+        self.assertFalse([permit for permit in issued if permit.permit_type is shared])
+        self.assertEqual(len({id(permit.permit_type) for permit in issued}), 5)
+
+    def test_resumes_from_checkpoint_and_splits_ranges(self):
+        checkpoints = renewals.plan(2026, workers=2)
+        self.assertEqual(len(checkpoints), 2)
+        self.assertEqual((checkpoints[0].range_start, checkpoints[-1].range_end),
+                         (self.permits[0].pk, self.permits[-1].pk))
+
+        with mock.patch.object(reports, "record_bulk_create", side_effect=RuntimeError("killed")):
+            with self.assertRaises(RuntimeError):
+                renewals.renew_range(checkpoints[0].pk, chunk_size=1)
+        self.assertEqual(Permit.objects.filter(renewed=True).count(), 0)    # the chunk rolled back
+
+        self.assertEqual(renewals.renew_chunk(checkpoints[0].pk, chunk_size=1), 1)
+        late = Permit.objects.create(permit_type=self.psv, owner=self.user, owner_name="Late",
+                                     start_date=date(2026, 11, 1))
+        self.assertEqual(len(renewals.plan(2026, workers=2)), 3)    # one more range for the late permit
+        self.renew("--paid-only")
+        self.assertEqual(set(Permit.objects.filter(renewed=True).values_list("pk", flat=True)),
+                         {self.permits[0].pk, self.permits[2].pk, self.permits[4].pk})
+
+        self.assertIn("Nothing left to renew", self.renew())
+        self.renew("--reset")    # a second pass for permits paid since
+        self.assertFalse(Permit.objects.filter(end_date=date(2026, 12, 31), renewed=False).exists())
+        self.assertEqual(Permit.objects.filter(start_date=date(2027, 1, 1)).count(), 6)
+
+
+
+# ------------------------------
+# PDF RENDERING
+# ------------------------------
+class PDFRenderTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        self.service = pdf.PDFRenderService(max_workers=1, inline_threshold=1, job_dir=root / "jobs")
+        # The pool's job handling, without spawning processes
+        self.service._executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.service._executor.shutdown)
+        self.cache = pdf.PDFCache(root / "cache")
+        for name, value in (("_service", self.service), ("_cache", self.cache)):
+            patcher = mock.patch.object(pdf, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        create_permit_types()
+        self.user = User.objects.create_user("trader", password="pass")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        hawking = PermitType.objects.get(name="Hawking")
+        response = self.client.post("/revenue/permits/", {"permit_type": hawking.pk, "duration_months": 1},
+                                    format="json")
+        self.permit = Permit.objects.get(pk=response.json()["id"])
+        self.url = f"/revenue/permits/{self.permit.pk}/pdf/"
+
+    def wait_for(self, job_id):
+        deadline = time.monotonic() + 30
+        while self.service.job(job_id)[0] == self.service.PENDING:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_idle_process_renders_inline(self):
+        response = self.client.get(self.url)
+        self.assertEqual((response.status_code, response["Content-Type"]), (200, "application/pdf"))
+        self.assertTrue(response.content.startswith(b"%PDF"))
+        self.assertEqual(self.service.queue_depth, 0)
+
+    def test_inline_renders_count_toward_queue_depth(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_render(html):
+            started.set()
+            release.wait(10)
+            return b"%PDF-1.4"
+
+        with mock.patch.object(pdf, "html_to_pdf", slow_render):
+            worker = threading.Thread(target=self.service.render_inline, args=("<p>first</p>",))
+            worker.start()
+            started.wait(10)
+            self.assertEqual(self.service.queue_depth, 1)
+            self.assertIsNone(self.service.render_inline("<p>second</p>"))
+            release.set()
+            worker.join()
+        self.assertEqual(self.service.queue_depth, 0)
+        self.assertEqual(self.service.render_inline("<p>third</p>")[:4], b"%PDF")
+
+    def test_busy_process_queues_a_job_for_its_owner(self):
+        self.service.inline_threshold = 0
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        self.assertEqual(response["Location"], response.json()["status_url"])
+        self.wait_for(job_id)
+
+        status = self.client.get(f"/revenue/pdf-jobs/{job_id}/").json()
+        self.assertEqual(status["status"], "ready")
+        download = self.client.get(status["download_url"])
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b"".join(download.streaming_content).startswith(b"%PDF"))
+        download.close()
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="pass"))
+        self.assertEqual(other.get(f"/revenue/pdf-jobs/{job_id}/").status_code, 404)
+        self.assertEqual(other.get(f"/revenue/pdf-jobs/{job_id}/download/").status_code, 404)
+        self.assertEqual(other.get(self.url).status_code, 404)
+
+    def test_cached_pdf_is_served_with_etag(self):
+        first = self.client.get(self.url)
+        etag = first["ETag"]
+        with mock.patch.object(pdf, "html_to_pdf", side_effect=AssertionError("rendered again")):
+            cached = self.client.get(self.url)
+            self.assertEqual((cached.status_code, cached["ETag"]), (200, etag))
+            self.assertEqual(b"".join(cached.streaming_content), first.content)
+            cached.close()
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((not_modified.status_code, not_modified["ETag"]), (304, etag))
+
+    def test_save_changing_printed_fields_drops_the_cached_pdf(self):
+        etag = self.client.get(self.url)["ETag"]
+        key = etag.strip('"')
+        self.assertIsNotNone(self.cache.get(key))
+
+        permit = Permit.objects.get(pk=self.permit.pk)
+        permit.renewed = True    # not printed
+        permit.save()
+        self.assertIsNotNone(self.cache.get(key))
+
+        permit.owner_name = "Jane Trader"
+        permit.save()
+        self.assertIsNone(self.cache.get(key))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_pool_renders_count_toward_the_cache_size(self):
+        self.service.inline_threshold = 0
+        self.cache._size = 0    # empty so far
+        job_id = self.client.get(self.url).json()["job_id"]
+        self.wait_for(job_id)
+        deadline = time.monotonic() + 10
+        while self.service.queue_depth:    # the completion callback has not run yet
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        (path,) = self.cache.root.glob("*.pdf")
+        self.assertEqual(self.cache._size, path.stat().st_size)
+
+
+# ------------------------------
+# READ REPLICAS
+# ------------------------------
+@skipUnless("replica" in settings.DATABASES, "needs a 'replica' database alias")
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(TransactionTestCase):
+    # Committed rows only: the replica connection cannot see another connection's open transaction
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        vehicles.get_vehicle_cache().clear()
+        self.user = User.objects.create_user("driver", password="pass")
+        self.section = ParkingSection.objects.create(
+            area=Area.objects.create(town=Town.objects.create(name="Meru"), name="CBD"), name="A1"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def queries_per_alias(self, method, *args, **kwargs):
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = method(*args, **kwargs)
+        return response, len(primary), len(replica)
+
+    def test_safe_requests_of_opted_in_views_read_from_replica(self):
+        response, _, replica = self.queries_per_alias(self.client.get, "/revenue/towns/")
+        self.assertEqual(response.json()[0]["name"], "Meru")
+        self.assertGreater(replica, 0)
+        # Views without the mixin stay on the primary
+        _, _, replica = self.queries_per_alias(self.client.get, f"/revenue/sections/{self.section.pk}/occupancy/")
+        self.assertEqual(replica, 0)
+
+    def test_writer_reads_own_writes_from_primary(self):
+        _, _, replica = self.queries_per_alias(self.client.get, "/revenue/tickets/")
+        self.assertGreater(replica, 0)
+        response, _, replica = self.queries_per_alias(self.client.post, "/revenue/tickets/", {
+            "section": self.section.pk, "plate_number": "KCB 124B", "vehicle_type": "saloon",
+            "duration": 1, "time_unit": "hours",
+        })
+        self.assertEqual((response.status_code, replica), (201, 0))
+        self.assertTrue(replicas.is_pinned(self.user.pk))
+        self.assertIn(replicas.PIN_COOKIE, self.client.cookies)
+
+        response, _, replica = self.queries_per_alias(self.client.get, "/revenue/tickets/")
+        self.assertEqual((len(response.json()["results"]), replica), (1, 0))
+        # Other users are not pinned
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="pass"))
+        _, _, replica = self.queries_per_alias(other.get, "/revenue/tickets/")
+        self.assertGreater(replica, 0)
+
+    def test_pins_reach_other_workers(self):
+        response = self.client.post("/revenue/tickets/", {
+            "section": self.section.pk, "plate_number": "KCB 124B", "vehicle_type": "saloon",
+            "duration": 1, "time_unit": "hours",
+        })
+        self.assertEqual(response.status_code, 201)
+        # Another worker, with its own cache: the cookie still pins the writer
+        cache.clear()
+        response, _, replica = self.queries_per_alias(self.client.get, "/revenue/tickets/")
+        self.assertEqual((len(response.json()["results"]), replica), (1, 0))
+
+        # The cookie pins only the user it was issued to
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="pass"))
+        other.cookies[replicas.PIN_COOKIE] = self.client.cookies[replicas.PIN_COOKIE].value
+        _, _, replica = self.queries_per_alias(other.get, "/revenue/tickets/")
+        self.assertGreater(replica, 0)
+
+        # Nor past REPLICA_PIN_SECONDS
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            _, _, replica = self.queries_per_alias(self.client.get, "/revenue/tickets/")
+        self.assertGreater(replica, 0)
+
+    def test_asgi_reads_route_like_the_drf_views(self):
+        get = async_to_sync(AsyncClient().get)
+        _, _, replica = self.queries_per_alias(get, "/revenue/towns/")
+        self.assertGreater(replica, 0)
+
+        token = Token.objects.create(user=self.user)
+        self.client.post("/revenue/tickets/", {
+            "section": self.section.pk, "plate_number": "KCB 124B", "vehicle_type": "saloon",
+            "duration": 1, "time_unit": "hours",
+        })
+        pinned = AsyncClient()
+        pinned.cookies[replicas.PIN_COOKIE] = self.client.cookies[replicas.PIN_COOKIE].value
+        pinned_get = async_to_sync(partial(pinned.get, headers={"authorization": f"Token {token.key}"}))
+        # Served by another worker, with its own cache
+        cache.clear()
+        for url in ("/revenue/towns/", f"/revenue/towns/{self.section.area.town_id}/areas/",
+                    f"/revenue/areas/{self.section.area_id}/sections/"):
+            response, _, replica = self.queries_per_alias(pinned_get, url)
+            self.assertEqual((response.status_code, replica), (200, 0))
+        # Permit types ignore pins, as PermitTypeViewSet does
+        _, _, replica = self.queries_per_alias(pinned_get, "/api/permit-types/")
+        self.assertGreater(replica, 0)
+
+    def test_cached_tables_are_built_from_primary(self):
+        with replicas.use_primary():
+            self.assertIsNone(replicas._read_alias.get())
+        token = replicas._read_alias.set("replica")
+        try:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                tariffs.get_tariffs()
+                self.assertEqual(Town.objects.db, "replica")
+        finally:
+            replicas._read_alias.reset(token)
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(Town.objects.db, "default")
+
+
+# ------------------------------
+# QUERY PLANS
+# ------------------------------
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        create_permit_types()
+        User.objects.create_user("trader", password="pass")
+        out = io.StringIO()
+        call_command("explain_hot_queries", "--fail-on-scan", stdout=out)
+        plans = out.getvalue()
+        if connection.vendor == "sqlite":
+            self.assertIn("(owner_id=? AND plate_normalized=?)", plans)
+            self.assertIn("USING INDEX permit_end_id_idx (end_date=? AND id>?)", plans)
@@ -7,6 +7,19 @@ from .views import (
     TownListAPIView,
     AreaByTownAPIView,
     ParkingSectionByAreaAPIView,
+    LocationTreeAPIView,
+    SectionOccupancyAPIView,
+    OccupancyMapAPIView,
+    PlateStatusAPIView,
+    ActiveTicketsByPlateAPIView,
+    ActiveTicketsBySectionAPIView,
+    RevenueReportAPIView,
+    DashboardSummaryAPIView,
+    ExportAPIView,
+    QuoteAPIView,
+    PaymentCallbackAPIView,
+    PDFJobStatusAPIView,
+    PDFJobDownloadAPIView,
 )
 
 # Router for ViewSets
@@ -22,4 +35,30 @@ urlpatterns = [
     path("towns/", TownListAPIView.as_view(), name="town-list"),
     path("towns/<int:town_id>/areas/", AreaByTownAPIView.as_view(), name="areas-by-town"),
     path("areas/<int:area_id>/sections/", ParkingSectionByAreaAPIView.as_view(), name="sections-by-area"),
+    path("locations/tree/", LocationTreeAPIView.as_view(), name="location-tree"),
+
+    # Price previews for the purchase forms
+    path("quotes/", QuoteAPIView.as_view(), name="fee-quotes"),
+
+    # Live occupancy
+    path("sections/occupancy/", OccupancyMapAPIView.as_view(), name="occupancy-map"),
+    path("sections/<int:section_id>/occupancy/", SectionOccupancyAPIView.as_view(), name="section-occupancy"),
+
+    # Enforcement officers
+    path("enforcement/plate/<str:plate>/", PlateStatusAPIView.as_view(), name="enforcement-plate-status"),
+    path("enforcement/active/", ActiveTicketsByPlateAPIView.as_view(), name="enforcement-active-by-plate"),
+    path("enforcement/sections/<int:section_id>/active/", ActiveTicketsBySectionAPIView.as_view(),
+         name="enforcement-active-by-section"),
+
+    # Staff reporting
+    path("reports/", RevenueReportAPIView.as_view(), name="revenue-reports"),
+    path("dashboard/summary/", DashboardSummaryAPIView.as_view(), name="dashboard-summary"),
+    path("exports/<str:dataset>.<str:fmt>", ExportAPIView.as_view(), name="revenue-export"),
+
+    # Payment provider
+    path("payments/callback/", PaymentCallbackAPIView.as_view(), name="payment-callback"),
+
+    # Queued PDF jobs
+    path("pdf-jobs/<uuid:job_id>/", PDFJobStatusAPIView.as_view(), name="pdf-job-status"),
+    path("pdf-jobs/<uuid:job_id>/download/", PDFJobDownloadAPIView.as_view(), name="pdf-job-download"),
 ]
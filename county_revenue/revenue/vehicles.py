@@ -0,0 +1,119 @@
+# revenue/vehicles.py
+"""
+The vehicle a ticket purchase is for.
+
+Every purchase names a plate, and the buyer's ``Vehicle`` for it is
+found or created. Plates are matched by ``plate_normalized``, unique per
+owner, so "kcb 124b" and "KCB-124B" are the same car. ``get_or_create``
+raced there: two purchases at once could both miss and both insert.
+
+``vehicle_for`` instead:
+1. returns the vehicle from a per-process LRU of ``VEHICLE_CACHE_SIZE``
+   entries, trusted for ``VEHICLE_CACHE_TTL`` seconds (repeat buyers);
+2. otherwise reads it through the unique (owner, plate_normalized) index;
+3. otherwise inserts it with ``INSERT ... ON CONFLICT DO UPDATE`` (MySQL:
+   ``ON DUPLICATE KEY UPDATE``), which never raises on a concurrent
+   insert, then reads back whichever row won with a locking read: under
+   MySQL's REPEATABLE READ a plain read in the purchase's transaction may
+   not see a row another transaction just committed.
+
+An existing vehicle keeps its type, as with ``get_or_create``. Vehicles
+are cached once the purchase commits; vehicle saves and deletes drop the
+cached copy (signals.py), but only in the worker that made them. A ticket
+that fails to save against a vehicle deleted elsewhere drops it and asks
+again with ``fresh=True``, which skips the cache and the plain read.
+"""
+import copy
+import threading
+
+from django.conf import settings
+from django.db import connections, router, transaction
+
+from county_revenue.caching import TTLCache, per_process
+
+from .models import Vehicle, normalize_plate
+
+
+class VehicleCache:
+    """``(owner_id, plate_normalized) -> Vehicle`` over a ``TTLCache``, with hit counters."""
+
+    def __init__(self, max_entries, ttl):
+        self._entries = TTLCache(max_entries, ttl)
+        self._lock = threading.Lock()    # guards the counters
+        self.hits = self.misses = self.invalidations = 0
+
+    def get(self, key):
+        vehicle = self._entries.get(key)
+        with self._lock:
+            if vehicle is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        # A copy, so callers cannot change the cached instance
+        return copy.copy(vehicle)
+
+    def put(self, key, vehicle):
+        self._entries.put(key, copy.copy(vehicle))
+
+    def invalidate(self, vehicle_pk):
+        """Drop a vehicle by pk; its plate may have changed since it was cached."""
+        keys = self._entries.pop_where(lambda vehicle: vehicle.pk == vehicle_pk)
+        with self._lock:
+            self.invalidations += len(keys)
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+get_vehicle_cache = per_process(lambda: VehicleCache(
+    max_entries=getattr(settings, "VEHICLE_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "VEHICLE_CACHE_TTL", 300),
+))
+
+
+def upsert(owner, plate_number, vehicle_type):
+    """Insert the owner's vehicle unless the plate exists; never raises on a concurrent insert."""
+    db = router.db_for_write(Vehicle)
+    features = connections[db].features
+    # The conflict target names the unique constraint; MySQL's ON DUPLICATE KEY has none
+    unique_fields = ["owner", "plate_normalized"] if features.supports_update_conflicts_with_target else None
+    vehicle = Vehicle(owner=owner, plate_number=plate_number, vehicle_type=vehicle_type,
+                      plate_normalized=normalize_plate(plate_number))
+    # Setting plate_normalized to itself leaves an existing row as it was
+    Vehicle.objects.using(db).bulk_create([vehicle], update_conflicts=True, unique_fields=unique_fields,
+                                          update_fields=["plate_normalized"])
+
+
+def vehicle_for(owner, plate_number, vehicle_type, fresh=False):
+    """The owner's vehicle with this plate, created with ``vehicle_type`` if new."""
+    key = (owner.pk, normalize_plate(plate_number))
+    vehicle_cache = get_vehicle_cache()
+    lookup = Vehicle.objects.filter(owner=owner, plate_normalized=key[1])
+    vehicle = None
+    if not fresh:
+        vehicle = vehicle_cache.get(key)
+        if vehicle is not None:
+            return vehicle
+        vehicle = lookup.first()
+    if vehicle is None:
+        db = router.db_for_write(Vehicle)
+        with transaction.atomic(using=db):
+            upsert(owner, plate_number, vehicle_type)
+            # From the primary, locking: a concurrent purchase may have inserted first, with its own type
+            vehicle = lookup.using(db).select_for_update().get()
+    # Only once committed: a rolled-back insert must not be remembered
+    transaction.on_commit(lambda: vehicle_cache.put(key, vehicle))
+    return vehicle
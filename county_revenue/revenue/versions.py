@@ -0,0 +1,61 @@
+# revenue/versions.py
+"""
+Version numbers of the tables every worker caches in memory: the location
+tree (locations.py) and the tariff table (tariffs.py).
+
+The numbers live in ``CacheVersion`` rows rather than in Django's cache,
+which is per process unless a shared backend is configured, so a bump
+made by one worker reaches all of them. Each process re-reads a row at
+most every ``CACHE_VERSION_CHECK_SECONDS``, and right after its own bumps,
+so another worker's edit is picked up within that many seconds.
+
+Versions never fall behind the clock in milliseconds: a number is not
+handed out twice, even when a bump is rolled back.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import router
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+# name -> (version, time.monotonic() it was read)
+_checked = {}
+_lock = threading.Lock()
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def version_rows():
+    from .models import CacheVersion    # models imports tariffs, which imports this module
+
+    # The primary: a lagging replica would hand out old versions
+    return CacheVersion.objects.using(router.db_for_write(CacheVersion))
+
+
+def get_version(name):
+    with _lock:
+        entry = _checked.get(name)
+    if entry is not None and time.monotonic() - entry[1] < getattr(settings, "CACHE_VERSION_CHECK_SECONDS", 2):
+        return entry[0]
+    version = version_rows().filter(name=name).values_list("version", flat=True).first()
+    if version is None:
+        version = version_rows().get_or_create(name=name, defaults={"version": now_ms()})[0].version
+    with _lock:
+        _checked[name] = (version, time.monotonic())
+    return version
+
+
+def bump_version(name):
+    if not version_rows().filter(name=name).update(version=Greatest(F("version") + 1, now_ms())):
+        version_rows().get_or_create(name=name, defaults={"version": now_ms()})
+    forget(name)
+
+
+def forget(name):
+    """Make this process re-read ``name``'s version on its next lookup."""
+    with _lock:
+        _checked.pop(name, None)
@@ -1,27 +1,157 @@
 # revenue/views.py
+import hmac
+import re
+from datetime import date
+from decimal import Decimal
 
-from rest_framework import viewsets, permissions, generics
+from rest_framework import viewsets, permissions, generics, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db import IntegrityError
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseNotModified, FileResponse, Http404, StreamingHttpResponse
 from django.template.loader import render_to_string
-from xhtml2pdf import pisa
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.text import compress_sequence
 
+from . import dashboard, enforcement, exports, locations, payments, reports, tariffs, vehicles
 from .models import (
     Permit, PermitType, ParkingSection, ParkingTicket,
-    Vehicle, Town, Area
+    Town, Area, normalize_plate
 )
+from .idempotency import IdempotentCreateMixin
+from .occupancy import get_tracker
+from .pagination import ParkingTicketPagination, PermitPagination
+from .pdf import PDFRenderError, get_pdf_cache, get_render_service
+from .replicas import ReplicaReadMixin
+from .permissions import IsEnforcementOfficer
 from .serializers import (
-    PermitSerializer, PermitTypeSerializer, ParkingTicketSerializer,
-    ParkingSectionSerializer, TownSerializer, AreaSerializer
+    PermitSerializer, PermitTypeSerializer, ParkingTicketSerializer, PermitBulkItemSerializer,
+    ParkingSectionSerializer, TownSerializer, AreaSerializer,
+    CompactAreaSerializer, CompactParkingSectionSerializer, ActiveTicketSerializer,
+    PermitQuoteSerializer, ParkingQuoteSerializer,
 )
 
+def etag_matches(request, etag):
+    client_etags = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+    return etag in client_etags or "*" in client_etags
+
+
+def parse_date_params(params, names=("start", "end")):
+    dates = {}
+    for name in names:
+        if params.get(name):
+            try:
+                dates[name] = date.fromisoformat(params[name])
+            except ValueError:
+                raise ValidationError({name: ["Expected a date as YYYY-MM-DD."]})
+    return dates
+
+
+# ------------------------------
+# PDF RENDERING
+# ------------------------------
+def cached_pdf_response(path, filename, etag):
+    """Stream a cached PDF, via the front-end server when X-Sendfile is configured."""
+    sendfile_header = getattr(settings, "PDF_SENDFILE_HEADER", None)
+    if sendfile_header:
+        # e.g. X-Accel-Redirect needs an internal URL prefix, X-Sendfile a filesystem path
+        prefix = getattr(settings, "PDF_SENDFILE_PREFIX", None)
+        response = HttpResponse(content_type="application/pdf")
+        response[sendfile_header] = f"{prefix}{path.name}" if prefix else str(path)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    else:
+        response = FileResponse(
+            open(path, "rb"), as_attachment=True,
+            filename=filename, content_type="application/pdf",
+        )
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+def render_pdf_response(request, obj, context, filename):
+    """
+    Serve ``obj``'s PDF from the cache when possible. Misses are rendered
+    inline while few renders are running, otherwise handed to the process
+    pool with a 202 and a job the client can poll.
+    """
+    cache = get_pdf_cache()
+    key = cache.key_for(obj.PDF_TEMPLATE, obj.pdf_cache_values())
+    etag = f'"{key}"'
+    label = f"{obj._meta.model_name}-{obj.pk}"
+
+    cached = cache.get(key)
+    if cached is not None:
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+            response["ETag"] = etag
+            return response
+        return cached_pdf_response(cached, filename, etag)
+
+    html = render_to_string(obj.PDF_TEMPLATE, context)
+    service = get_render_service()
+
+    try:
+        pdf = service.render_inline(html)
+    except PDFRenderError:
+        return HttpResponse("Error generating PDF")
+    if pdf is not None:
+        cache.put(key, label, pdf)
+        response = HttpResponse(pdf, content_type="application/pdf")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["ETag"] = etag
+        return response
+
+    job_id = service.submit(html, filename, request.user.pk, dest=cache.reserve(key, label), on_done=cache.added)
+    status_url = reverse("pdf-job-status", kwargs={"job_id": job_id}, request=request)
+    return Response(
+        {"job_id": job_id, "status": service.PENDING, "status_url": status_url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={"Location": status_url},
+    )
+
+
+class PDFJobStatusAPIView(APIView):
+    """Poll a queued PDF job"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_render_service().job(job_id)
+        if job is None or job[1]["owner"] != request.user.pk:
+            raise Http404
+        job_status = job[0]
+        data = {"job_id": job_id, "status": job_status}
+        if job_status == get_render_service().READY:
+            data["download_url"] = reverse("pdf-job-download", kwargs={"job_id": job_id}, request=request)
+        return Response(data)
+
+
+class PDFJobDownloadAPIView(APIView):
+    """Download the result of a finished PDF job"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = get_render_service().job(job_id)
+        if job is None or job[1]["owner"] != request.user.pk:
+            raise Http404
+        job_status, meta, path = job
+        if job_status != get_render_service().READY:
+            return Response({"job_id": job_id, "status": job_status}, status=status.HTTP_409_CONFLICT)
+        return cached_pdf_response(path, meta["filename"], etag=None)
+
+
 # ------------------------------
 # PERMIT TYPE API
 # ------------------------------
-class PermitTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class PermitTypeViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Read-only API for permit types"""
+    read_your_writes = False    # only staff change them, through the admin
     queryset = PermitType.objects.all()
     serializer_class = PermitTypeSerializer
     permission_classes = [permissions.AllowAny]
@@ -30,125 +160,393 @@ class PermitTypeViewSet(viewsets.ReadOnlyModelViewSet):
 # ------------------------------
 # PERMIT API
 # ------------------------------
-class PermitViewSet(viewsets.ModelViewSet):
+class PermitViewSet(ReplicaReadMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = Permit.objects.all()
     serializer_class = PermitSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PermitPagination
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Permit types from the compiled tariff table, which follows the database's tariff
+        # version: no query to validate permit_type, and one for a type not compiled yet
+        context["permit_types"] = tariffs.get_tariffs().permit_types
+        return context
 
     def perform_create(self, serializer):
-        permit = serializer.save(
+        # One INSERT: Permit.save() normalizes durations and prices the permit
+        serializer.save(
             owner=self.request.user,
             owner_name=self.request.user.get_full_name() or self.request.user.username
         )
-        permit_type = permit.permit_type
-
-        # Handle duration logic
-        if permit_type.is_monthly:
-            permit.duration_months = permit.duration_months or 1
-            permit.duration_days = None
-        elif permit_type.is_daily:
-            permit.duration_days = permit.duration_days or 1
-            permit.duration_months = None
-        elif permit_type.is_yearly:
-            permit.duration_years = permit.duration_years or 1
-            permit.duration_days = None
-            permit.duration_months = None
-
-        permit.save()
 
     def get_queryset(self):
         if self.request.user.is_staff:
             return Permit.objects.all()
         return Permit.objects.filter(owner=self.request.user)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Issue a list of permits in one transaction"""
+        rows = request.data
+        max_rows = getattr(settings, "PERMIT_BULK_MAX_ROWS", 10000)
+        if not isinstance(rows, list) or not rows:
+            return Response({"detail": "Expected a non-empty list of permits."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > max_rows:
+            return Response({"detail": f"At most {max_rows} permits per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        context = self.get_serializer_context()
+        default_owner_name = request.user.get_full_name() or request.user.username
+
+        permits, errors = [], []
+        for index, row in enumerate(rows):
+            item = PermitBulkItemSerializer(data=row, context=context)
+            if not item.is_valid():
+                errors.append({"index": index, "errors": item.errors})
+                continue
+            data = item.validated_data
+            data.setdefault("owner_name", default_owner_name)
+            permits.append(Permit(owner=request.user, **data))
+
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        created = Permit.bulk_issue(permits)
+        if any(permit.pk is None for permit in created):
+            # MySQL's multi-row INSERT returns no primary keys; read the rows back
+            by_number = Permit.objects.select_related("permit_type").in_bulk(
+                [permit.permit_number for permit in created], field_name="permit_number",
+            )
+            created = [by_number[permit.permit_number] for permit in created]
+        serializer = self.get_serializer(created, many=True)
+        return Response({"created": len(created), "permits": serializer.data}, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
         """Generate Permit PDF"""
-        permit = get_object_or_404(Permit, pk=pk, owner=request.user)
-        template_path = "revenue/permit/permit_pdf.html"
+        permit = get_object_or_404(Permit.objects.select_related("permit_type"), pk=pk, owner=request.user)
         context = {
             "permit": permit,
             "permit_type_display": permit.permit_type.name,
             "start_date_display": permit.start_date.strftime("%b %d, %Y") if permit.start_date else "",
             "end_date_display": permit.end_date.strftime("%b %d, %Y") if permit.end_date else "",
         }
-        html = render_to_string(template_path, context)
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="permit_{permit.id}.pdf"'
-        pisa_status = pisa.CreatePDF(html, dest=response)
-        if pisa_status.err:
-            return HttpResponse("Error generating PDF")
-        return response
+        return render_pdf_response(request, permit, context, f"permit_{permit.id}.pdf")
 
 
 # ------------------------------
 # PARKING TICKET API
 # ------------------------------
-class ParkingTicketViewSet(viewsets.ModelViewSet):
+class ParkingTicketViewSet(ReplicaReadMixin, IdempotentCreateMixin, viewsets.ModelViewSet):
     queryset = ParkingTicket.objects.all()
     serializer_class = ParkingTicketSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ParkingTicketPagination
 
     def perform_create(self, serializer):
+        # section comes with area and town; ParkingTicket.save() copies their names
         section = serializer.validated_data["section"]
-        area = section.area
-        town = area.town
 
-        vehicle, created = Vehicle.objects.get_or_create(
-            owner=self.request.user,
-            plate_number=serializer.validated_data["plate_number"],
-            defaults={"vehicle_type": serializer.validated_data["vehicle_type"]}
-        )
+        if getattr(settings, "PARKING_ENFORCE_CAPACITY", False) and not section.is_custom \
+                and get_tracker().is_full(section.pk):
+            raise ValidationError({"section": ["This parking section is full."]})
 
-        serializer.save(
-            section=section,
-            town_name=town.name,
-            area_name=area.name,
-            vehicle=vehicle,
-            vehicle_type=vehicle.vehicle_type,
-            plate_number=vehicle.plate_number
+        vehicle_args = (
+            self.request.user,
+            serializer.validated_data["plate_number"],
+            serializer.validated_data["vehicle_type"],
         )
+        vehicle = vehicles.vehicle_for(*vehicle_args)
+
+        try:
+            serializer.save(vehicle=vehicle)
+        except IntegrityError:
+            # A vehicle this worker cached may have been deleted by another: drop it and ask again
+            vehicles.get_vehicle_cache().invalidate(vehicle.pk)
+            serializer.save(vehicle=vehicles.vehicle_for(*vehicle_args, fresh=True))
 
     def get_queryset(self):
+        # ParkingTicketSerializer nests the vehicle
+        tickets = ParkingTicket.objects.select_related("vehicle")
         if self.request.user.is_staff:
-            return ParkingTicket.objects.all()
-        return ParkingTicket.objects.filter(vehicle__owner=self.request.user)
+            return tickets
+        return tickets.filter(vehicle__owner=self.request.user)
 
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
         """Generate Ticket PDF"""
-        ticket = get_object_or_404(ParkingTicket, pk=pk, vehicle__owner=request.user)
-        template_path = "revenue/parking/ticket_pdf.html"
+        ticket = get_object_or_404(
+            ParkingTicket.objects.select_related("section"), pk=pk, vehicle__owner=request.user
+        )
         context = {"ticket": ticket}
-        html = render_to_string(template_path, context)
-        response = HttpResponse(content_type="application/pdf")
-        response["Content-Disposition"] = f'attachment; filename="ticket_{ticket.id}.pdf"'
-        pisa_status = pisa.CreatePDF(html, dest=response)
-        if pisa_status.err:
-            return HttpResponse("Error generating PDF")
+        return render_pdf_response(request, ticket, context, f"ticket_{ticket.id}.pdf")
+
+
+# ------------------------------
+# FEE QUOTES
+# ------------------------------
+class QuoteAPIView(APIView):
+    """
+    Price a list of would-be purchases without saving anything:
+    [{"vehicle_type", "duration", "time_unit"} | {"permit_type", "start_date"?, "duration"?}, ...]
+    Uses the compiled tariff table, so a warm worker answers without queries.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        rows = request.data
+        max_items = getattr(settings, "QUOTE_MAX_ITEMS", 1000)
+        if not isinstance(rows, list) or not rows:
+            return Response({"detail": "Expected a non-empty list of items."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > max_items:
+            return Response({"detail": f"At most {max_items} items per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+        table = tariffs.get_tariffs()
+        context = {"tariffs": table}
+        items, errors = [], []
+        for index, row in enumerate(rows):
+            is_parking = isinstance(row, dict) and "vehicle_type" in row
+            item = (ParkingQuoteSerializer if is_parking else PermitQuoteSerializer)(data=row, context=context)
+            if not item.is_valid():
+                errors.append({"index": index, "errors": item.errors})
+                continue
+            data = item.validated_data
+            if is_parking:
+                items.append(ParkingTicket(
+                    vehicle_type=data["vehicle_type"], duration=data["duration"], time_unit=data["time_unit"],
+                ))
+            else:
+                permit = Permit(
+                    permit_type=data["permit_type"], start_date=data.get("start_date") or date.today(),
+                    duration_days=data.get("duration"), duration_months=data.get("duration"),
+                )
+                permit.normalize_durations()
+                items.append(permit)
+
+        if errors:
+            return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        quotes = []
+        fees = tariffs.quote_many(items, tariffs=table)
+        for item, fee in zip(items, fees):
+            if isinstance(item, ParkingTicket):
+                quotes.append({
+                    "vehicle_type": item.vehicle_type, "duration": item.duration, "time_unit": item.time_unit,
+                    "amount": str(reports.money(fee)), "expires_at": item.calculate_expiry(),
+                })
+            else:
+                quotes.append({
+                    "permit_type": item.permit_type_id, "start_date": item.start_date,
+                    "end_date": item.calculate_end_date(), "duration_days": item.duration_days,
+                    "duration_months": item.duration_months, "total_fee": str(reports.money(fee)),
+                })
+        return Response({"quotes": quotes, "total": str(reports.money(sum(fees)))})
+
+
+# ------------------------------
+# PAYMENT PROVIDER CALLBACKS
+# ------------------------------
+class PaymentCallbackAPIView(APIView):
+    """
+    Payment confirmations from the provider, one object or a list per call.
+    Only queued here; ``manage.py process_payments`` matches them.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        expected = getattr(settings, "PAYMENT_CALLBACK_TOKEN", None)
+        supplied = request.headers.get("X-Callback-Token", "")
+        if not expected or not hmac.compare_digest(supplied.encode(), expected.encode()):
+            return Response({"ResultCode": 1, "ResultDesc": "Rejected"}, status=status.HTTP_403_FORBIDDEN)
+
+        items = request.data if isinstance(request.data, list) else [request.data]
+        events, rejected = [], []
+        for index, item in enumerate(items):
+            try:
+                events.append(payments.event_from_callback(item))
+            except payments.PaymentParseError as exc:
+                rejected.append({"index": index, "error": str(exc)})
+        payments.enqueue(events)
+        return Response({"ResultCode": 0, "ResultDesc": "Accepted", "queued": len(events), "rejected": rejected})
+
+
+# ------------------------------
+# ENFORCEMENT (officers)
+# ------------------------------
+class PlateStatusAPIView(APIView):
+    """Is this plate covered right now? Minimal, cached payload for street checks"""
+    permission_classes = [IsEnforcementOfficer]
+
+    def get(self, request, plate):
+        return Response(enforcement.plate_status(plate))
+
+
+class ActiveTicketsByPlateAPIView(generics.ListAPIView):
+    """Tickets currently running for ``?plate=``; served by the (plate_normalized, expires_at) index"""
+    serializer_class = ActiveTicketSerializer
+    permission_classes = [IsEnforcementOfficer]
+    filter_backends = []
+
+    def get_queryset(self):
+        plate = normalize_plate(self.request.query_params.get("plate"))
+        if not plate:
+            raise ValidationError({"plate": ["This query parameter is required."]})
+        return ParkingTicket.objects.active().filter(plate_normalized=plate).order_by("-expires_at")
+
+
+class ActiveTicketsBySectionAPIView(generics.ListAPIView):
+    """Tickets currently running in a section; served by the (section, expires_at) index"""
+    serializer_class = ActiveTicketSerializer
+    permission_classes = [IsEnforcementOfficer]
+    filter_backends = []
+
+    def get_queryset(self):
+        return ParkingTicket.objects.active().filter(section_id=self.kwargs["section_id"]).order_by("expires_at")
+
+
+# ------------------------------
+# REPORTS (staff)
+# ------------------------------
+class RevenueReportAPIView(ReplicaReadMixin, APIView):
+    """
+    Revenue totals from the daily rollups.
+    ?group_by=date,town,area,category,source  ?start=&end= (YYYY-MM-DD)  ?source=permit|ticket  ?town=  ?category=
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        params = request.query_params
+        group_by = [name for name in params.get("group_by", "date").split(",") if name]
+        unknown = set(group_by) - set(reports.GROUP_FIELDS)
+        if unknown:
+            raise ValidationError({"group_by": [f"Unknown grouping: {', '.join(sorted(unknown))}."]})
+
+        dates = parse_date_params(params)
+        rows = reports.summarize(
+            group_by, source=params.get("source"), town=params.get("town"), category=params.get("category"),
+            **dates,
+        )
+        # Money as strings, like DecimalField serializers render it
+        results = [
+            {key: str(reports.money(value)) if isinstance(value, Decimal) else value for key, value in row.items()}
+            for row in rows
+        ]
+        return Response({"group_by": group_by, "results": results})
+
+
+class DashboardSummaryAPIView(APIView):
+    """Active, expired, paid and unpaid permits and tickets, from the dashboard counters"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(dashboard.summary())
+
+
+class ExportAPIView(ReplicaReadMixin, APIView):
+    """
+    Full extracts streamed as CSV or NDJSON, gzipped when the client accepts it.
+    GET /revenue/exports/permits.csv  /revenue/exports/tickets.ndjson
+    ?start=&end= (YYYY-MM-DD)  ?town= (tickets)  ?type= (permit type or vehicle type)
+    """
+    permission_classes = [permissions.IsAdminUser]
+    accepts_gzip = re.compile(r"\bgzip\b")
+
+    def get(self, request, dataset, fmt):
+        if dataset not in exports.DATASETS or fmt not in exports.FORMATS:
+            raise Http404
+        params = request.query_params
+        try:
+            rows = exports.DATASETS[dataset](
+                town=params.get("town"), category=params.get("type"), **parse_date_params(params)
+            )
+        except exports.ExportFilterError as exc:
+            raise ValidationError(exc.args[0])
+
+        content = exports.stream(rows, fmt)
+        gzipped = bool(self.accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+        if gzipped:
+            content = compress_sequence(content)
+        response = StreamingHttpResponse(content, content_type=exports.FORMATS[fmt])
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
         return response
 
 
 # ------------------------------
 # TOWNS / AREAS / PARKING ZONES
 # ------------------------------
-class TownListAPIView(generics.ListAPIView):
+class TownListAPIView(ReplicaReadMixin, generics.ListAPIView):
     queryset = Town.objects.all()
     serializer_class = TownSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class AreaByTownAPIView(generics.ListAPIView):
-    serializer_class = AreaSerializer
+class LocationTreeAPIView(APIView):
+    """Whole town -> area -> section hierarchy in one cached, versioned response"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        version, blob = locations.get_tree()
+        etag = f'"locations-{version}"'
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(blob, content_type="application/json")
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+
+class SectionOccupancyAPIView(APIView):
+    """Live occupancy of one parking section"""
     permission_classes = [permissions.AllowAny]
 
+    def get(self, request, section_id):
+        state = get_tracker().section(section_id)
+        if state is None:
+            raise Http404
+        return Response(dict(section=section_id, **state))
+
+
+class OccupancyMapAPIView(APIView):
+    """Live occupancy of all sections, or of ``?ids=1,2,3``"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        ids = request.query_params.get("ids")
+        if ids:
+            try:
+                ids = [int(i) for i in ids.split(",") if i]
+            except ValueError:
+                raise ValidationError({"ids": ["Expected a comma separated list of section ids."]})
+        return Response(get_tracker().sections(ids or None))
+
+
+def wants_compact(request):
+    """``?compact=1`` selects the flat serializers on location lists."""
+    return request.GET.get("compact", "").lower() in ("1", "true", "yes")
+
+
+class AreaByTownAPIView(ReplicaReadMixin, generics.ListAPIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get_serializer_class(self):
+        return CompactAreaSerializer if wants_compact(self.request) else AreaSerializer
+
     def get_queryset(self):
-        return Area.objects.filter(town_id=self.kwargs["town_id"])
+        return Area.objects.filter(town_id=self.kwargs["town_id"]).select_related("town")
 
 
-class ParkingSectionByAreaAPIView(generics.ListAPIView):
-    serializer_class = ParkingSectionSerializer
+class ParkingSectionByAreaAPIView(ReplicaReadMixin, generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
 
+    def get_serializer_class(self):
+        if wants_compact(self.request):
+            return CompactParkingSectionSerializer
+        return ParkingSectionSerializer
+
     def get_queryset(self):
-        return ParkingSection.objects.filter(area_id=self.kwargs["area_id"])
+        return ParkingSection.objects.filter(area_id=self.kwargs["area_id"]).select_related("area__town")
@@ -0,0 +1,186 @@
+# users/authentication.py
+"""
+Token authentication without a query per request.
+
+DRF's ``TokenAuthentication`` loads ``Token`` joined to ``User`` on every
+call. ``CachedTokenAuthentication`` keeps what that query returns in two
+tiers:
+
+1. a per-process LRU, entries living ``AUTH_TOKEN_CACHE_TTL`` seconds;
+2. optionally a Django cache shared by all workers
+   (``AUTH_TOKEN_SHARED_CACHE`` names the alias), so a worker that has not
+   seen a token yet still skips the database.
+
+Deleting a token (logout) or saving a user (deactivation, staff or role
+changes) drops their entries through signals.py. With the shared tier on,
+that also bumps a revocation version there; every worker compares it on
+each hit, so revocations take effect everywhere on the next request.
+Without it, other workers notice within the local TTL.
+
+``get_token_cache().stats()`` reports the hit rate (see
+``GET /users/api/auth-cache/``).
+"""
+import copy
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from county_revenue.caching import TTLCache, per_process
+
+KEY_PREFIX = "users:token:"
+VERSION_KEY = "users:token:revoked"
+
+
+class TokenCache:
+    """``key -> (user, token)`` over a ``TTLCache``, with a shared second tier."""
+
+    def __init__(self, max_entries, ttl, shared_alias=None, shared_ttl=300):
+        self.shared_alias = shared_alias
+        self.shared_ttl = shared_ttl
+        self._entries = TTLCache(max_entries, ttl)    # key -> (user, token, version)
+        self._lock = threading.Lock()    # guards the counters
+        self.local_hits = self.shared_hits = self.misses = self.invalidations = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def version(self, found=None):
+        """The shared revocation version, ``None`` without a shared tier."""
+        shared = self.shared
+        if shared is None:
+            return None
+        version = shared.get(VERSION_KEY) if found is None else found.get(VERSION_KEY)
+        if version is None:
+            # Start from the clock so a version evicted from the cache is never reused
+            shared.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+            version = shared.get(VERSION_KEY)
+        return version
+
+    @staticmethod
+    def shared_key(key):
+        # Digest, so token keys never appear in the cache server's key space
+        return KEY_PREFIX + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        ``((user, token) or None, version)`` with at most one shared-cache
+        round trip. Pass ``version`` back to ``put`` after a miss.
+        """
+        shared = self.shared
+        version = None
+        entry = self._entries.get(key)
+        if entry is not None:
+            version = self.version()
+            if version == entry[2]:
+                with self._lock:
+                    self.local_hits += 1
+                return (entry[0], entry[1]), version
+
+        if shared:
+            found = shared.get_many([VERSION_KEY, self.shared_key(key)])
+            version = self.version(found)
+            cached = found.get(self.shared_key(key))
+            if cached is not None:
+                self.remember(key, cached, version)
+                with self._lock:
+                    self.shared_hits += 1
+                return cached, version
+        with self._lock:
+            self.misses += 1
+        return None, version
+
+    def get_local(self, key):
+        """
+        ``(user, token)`` from this process's tier alone, or ``None``. No I/O,
+        so async views can call it directly; only a hit is counted, as the
+        caller falls back to the full lookup.
+        """
+        if self.shared_alias:
+            return None    # the revocation version lives in the shared tier
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        with self._lock:
+            self.local_hits += 1
+        return entry[0], entry[1]
+
+    def put(self, key, user, token, version):
+        """Store a database result; ``version`` is the one ``get`` saw before the query."""
+        shared = self.shared
+        if shared:
+            shared.set(self.shared_key(key), (user, token), self.shared_ttl)
+            if self.version() != version:
+                # Revoked while we were querying; the row we read may be gone
+                shared.delete(self.shared_key(key))
+                return
+        self.remember(key, (user, token), version)
+
+    def remember(self, key, cached, version):
+        self._entries.put(key, (*cached, version))
+
+    def invalidate(self, *keys):
+        self._entries.pop(*keys)
+        with self._lock:
+            self.invalidations += len(keys)
+        shared = self.shared
+        if shared and keys:
+            shared.delete_many([self.shared_key(key) for key in keys])
+            try:
+                shared.incr(VERSION_KEY)
+            except ValueError:
+                self.version()
+
+    def invalidate_user(self, user_pk):
+        from rest_framework.authtoken.models import Token
+
+        keys = self._entries.pop_where(lambda entry: entry[0].pk == user_pk)
+        keys = set(keys) | set(Token.objects.filter(user_id=user_pk).values_list("key", flat=True))
+        self.invalidate(*keys)
+
+    def clear(self):
+        self._entries.clear()
+        with self._lock:
+            self.local_hits = self.shared_hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.local_hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "local_hits": self.local_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round((self.local_hits + self.shared_hits) / lookups, 4) if lookups else None,
+            }
+
+
+get_token_cache = per_process(lambda: TokenCache(
+    max_entries=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+    shared_alias=getattr(settings, "AUTH_TOKEN_SHARED_CACHE", None),
+    shared_ttl=getattr(settings, "AUTH_TOKEN_SHARED_CACHE_TTL", 300),
+))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for ``TokenAuthentication`` backed by ``get_token_cache()``."""
+
+    def authenticate_credentials(self, key):
+        token_cache = get_token_cache()
+        cached, version = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.put(key, user, token, version)
+        else:
+            user, token = cached
+            if not user.is_active:
+                raise AuthenticationFailed("User inactive or deleted.")
+        # Each request gets its own instance; views may modify request.user
+        return copy.copy(user), token
@@ -0,0 +1,108 @@
+# users/hashing.py
+"""
+Password hashing for the login and register endpoints.
+
+- ``PASSWORD_HASHING_ALGORITHM`` picks the hasher for new passwords:
+  argon2 (needs ``argon2-cffi``), bcrypt (needs ``bcrypt``) or pbkdf2.
+  ``PASSWORD_HASHING_COST`` sets each one's work factor.
+- The other hashers stay in ``PASSWORD_HASHERS`` so existing hashes still
+  verify. Django re-hashes a password with the preferred hasher and cost
+  the next time it is checked successfully, so switching algorithm or
+  cost needs no migration.
+- ``run_in_hash_pool`` runs a view in a small dedicated thread pool. The
+  ASGI URLconf (county_revenue/urls_asgi.py) routes login and register
+  through it: there Django runs every sync view on one shared thread, and
+  a slow hash would stall unrelated requests. Under WSGI they stay plain
+  sync views and hash on the request's own thread.
+"""
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core import checks
+from django.db import close_old_connections
+
+LIBRARIES = {"argon2": "argon2", "bcrypt": "bcrypt", "pbkdf2": None}
+
+
+class CostFromSettingsMixin:
+    """Reads work-factor attributes from ``PASSWORD_HASHING_COST[cost_key]``."""
+    cost_key = None
+
+    def __init__(self):
+        for name, value in getattr(settings, "PASSWORD_HASHING_COST", {}).get(self.cost_key, {}).items():
+            setattr(self, name, value)
+
+
+class PBKDF2PasswordHasher(CostFromSettingsMixin, hashers.PBKDF2PasswordHasher):
+    cost_key = "pbkdf2"
+
+
+class Argon2PasswordHasher(CostFromSettingsMixin, hashers.Argon2PasswordHasher):
+    cost_key = "argon2"
+
+
+class BCryptSHA256PasswordHasher(CostFromSettingsMixin, hashers.BCryptSHA256PasswordHasher):
+    cost_key = "bcrypt"
+
+
+@checks.register(checks.Tags.security)
+def check_hashing_library(app_configs, **kwargs):
+    algorithm = getattr(settings, "PASSWORD_HASHING_ALGORITHM", "pbkdf2")
+    if algorithm not in LIBRARIES:
+        return [checks.Error(
+            f"PASSWORD_HASHING_ALGORITHM must be one of {', '.join(LIBRARIES)}.", id="users.E001",
+        )]
+    library = LIBRARIES[algorithm]
+    if library and importlib.util.find_spec(library) is None:
+        return [checks.Error(
+            f"PASSWORD_HASHING_ALGORITHM is {algorithm!r} but the {library!r} package is not installed.",
+            id="users.E002",
+        )]
+    return []
+
+
+# ------------------------------
+# Thread pool
+# ------------------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, "PASSWORD_HASH_WORKERS", None) or os.cpu_count() or 2
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+    return _executor
+
+
+def run_in_hash_pool(view):
+    """
+    Wrap a sync view (``APIView.as_view()``) as an async one that runs on
+    the hashing pool, whose size also caps concurrent hashes per process.
+    For ASGI routes only: under WSGI Django would drive it through
+    ``async_to_sync``, an event loop per request.
+    """
+    def pooled(request, *args, **kwargs):
+        # Pool threads outlive requests; honour CONN_MAX_AGE like request threads do
+        close_old_connections()
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+    async def async_view(request, *args, **kwargs):
+        call = sync_to_async(pooled, thread_sensitive=False, executor=get_hash_executor())
+        return await call(request, *args, **kwargs)
+
+    async_view.csrf_exempt = getattr(view, "csrf_exempt", False)
+    async_view.cls = getattr(view, "cls", None)
+    async_view.initkwargs = getattr(view, "initkwargs", None)
+    return async_view
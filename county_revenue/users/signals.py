@@ -0,0 +1,28 @@
+# users/signals.py
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+
+
+# ------------------------------
+# Token cache invalidation
+# ------------------------------
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    get_token_cache().invalidate(instance.key)
+    # Again after commit, in case a concurrent request cached the row meanwhile
+    transaction.on_commit(lambda: get_token_cache().invalidate(instance.key))
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_changed_user(sender, instance, created, update_fields=None, **kwargs):
+    # Deactivation, staff/role changes... anything but the last_login stamp from login()
+    if created or (update_fields is not None and set(update_fields) <= {"last_login"}):
+        return
+    pk = instance.pk
+    get_token_cache().invalidate_user(pk)
+    transaction.on_commit(lambda: get_token_cache().invalidate_user(pk))
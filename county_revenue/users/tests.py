@@ -1,3 +1,191 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import base_user
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from . import authentication, hashing, views
+from .authentication import TokenCache, get_token_cache
+from .models import User
+
+# Cheap hashes keep these tests fast; changing PASSWORD_HASHERS resets Django's hasher cache
+FAST_HASHING = {
+    "PASSWORD_HASHERS": ["users.hashing.PBKDF2PasswordHasher", "users.hashing.Argon2PasswordHasher"],
+    "PASSWORD_HASHING_COST": {"pbkdf2": {"iterations": 1000}},
+}
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = User.objects.create_user("clerk", password="pass")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get("/users/api/profile/").status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get("/users/api/profile/")
+        self.assertEqual(response.json()["username"], "clerk")
+        stats = get_token_cache().stats()
+        self.assertEqual((stats["local_hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_logout_and_deactivation_revoke_cached_tokens(self):
+        self.client.get("/users/api/profile/")
+        self.assertEqual(self.client.post("/users/api/logout/").status_code, 200)
+        self.assertEqual(self.client.get("/users/api/profile/").status_code, 401)
+
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(self.client.get("/users/api/profile/").status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/users/api/profile/").status_code, 401)
+
+    def test_staff_changes_are_seen_at_once(self):
+        self.assertEqual(self.client.get("/users/api/auth-cache/").status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get("/users/api/auth-cache/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("hit_rate", response.json())
+
+    def test_shared_tier_across_workers(self):
+        cache.clear()
+        first, second = (TokenCache(100, ttl=60, shared_alias="default") for _ in range(2))
+        key = self.token.key
+        cached, version = first.get(key)
+        self.assertIsNone(cached)
+        first.put(key, self.user, self.token, version)
+
+        # A worker that never saw the token gets it from the shared tier...
+        cached, _ = second.get(key)
+        self.assertEqual(cached[0].pk, self.user.pk)
+        self.assertEqual(second.stats()["shared_hits"], 1)
+        self.assertEqual(second.get(key)[0][1].key, key)
+        self.assertEqual(second.stats()["local_hits"], 1)
+
+        # ...and drops its local copy as soon as another worker revokes it
+        first.invalidate(key)
+        self.assertIsNone(second.get(key)[0])
+
+    def test_revocation_during_a_miss_is_not_cached(self):
+        cache.clear()
+        shared = TokenCache(100, ttl=60, shared_alias="default")
+        _, version = shared.get(self.token.key)
+        shared.invalidate("another-token")
+        shared.put(self.token.key, self.user, self.token, version)
+        self.assertIsNone(shared.get(self.token.key)[0])
+
+    def test_cached_user_is_copied_per_request(self):
+        token_cache = TokenCache(100, ttl=60)
+        with mock.patch.object(authentication, "get_token_cache", lambda: token_cache):
+            auth = authentication.CachedTokenAuthentication()
+            first, _ = auth.authenticate_credentials(self.token.key)
+            first.is_staff = True
+            second, _ = auth.authenticate_credentials(self.token.key)
+            self.assertFalse(second.is_staff)
+
+
+@override_settings(**FAST_HASHING)
+class PasswordHashingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def register(self, username="trader"):
+        return self.client.post("/users/api/register/", {
+            "username": username, "email": f"{username}@example.com", "password": "kiosk-Pass-2024",
+        })
+
+    def login(self, username="trader", password="kiosk-Pass-2024"):
+        return self.client.post("/users/api/login/", {"username": username, "password": password})
+
+    def test_register_hashes_once(self):
+        with mock.patch.object(base_user, "make_password", wraps=base_user.make_password) as make_password:
+            response = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(make_password.call_count, 1)
+        self.assertTrue(User.objects.get(username="trader").check_password("kiosk-Pass-2024"))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_login_upgrades_the_hash_to_the_configured_cost(self):
+        self.register()
+        self.assertTrue(User.objects.get().password.startswith("pbkdf2_sha256$1000$"))
+        with override_settings(PASSWORD_HASHING_COST={"pbkdf2": {"iterations": 1200}},
+                               PASSWORD_HASHERS=FAST_HASHING["PASSWORD_HASHERS"][:]):
+            self.assertEqual(self.login().status_code, 200)
+            self.assertTrue(User.objects.get().password.startswith("pbkdf2_sha256$1200$"))
+            self.assertEqual(self.login().status_code, 200)
+
+    @override_settings(AUTH_THROTTLE_USERNAME_RATE=(1, 2), AUTH_THROTTLE_IP_RATE=(1, 4))
+    def test_token_buckets_shed_repeated_attempts(self):
+        with mock.patch.object(views, "authenticate", wraps=views.authenticate) as authenticate:
+            self.assertEqual(self.login(password="wrong").status_code, 401)
+            self.assertEqual(self.login(password="wrong").status_code, 401)
+            limited = self.login(password="wrong")
+            self.assertEqual(limited.status_code, 429)
+            self.assertGreater(int(limited["Retry-After"]), 0)
+            self.assertEqual(authenticate.call_count, 2)
+
+            # Another username still has tokens; then the IP bucket runs dry
+            self.assertEqual(self.login(username="other", password="wrong").status_code, 401)
+            self.assertEqual(self.login(username="third", password="wrong").status_code, 429)
+
+    @override_settings(AUTH_THROTTLE_USERNAME_RATE=(1, 1), AUTH_THROTTLE_IP_RATE=(1, 10))
+    def test_documented_login_and_signup_urls_are_throttled(self):
+        User.objects.create_user("trader", password="kiosk-Pass-2024")
+        response = self.client.post("/api/login/", {"username": "trader", "password": "kiosk-Pass-2024"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["token"])
+        self.assertEqual(
+            self.client.post("/api/login/", {"username": "trader", "password": "wrong"}).status_code, 429,
+        )
+
+        signup = {"username": "clerk", "email": "clerk@example.com", "password": "kiosk-Pass-2024"}
+        with mock.patch.object(base_user, "make_password", wraps=base_user.make_password) as make_password:
+            self.assertEqual(self.client.post("/api/users/", signup).status_code, 201)
+        self.assertEqual(make_password.call_count, 1)
+        self.assertEqual(self.client.post("/api/users/", signup).status_code, 429)
+
+    def test_missing_hashing_library_is_reported(self):
+        with override_settings(PASSWORD_HASHING_ALGORITHM="argon2"), \
+                mock.patch("importlib.util.find_spec", return_value=None):
+            self.assertEqual([error.id for error in hashing.check_hashing_library(None)], ["users.E002"])
+        with override_settings(PASSWORD_HASHING_ALGORITHM="md5"):
+            self.assertEqual([error.id for error in hashing.check_hashing_library(None)], ["users.E001"])
+
+
+@override_settings(**FAST_HASHING)
+class HashPoolTests(TransactionTestCase):
+    def test_asgi_logins_hash_on_the_pool(self):
+        cache.clear()
+        User.objects.create_user("trader", password="kiosk-Pass-2024")
+        threads = []
+        original = views.authenticate
+
+        def authenticate(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original(*args, **kwargs)
+
+        with mock.patch.object(views, "authenticate", authenticate):
+            response = async_to_sync(AsyncClient().post)(
+                "/users/api/login/", {"username": "trader", "password": "kiosk-Pass-2024"},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 200)
+            self.client.post("/users/api/login/", {"username": "trader", "password": "kiosk-Pass-2024"})
+        self.assertTrue(threads[0].startswith("password-hash"))
+        self.assertEqual(threads[1], threading.current_thread().name)
+
+    def test_wsgi_routes_stay_sync(self):
+        # An async view there would cost an event loop per request (async_to_sync)
+        for url in ("/users/api/login/", "/users/api/register/", "/api/login/", "/api/users/"):
+            self.assertFalse(iscoroutinefunction(resolve(url).func))
+            self.assertTrue(iscoroutinefunction(resolve(url, urlconf="county_revenue.urls_asgi").func))
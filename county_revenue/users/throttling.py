@@ -0,0 +1,63 @@
+# users/throttling.py
+"""
+Token-bucket limits for the login and register endpoints.
+
+Each client IP and each submitted username has a bucket that refills at a
+steady rate up to a burst size, and every attempt takes one token. When
+either bucket is empty the request gets 429 with ``Retry-After`` before
+any password is hashed. Guessing many passwords for one account from many
+IPs, or many accounts from one IP, both run dry quickly, while a person
+retrying a typo a few times does not notice.
+
+Buckets live in the default Django cache, so all workers share them when
+that cache is shared. Like DRF's own throttles, updates are not atomic:
+under a burst a few extra attempts may get through.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = "users:throttle:"
+
+
+class TokenBucket:
+    """``rate`` tokens per minute, holding at most ``burst``."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate / 60.0
+        self.burst = burst
+
+    def take(self, key, now=None):
+        """Take one token; returns 0 on success, else seconds until one is available."""
+        now = time.time() if now is None else now
+        tokens, updated = cache.get(KEY_PREFIX + key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        # Kept until the bucket would be full again
+        cache.set(KEY_PREFIX + key, (tokens - 1, now), timeout=int(self.burst / self.rate) + 1)
+        return 0
+
+
+class LoginRateThrottle(BaseThrottle):
+    """Per-IP and per-username token buckets (``AUTH_THROTTLE_*`` settings)."""
+
+    def allow_request(self, request, view):
+        buckets = [("ip", self.get_ident(request), getattr(settings, "AUTH_THROTTLE_IP_RATE", (20, 20)))]
+        username = request.data.get("username") if hasattr(request.data, "get") else None
+        if isinstance(username, str) and username:
+            rate = getattr(settings, "AUTH_THROTTLE_USERNAME_RATE", (5, 10))
+            buckets.append(("username", username.strip().lower()[:150], rate))
+
+        self.retry_after = 0
+        for kind, ident, (rate, burst) in buckets:
+            # Digest: usernames may hold characters cache backends reject in keys
+            key = f"{kind}:{hashlib.sha256(ident.encode()).hexdigest()[:32]}"
+            self.retry_after = max(self.retry_after, TokenBucket(rate, burst).take(key))
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
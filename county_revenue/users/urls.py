@@ -1,14 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, RegisterAPIView, LoginAPIView, LogoutAPIView, ProfileAPIView
+from .views import UserViewSet, RegisterAPIView, LoginAPIView, LogoutAPIView, ProfileAPIView, AuthCacheStatsAPIView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 
 urlpatterns = [
+    # Under ASGI these resolve to pooled versions first (county_revenue/urls_asgi.py)
     path("api/register/", RegisterAPIView.as_view(), name="api-register"),
     path("api/login/", LoginAPIView.as_view(), name="api-login"),
     path("api/logout/", LogoutAPIView.as_view(), name="api-logout"),
     path("api/profile/", ProfileAPIView.as_view(), name="api-profile"),
+    path("api/auth-cache/", AuthCacheStatsAPIView.as_view(), name="api-auth-cache"),
     path("api/", include(router.urls)),
 ]
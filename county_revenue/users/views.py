@@ -4,7 +4,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
 
+from .authentication import get_token_cache
 from .serializers import UserSerializer
+from .throttling import LoginRateThrottle
 
 User = get_user_model()
 
@@ -21,6 +23,12 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
+    def get_throttles(self):
+        # Sign-up hashes a password, like RegisterAPIView
+        if self.action == 'create':
+            return [LoginRateThrottle()]
+        return super().get_throttles()
+
     def get_permissions(self):
         if self.action in ['list', 'destroy']:
             return [permissions.IsAdminUser()]
@@ -43,14 +51,13 @@ class UserViewSet(viewsets.ModelViewSet):
 
 class RegisterAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginRateThrottle]
 
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            user.set_password(request.data.get("password"))
-            user.save()
-            token, _ = Token.objects.get_or_create(user=user)
+            user = serializer.save()  # hashes the password once
+            token = Token.objects.create(user=user)
             return Response({
                 "message": "Account created successfully",
                 "token": token.key
@@ -60,6 +67,7 @@ class RegisterAPIView(APIView):
 
 class LoginAPIView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [LoginRateThrottle]
 
     def post(self, request):
         username = request.data.get("username")
@@ -79,11 +87,23 @@ class LogoutAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        request.user.auth_token.delete()  # remove token
+        # request.auth is the token already loaded by CachedTokenAuthentication;
+        # deleting it also evicts it from the token cache (users/signals.py)
+        token = request.auth if isinstance(request.auth, Token) else Token.objects.filter(user=request.user).first()
+        if token is not None:
+            token.delete()
         logout(request)
         return Response({"message": "Logged out successfully"})
 
 
+class AuthCacheStatsAPIView(APIView):
+    """Token cache counters for this worker process."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(get_token_cache().stats())
+
+
 class ProfileAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 